@@ -0,0 +1,60 @@
+import asyncio
+import json
+
+from fastapi import Request, Response
+from fastapi.encoders import jsonable_encoder
+
+from app.catalog import inventory
+from app.config import settings
+from utils.response_cache import ResponseCache, etag_matches
+
+# Serialized responses of read-only catalog endpoints
+response_cache = ResponseCache(
+    max_bytes=settings.RESPONSE_CACHE_MAX_MB * 1024 * 1024,
+    max_entries=settings.RESPONSE_CACHE_MAX_ENTRIES
+)
+
+
+def catalog_version(stock=True, product_id=None):
+    """
+    Version of the catalog data a response depends on. Responses that do not
+    show stock levels pass stock=False and survive stock changes; responses
+    about a single product pass its product_id and only follow its stock.
+    """
+    if not stock:
+        stock_version = 0
+    elif product_id is not None:
+        stock_version = inventory.product_stock_version(product_id)
+    else:
+        stock_version = inventory.stock_version
+    return inventory.catalog_version, stock_version
+
+
+def _serialize(compute):
+    return json.dumps(jsonable_encoder(compute()), separators=(",", ":")).encode()
+
+
+async def cached_json(request: Request, key, version, compute):
+    """
+    Serve compute() as JSON, reusing the serialized body while the data
+    version is unchanged. Sends an ETag and answers 304 Not Modified when
+    the client's If-None-Match already has it.
+    Args:
+        key: hashable identifying the endpoint and its normalized parameters
+        version: from catalog_version(), read before computing
+        compute: builds the response data; runs with the serialization on
+            the default executor, as it may load records from the store.
+            Exceptions (e.g. 404) pass through.
+    """
+    cached = response_cache.get(key, version)
+    if cached is None:
+        body = await asyncio.get_running_loop().run_in_executor(None, _serialize, compute)
+        etag = response_cache.put(key, version, body)
+    else:
+        body, etag = cached
+
+    # no-cache: the browser may store it but must revalidate, which is cheap
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    return Response(body, media_type="application/json", headers=headers)
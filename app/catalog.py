@@ -0,0 +1,31 @@
+import json
+
+from app.components import register
+from app.config import settings
+from utils.inventory import InventoryAPI
+
+
+def load_products(path):
+    """
+    Load the product list from a product_db.json style file.
+    """
+    with open(path, "r") as f:
+        return json.load(f)["products"]
+
+
+def load_inventory():
+    if settings.INVENTORY_BACKEND == "sqlite":
+        from utils.catalog_store import SQLiteCatalogStore
+
+        store = SQLiteCatalogStore(
+            settings.INVENTORY_DB_PATH,
+            flush_interval_ms=settings.STOCK_FLUSH_INTERVAL_MS,
+            max_batch=settings.STOCK_FLUSH_BATCH
+        )
+        return InventoryAPI(store=store, cache_size=settings.INVENTORY_CACHE_SIZE)
+    return InventoryAPI(load_products(settings.INVENTORY_PATH))
+
+
+# Single catalog shared by every router, so stock changes are visible app-wide.
+# Loaded on first use or by the startup warmup.
+inventory = register("catalog", load_inventory)
@@ -0,0 +1,92 @@
+import threading
+import time
+
+# name -> LazyComponent, in registration order
+components = {}
+
+
+class LazyComponent:
+    """
+    A heavy resource (model, index, parsed map...) built on first use.
+
+    The factory runs once, on the first get() or during background warmup;
+    concurrent callers wait for that single load. Attribute access is
+    forwarded to the built object, so a component can stand in for it:
+    `inventory.get_product(...)` loads the catalog if needed.
+    """
+
+    def __init__(self, name, factory):
+        self._name = name
+        self._factory = factory
+        self._value = None
+        self._loaded = False
+        self._error = None
+        self._load_seconds = None
+        self._lock = threading.Lock()
+
+    def get(self):
+        if self._loaded:
+            return self._value
+        with self._lock:
+            if not self._loaded:
+                start = time.perf_counter()
+                try:
+                    self._value = self._factory()
+                except Exception as exc:
+                    self._error = repr(exc)
+                    raise
+                self._error = None
+                self._load_seconds = time.perf_counter() - start
+                self._loaded = True
+        return self._value
+
+    @property
+    def ready(self):
+        return self._loaded
+
+    def status(self):
+        return {
+            "ready": self._loaded,
+            "load_seconds": self._load_seconds,
+            "error": self._error,
+        }
+
+    def __getattr__(self, attr):
+        return getattr(self.get(), attr)
+
+
+def register(name, factory):
+    """
+    Register a lazily built component; returns it for use as a module global.
+    """
+    component = LazyComponent(name, factory)
+    components[name] = component
+    return component
+
+
+def _warm_up(names):
+    for name in names:
+        try:
+            components[name].get()
+        except Exception:
+            # Recorded in status(); the next get() retries the load
+            pass
+
+
+def warm_up(names=None):
+    """
+    Load components in registration order on a background thread, so the
+    server answers /health while models load. Returns the thread.
+    """
+    thread = threading.Thread(
+        target=_warm_up, args=(list(names or components),), name="warmup", daemon=True
+    )
+    thread.start()
+    return thread
+
+
+def readiness():
+    return {
+        "ready": all(c.ready for c in components.values()),
+        "components": {name: c.status() for name, c in components.items()},
+    }
@@ -1,4 +1,5 @@
 import os
+from typing import Optional
 from pydantic_settings import BaseSettings
 
 
@@ -9,21 +10,114 @@ class Settings(BaseSettings):
     VERSION: str = "1.0.0"
     DEBUG: bool = True
 
+    # Load models, maps and the catalog in the background at startup;
+    # otherwise each loads on its first request
+    WARMUP_ON_STARTUP: bool = True
+
+    # Prometheus metrics at /metrics: route latency histograms, parser stage
+    # timings, A* and stock-lock counters. When off, nothing is recorded and
+    # /metrics only shows component, executor and cache state
+    METRICS_ENABLED: bool = True
+
     # Inventory source
     INVENTORY_PATH: str = "./data/product_db.json"
+    # "json" parses INVENTORY_PATH into memory; "sqlite" opens INVENTORY_DB_PATH
+    # (see python -m utils.catalog_store) and loads records on demand
+    INVENTORY_BACKEND: str = "json"
+    INVENTORY_DB_PATH: str = "./data/catalog.db"
+    INVENTORY_CACHE_SIZE: int = 100000
+    # Stock changes are written to the database in batches
+    STOCK_FLUSH_INTERVAL_MS: int = 200
+    STOCK_FLUSH_BATCH: int = 1000
 
     # NLP model settings
     NLP_MODEL: str = "en_core_web_sm"
+    # Load only the components needed for noun_chunks and the PhraseMatcher
+    NLP_TRIMMED_PIPELINE: bool = True
+    # Answer queries made only of exact product names and filler words from
+    # an Aho-Corasick automaton, without running spaCy
+    NLP_FAST_PATH: bool = True
+    # Defaults for /nlp/parse_batch (nlp.pipe)
+    NLP_BATCH_SIZE: int = 64
+    NLP_N_PROCESS: int = 1
+    NLP_MAX_PROCESSES: int = 4
+    NLP_MAX_BATCH_QUERIES: int = 10000
+    # Fuzzy product matching for noun chunks
+    NLP_FUZZY_MAX_DISTANCE: int = 2
+    NLP_FUZZY_MIN_SCORE: float = 0.7
 
     # Whisper model
     STT_MODEL_SIZE: str = "small"
 
+    # Transcription worker pool: processes, batch size and batching window
+    STT_WORKERS: int = 1
+    STT_MAX_BATCH: int = 8
+    STT_BATCH_WINDOW_MS: int = 20
+    STT_WARMUP: bool = True
+
+    # Transcription cache: in-memory LRU of transcripts, plus transcripts and
+    # resampled clips on disk under STT_CACHE_DIR when set
+    STT_CACHE_SIZE: int = 1024
+    STT_CACHE_DIR: Optional[str] = None
+    STT_BUFFER_CACHE_MB: int = 512
+
+    # Streaming speech-to-text (/stt/stream): VAD segmentation and partials
+    STT_VAD_FRAME_MS: int = 30
+    STT_VAD_THRESHOLD_DB: float = -45.0
+    STT_VAD_SILENCE_MS: int = 500
+    STT_MAX_SEGMENT_S: float = 15.0
+    STT_PARTIAL_INTERVAL_MS: int = 700
+
+    # Bounded executors for CPU-heavy routes: worker count and how many more
+    # requests may wait; beyond that requests get 429 with Retry-After.
+    # NLP_PROCESSES parses in worker processes (one model each) so parsing
+    # does not hold the GIL that lookups on the event loop need. Each
+    # worker indexes the catalog when it starts and does not follow later
+    # changes made through the API; use threads where products change live
+    NLP_WORKERS: int = 2
+    NLP_QUEUE: int = 32
+    NLP_PROCESSES: bool = False
+    RECOMMEND_WORKERS: int = 2
+    RECOMMEND_QUEUE: int = 64
+    NAVIGATION_WORKERS: int = 2
+    NAVIGATION_QUEUE: int = 64
+    # Clips queued or being transcribed before /stt requests are refused
+    STT_MAX_QUEUE: int = 64
+
+    # Cached JSON responses of catalog endpoints (ETag / 304 support)
+    RESPONSE_CACHE_MAX_MB: int = 64
+    RESPONSE_CACHE_MAX_ENTRIES: int = 100000
+
     # Recommendation settings
     MAX_RECOMMENDATIONS: int = 5
 
+    # Precomputed neighbours for /recommend/similar (python -m models.neighbours);
+    # without the file, similar products come from a category / diet tag scan
+    NEIGHBOUR_TABLE_PATH: str = "./data/neighbours.bin"
+
+    # Personalized recommendations (/recommend/for_user): purchase histories and
+    # preferences, purchases paired per new purchase, neighbours kept per product
+    # and pending co-occurrence increments before they are merged
+    USER_DATA_PATH: str = "./data/user.json"
+    PURCHASE_HISTORY_WINDOW: int = 50
+    COOCCURRENCE_MAX_NEIGHBOURS: int = 200
+    COOCCURRENCE_MERGE_THRESHOLD: int = 1000000
+
+    # Voice assistant (/assistant/voice): products resolved and routed per request
+    ASSISTANT_MAX_PRODUCTS: int = 3
+
     # Pathfinding map
     STORE_MAP_PATH: str = "./data/store_map.json"
 
+    # Route serving: precompute all pairs for maps up to ROUTE_TABLE_MAX_NODES,
+    # otherwise cache up to ROUTE_CACHE_SIZE A* results
+    ROUTE_PRECOMPUTE: bool = True
+    ROUTE_TABLE_MAX_NODES: int = 2000
+    ROUTE_CACHE_SIZE: int = 10000
+
+    # With a floorplan in the store map, each aisle is linked to this many nearest aisles
+    FLOORPLAN_AISLE_LINKS: int = 4
+
     class Config:
         env_file = ".env"
 
@@ -0,0 +1,50 @@
+import asyncio
+
+from fastapi import Request
+from fastapi.responses import JSONResponse
+
+from utils.executors import BoundedExecutor, Overloaded
+
+# name -> BoundedExecutor, for stats and shutdown
+executors = {}
+
+
+def bounded_executor(name, workers, max_queue, processes=False, initializer=None, initargs=()):
+    """
+    Create a named BoundedExecutor for CPU-heavy routes. Routes await
+    executor.run(fn, ...) and answer 429 when it is full.
+    """
+    executor = BoundedExecutor(
+        name, workers=workers, max_queue=max_queue, processes=processes,
+        initializer=initializer, initargs=initargs
+    )
+    executors[name] = executor
+    return executor
+
+
+async def overloaded_response(request: Request, exc: Overloaded):
+    return JSONResponse(
+        {"detail": str(exc)},
+        status_code=429,
+        headers={"Retry-After": str(exc.retry_after)}
+    )
+
+
+async def ensure_loaded(*components):
+    """
+    Load lazy components off the event loop, so async fast paths never
+    block it on a first-time catalog or map load.
+    """
+    loop = asyncio.get_running_loop()
+    for component in components:
+        if not component.ready:
+            await loop.run_in_executor(None, component.get)
+
+
+def shutdown_executors():
+    for executor in executors.values():
+        executor.shutdown()
+
+
+def executor_stats():
+    return {name: executor.stats() for name, executor in executors.items()}
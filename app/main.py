@@ -1,6 +1,13 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from app.routers import navigation, nlp_handler, product_lookup, recom
+from fastapi.responses import JSONResponse
+from app.catalog import inventory
+from app.components import readiness, warm_up
+from app.config import settings
+from app.executors import overloaded_response, shutdown_executors
+from app.metrics import MetricsMiddleware, metrics_response
+from app.routers import assistant, navigation, nlp_handler, product_lookup, recom, stt
+from utils.executors import Overloaded
 
 app = FastAPI(
     title="In-Store Assistant API",
@@ -16,17 +23,65 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Per-route latency histograms for /metrics
+if settings.METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
+
+# Full executors answer 429 with Retry-After
+app.add_exception_handler(Overloaded, overloaded_response)
+
 # Include routers
 app.include_router(navigation.router, prefix="/navigate", tags=["Navigation"])
 app.include_router(nlp_handler.router, prefix="/nlp", tags=["NLP"])
 app.include_router(product_lookup.router, prefix="/product", tags=["Product Lookup"])
 app.include_router(recom.router, prefix="/recommend", tags=["Recommendation"])
+app.include_router(stt.router, prefix="/stt", tags=["Speech"])
+app.include_router(assistant.router, prefix="/assistant", tags=["Assistant"])
 
 @app.get("/")
 def root():
     return {"message": "Welcome to the In-Store Assistant API"}
 
+
+@app.on_event("startup")
+def start_warmup():
+    # Models and maps load in the background; the server answers right away
+    if settings.WARMUP_ON_STARTUP:
+        warm_up()
+
+
+@app.on_event("shutdown")
+def close_catalog():
+    # Write out batched stock changes
+    if inventory.ready:
+        inventory.close()
+
+
+@app.on_event("shutdown")
+def stop_executors():
+    shutdown_executors()
+
+
 # Optional: health check
 @app.get("/health")
 def health_check():
     return {"status": "OK"}
+
+
+@app.get("/ready")
+def ready_check():
+    """
+    200 once every component (catalog, map, NLP, speech) is loaded, else 503.
+    """
+    status = readiness()
+    return JSONResponse(status, status_code=200 if status["ready"] else 503)
+
+
+@app.get("/metrics")
+def metrics():
+    """
+    Prometheus text format: request latency per route, NLP stage timings,
+    A* search counters, recommender scoring and stock-lock wait histograms,
+    component load times, executor and response cache state.
+    """
+    return metrics_response()
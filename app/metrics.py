@@ -0,0 +1,102 @@
+import time
+
+from fastapi import Response
+
+from app.caching import response_cache
+from app.components import components
+from app.config import settings
+from app.executors import executors
+from utils.metrics import registry
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+registry.enabled = settings.METRICS_ENABLED
+
+REQUEST_SECONDS = registry.histogram(
+    "http_request_duration_seconds", "Time to serve HTTP requests", ["method", "route", "status"]
+)
+
+
+def route_label(scope):
+    """
+    Path template of the route that served a request, including the prefix
+    of the router it was included with (e.g. "/stt/stats"), or "unmatched".
+    Newer FastAPI versions put the router's own route, without the prefix,
+    in scope["route"]. The prefix is then the part of the request path
+    before the route's pattern matches; router prefixes here have no
+    parameters, so it holds no request values.
+    """
+    route = scope.get("route")
+    template = getattr(route, "path", None)
+    if template is None:
+        return "unmatched"
+    pattern = getattr(route, "path_regex", None)
+    path = scope.get("path", "")
+    if pattern is not None:
+        for start, char in enumerate(path):
+            if char == "/" and pattern.match(path[start:]):
+                return path[:start] + template
+    return template
+
+
+class MetricsMiddleware:
+    """
+    Times every HTTP request into REQUEST_SECONDS, labelled by the matched
+    route's path template (not the raw path), method and status code.
+    Plain ASGI, so it adds no per-request task or body buffering.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not registry.enabled:
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            # The router records the matched route in the shared scope
+            labels = (scope["method"], route_label(scope), str(status))
+            REQUEST_SECONDS.observe(time.perf_counter() - start, labels)
+
+
+def _component_stat(key):
+    return lambda: {(name,): c.status()[key] for name, c in components.items()}
+
+
+def _executor_stat(key):
+    return lambda: {(name,): executor.stats()[key] for name, executor in executors.items()}
+
+
+# State kept by components, executors and caches, read at scrape time
+registry.callback("component_ready", "Whether each lazy component is loaded",
+                  _component_stat("ready"), ["component"])
+registry.callback("component_load_seconds", "Time each lazy component took to load",
+                  _component_stat("load_seconds"), ["component"])
+registry.callback("executor_in_progress", "Jobs running or queued per bounded executor",
+                  _executor_stat("in_progress"), ["executor"])
+registry.callback("executor_completed_total", "Jobs finished per bounded executor",
+                  _executor_stat("completed"), ["executor"], kind="counter")
+registry.callback("executor_rejected_total", "Jobs refused with 429 per bounded executor",
+                  _executor_stat("rejected"), ["executor"], kind="counter")
+registry.callback("response_cache_hits_total", "Cached catalog responses served",
+                  lambda: response_cache.stats()["hits"], kind="counter")
+registry.callback("response_cache_misses_total", "Catalog responses computed",
+                  lambda: response_cache.stats()["misses"], kind="counter")
+registry.callback("response_cache_bytes", "Size of cached catalog responses",
+                  lambda: response_cache.stats()["bytes"])
+
+
+def metrics_response():
+    return Response(registry.render(), media_type=CONTENT_TYPE)
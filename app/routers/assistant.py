@@ -0,0 +1,144 @@
+import asyncio
+import json
+import time
+from concurrent.futures.process import BrokenProcessPool
+
+from fastapi import APIRouter, File, HTTPException, Query, UploadFile
+from fastapi.responses import StreamingResponse
+from typing import Optional
+from app.catalog import inventory
+from app.config import settings
+from app.executors import ensure_loaded
+from app.routers.navigation import navigation_executor, navigation_path, store
+from app.routers.nlp_handler import analyze, nlp_executor
+from app.routers.stt import transcriber, transcription_error
+from utils.executors import Overloaded
+from utils.speechtotext import InvalidAudio
+
+router = APIRouter()
+
+
+def resolve_products(parsed, limit):
+    """
+    Catalog products for the parser's matches, best first, with their
+    locations. Matches without a product_id are looked up by name.
+    """
+    products = []
+    seen = set()
+    for match in parsed["products"]:
+        product = inventory.get_product(match["product_id"]) if match["product_id"] else None
+        if product is None:
+            found = inventory.search_products(match["name"], limit=1)
+            product = found[0] if found else None
+        if product is None or product["product_id"] in seen:
+            continue
+        seen.add(product["product_id"])
+        products.append({
+            "product_id": product["product_id"],
+            "name": product["name"],
+            "aisle": product["aisle_id"],
+            "shelf": product["shelf_id"],
+            "score": match["score"]
+        })
+        if len(products) >= limit:
+            break
+    return products
+
+
+async def product_route(start, product):
+    """
+    Route from start to a product's shelf (its aisle if the shelf is not
+    on the map), or the reason there is none.
+    """
+    end = product["shelf"] if product["shelf"] in store.positions else product["aisle"]
+    try:
+        route = await navigation_executor.run(navigation_path, start, end)
+    except HTTPException as exc:
+        return {"product_id": product["product_id"], "error": exc.detail}
+    except Overloaded as exc:
+        return {"product_id": product["product_id"], "error": str(exc)}
+    return {"product_id": product["product_id"], **route}
+
+
+async def voice_pipeline(data, start):
+    """
+    Yield one JSON line per stage as it completes: transcript, intent,
+    products, a route per product (in the order they finish), done.
+    A failing stage yields an error line and ends the stream.
+    """
+    started = time.perf_counter()
+
+    def line(stage, **fields):
+        fields["ms"] = round((time.perf_counter() - started) * 1000, 1)
+        return json.dumps({"stage": stage, **fields}) + "\n"
+
+    # The catalog and map load while the audio is transcribed
+    loading = asyncio.ensure_future(ensure_loaded(inventory, store))
+    # A load failure is reported where it is awaited, not again on cleanup
+    loading.add_done_callback(lambda task: task.cancelled() or task.exception())
+    routes = []
+    try:
+        text = (await transcriber.transcribe(data)).strip()
+        yield line("transcript", text=text)
+        if not text:
+            yield line("done")
+            return
+
+        parsed = await nlp_executor.run(analyze, text)
+        yield line("intent", intent=parsed["intent"], entities=parsed["entities"])
+
+        await loading
+        # Store lookups and searches block; keep them off the event loop
+        products = await asyncio.get_running_loop().run_in_executor(
+            None, resolve_products, parsed, settings.ASSISTANT_MAX_PRODUCTS
+        )
+        yield line("products", products=products)
+
+        if start is not None:
+            routes = [asyncio.ensure_future(product_route(start, product)) for product in products]
+            for route in asyncio.as_completed(routes):
+                yield line("route", **(await route))
+        yield line("done")
+    except Overloaded as exc:
+        yield line("error", status=429, detail=str(exc), retry_after=exc.retry_after)
+    except (InvalidAudio, BrokenProcessPool) as exc:
+        status, detail = transcription_error(exc)
+        yield line("error", status=status, detail=detail)
+    except Exception as exc:
+        yield line("error", status=500, detail=repr(exc))
+    finally:
+        # Also reached when the client disconnects mid-stream
+        loading.cancel()
+        for route in routes:
+            route.cancel()
+
+
+@router.post("/voice")
+async def voice_query(
+    file: UploadFile = File(...),
+    start: Optional[str] = Query(default=None, description="Kiosk location to route from (e.g., A1)")
+):
+    """
+    Spoken question to products and routes in one request.
+
+    Runs speech-to-text, intent parsing, product lookup and, with a start
+    location, a route to each product, streaming newline-delimited JSON as
+    each stage finishes:
+    {"stage": "transcript", "text": ...}, {"stage": "intent", "intent": ...,
+    "entities": [...]}, {"stage": "products", "products": [{"product_id",
+    "name", "aisle", "shelf", "score"}]}, one {"stage": "route", "product_id",
+    "path", "total_cost", ...} per product, then {"stage": "done"}. Every
+    line carries "ms" since the request started; a failed stage sends
+    {"stage": "error", "status", "detail"} instead and ends the stream.
+    """
+    data = await file.read()
+    if not data:
+        raise HTTPException(status_code=400, detail="Empty audio file")
+    if transcriber.overloaded():
+        raise Overloaded("speech", transcriber.retry_after())
+    if start is not None:
+        await ensure_loaded(store)
+        if start not in store.positions:
+            raise HTTPException(status_code=404, detail="Invalid start location")
+
+    return StreamingResponse(voice_pipeline(data, start), media_type="application/x-ndjson")
@@ -1,66 +1,213 @@
 from fastapi import APIRouter, HTTPException, Query
-from utils.nav import Graph, astar  # Adjust import if needed
+from pydantic import BaseModel
+from typing import List, Optional
+from utils.grid import OccupancyGrid, grid_route
+from utils.nav import CSRGraph, Graph, RoutePlanner  # Adjust import if needed
+from utils.tour import plan_tour
+from app.catalog import inventory
+from app.components import register
 from app.config import settings
+from app.executors import bounded_executor
 
 import json
 
 router = APIRouter()
 
-# Load store map JSON (with aisles and shelves)
-with open(settings.STORE_MAP_PATH, "r") as f:
-    store_map = json.load(f)
-
-graph = Graph()
-positions = {}
-
-# Build nodes from aisles and shelves
-for aisle in store_map.get("aisles", []):
-    node_id = aisle["id"]
-    positions[node_id] = (aisle["coordinates"]["x"], aisle["coordinates"]["y"])
-    graph.add_node(node_id)
-
-for shelf in store_map.get("shelves", []):
-    node_id = shelf["id"]
-    positions[node_id] = (shelf["coordinates"]["x"], shelf["coordinates"]["y"])
-    graph.add_node(node_id)
-
-# Build edges - you need to define adjacency here
-# For example, connect shelves to their aisles, aisles to nearby aisles, etc.
-
-# Connect shelves to their aisles (cost=1)
-for shelf in store_map.get("shelves", []):
-    graph.add_edge(shelf["id"], shelf["aisle_id"], cost=1)
-    graph.add_edge(shelf["aisle_id"], shelf["id"], cost=1)
-
-# Connect aisles linearly or via some logic (example: connect aisles in sequence)
-aisle_ids = [aisle["id"] for aisle in store_map.get("aisles", [])]
-for i in range(len(aisle_ids) - 1):
-    from_id = aisle_ids[i]
-    to_id = aisle_ids[i+1]
-    # Calculate cost as Euclidean distance or set as 1
-    x1, y1 = positions[from_id]
-    x2, y2 = positions[to_id]
-    cost = ((x2 - x1)**2 + (y2 - y1)**2) ** 0.5
-    graph.add_edge(from_id, to_id, cost=cost)
-    graph.add_edge(to_id, from_id, cost=cost)
+
+class StoreNavigation:
+    """
+    Routing state built from the store map: node positions, the frozen
+    CSRGraph, its RoutePlanner and per-edge floorplan waypoints.
+    """
+
+    def __init__(self, store_map):
+        self.positions = {}
+        # Smoothed floorplan waypoints per directed edge, when the map has a floorplan
+        self.edge_waypoints = {}
+        graph = Graph()
+
+        # Build nodes from aisles and shelves
+        for aisle in store_map.get("aisles", []):
+            node_id = aisle["id"]
+            self.positions[node_id] = (aisle["coordinates"]["x"], aisle["coordinates"]["y"])
+            graph.add_node(node_id)
+
+        for shelf in store_map.get("shelves", []):
+            node_id = shelf["id"]
+            self.positions[node_id] = (shelf["coordinates"]["x"], shelf["coordinates"]["y"])
+            graph.add_node(node_id)
+
+        aisle_ids = [aisle["id"] for aisle in store_map.get("aisles", [])]
+
+        if "floorplan" in store_map:
+            # Real adjacency: route around shelving and checkouts with jump point search
+            floor_grid = OccupancyGrid.from_floorplan(store_map["floorplan"])
+
+            for shelf in store_map.get("shelves", []):
+                self.link_on_floorplan(graph, floor_grid, shelf["id"], shelf["aisle_id"])
+
+            # Each aisle links to its nearest aisles (by straight-line distance)
+            linked = set()
+            for a in aisle_ids:
+                ax, ay = self.positions[a]
+                nearest = sorted(
+                    (b for b in aisle_ids if b != a),
+                    key=lambda b: (self.positions[b][0] - ax) ** 2 + (self.positions[b][1] - ay) ** 2
+                )
+                for b in nearest[:settings.FLOORPLAN_AISLE_LINKS]:
+                    pair = tuple(sorted((a, b)))
+                    if pair not in linked:
+                        linked.add(pair)
+                        self.link_on_floorplan(graph, floor_grid, a, b)
+        else:
+            # Build edges - you need to define adjacency here
+            # For example, connect shelves to their aisles, aisles to nearby aisles, etc.
+
+            # Connect shelves to their aisles (cost=1)
+            for shelf in store_map.get("shelves", []):
+                graph.add_edge(shelf["id"], shelf["aisle_id"], cost=1)
+                graph.add_edge(shelf["aisle_id"], shelf["id"], cost=1)
+
+            # Connect aisles linearly or via some logic (example: connect aisles in sequence)
+            for i in range(len(aisle_ids) - 1):
+                from_id = aisle_ids[i]
+                to_id = aisle_ids[i+1]
+                # Calculate cost as Euclidean distance or set as 1
+                x1, y1 = self.positions[from_id]
+                x2, y2 = self.positions[to_id]
+                cost = ((x2 - x1)**2 + (y2 - y1)**2) ** 0.5
+                graph.add_edge(from_id, to_id, cost=cost)
+                graph.add_edge(to_id, from_id, cost=cost)
+
+        # The map is static once loaded: freeze it into the compact form used for search
+        self.graph = CSRGraph.from_graph(graph, self.positions)
+        self.planner = RoutePlanner(
+            self.graph,
+            precompute=settings.ROUTE_PRECOMPUTE,
+            table_max_nodes=settings.ROUTE_TABLE_MAX_NODES,
+            cache_size=settings.ROUTE_CACHE_SIZE,
+        )
+
+    def link_on_floorplan(self, graph, grid, a, b):
+        """
+        Connect two locations with their walking distance on the floorplan grid.
+        """
+        waypoints, cost = grid_route(grid, self.positions[a], self.positions[b])
+        if waypoints is None:
+            return
+        graph.add_edge(a, b, cost=cost)
+        self.edge_waypoints[(a, b)] = waypoints
+        self.edge_waypoints[(b, a)] = waypoints[::-1]
+
+    def path_waypoints(self, path):
+        """
+        Join the floorplan waypoints of each edge along a node path.
+        """
+        waypoints = []
+        for a, b in zip(path[:-1], path[1:]):
+            leg = self.edge_waypoints[(a, b)]
+            waypoints.extend(leg if not waypoints else leg[1:])
+        return waypoints
+
+
+def load_navigation():
+    # Load store map JSON (with aisles and shelves)
+    with open(settings.STORE_MAP_PATH, "r") as f:
+        store_map = json.load(f)
+    return StoreNavigation(store_map)
+
+
+store = register("navigation", load_navigation)
+
+# Route searches and tour planning run here, off the event loop
+navigation_executor = bounded_executor(
+    "navigation", workers=settings.NAVIGATION_WORKERS, max_queue=settings.NAVIGATION_QUEUE
+)
+
+
+def navigation_path(start, end):
+    if start not in store.positions or end not in store.positions:
+        raise HTTPException(status_code=404, detail="Invalid start or end location")
+
+    path, cost = store.planner.route(start, end)
+
+    if path is None:
+        raise HTTPException(status_code=400, detail="No path found between locations")
+
+    response = {
+        "start": start,
+        "end": end,
+        "path": path,
+        "total_cost": cost
+    }
+    if store.edge_waypoints:
+        response["waypoints"] = store.path_waypoints(path)
+    return response
 
 
 @router.get("/path")
-def get_navigation_path(
+async def get_navigation_path(
     start: str = Query(..., description="Start location (e.g., entrance, A1)"),
     end: str = Query(..., description="Destination location (e.g., A4, checkout)")
 ):
-    if start not in positions or end not in positions:
-        raise HTTPException(status_code=404, detail="Invalid start or end location")
+    return await navigation_executor.run(navigation_path, start, end)
 
-    path, cost = astar(graph, start, end, positions)
 
+class TourRequest(BaseModel):
+    product_ids: List[str]
+    start: Optional[str] = None
+    end: Optional[str] = None
+
+
+def shopping_tour(request):
+    if not request.product_ids:
+        raise HTTPException(status_code=400, detail="No products given")
+    for node in (request.start, request.end):
+        if node is not None and node not in store.positions:
+            raise HTTPException(status_code=404, detail=f"Invalid location: {node}")
+
+    shelf_products = {}
+    missing = []
+    for product_id in request.product_ids:
+        product = inventory.get_product(product_id)
+        if not product or product.get("shelf_id") not in store.positions:
+            missing.append(product_id)
+            continue
+        shelf_products.setdefault(product["shelf_id"], []).append(product_id)
+    if missing:
+        raise HTTPException(status_code=404, detail=f"Products not found on the map: {missing}")
+
+    order, path, cost = plan_tour(
+        store.graph, list(shelf_products), request.start, request.end, table=store.planner.table
+    )
     if path is None:
         raise HTTPException(status_code=400, detail="No path found between locations")
 
-    return {
-        "start": start,
-        "end": end,
+    response = {
+        "stops": [
+            {"location": node, "product_ids": shelf_products.get(node, [])}
+            for node in order
+        ],
         "path": path,
         "total_cost": cost
     }
+    if store.edge_waypoints:
+        response["waypoints"] = store.path_waypoints(path)
+    return response
+
+
+@router.post("/tour")
+async def get_shopping_tour(request: TourRequest):
+    """
+    Visiting order and walking path for a shopping list.
+    Shelves are resolved from the catalog; start defaults to the first item's shelf.
+    """
+    return await navigation_executor.run(shopping_tour, request)
+
+
+@router.get("/stats")
+def get_route_stats():
+    """
+    Route serving mode and cache hit-rate stats.
+    """
+    return store.planner.stats()
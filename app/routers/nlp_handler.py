@@ -1,24 +1,111 @@
 from fastapi import APIRouter, HTTPException, Body
-from pydantic import BaseModel
-from models.nlp import IntentParser
+from pydantic import BaseModel, Field
+from typing import List, Optional
+from app.catalog import inventory
+from app.components import LazyComponent, register
+from app.config import settings
+from app.executors import bounded_executor
 
 router = APIRouter()
-parser = IntentParser()  # Load spaCy model
+
+
+def load_parser():
+    # spaCy is slow to import and load; keep both out of app import
+    from models.nlp import IntentParser
+
+    return IntentParser(
+        model_name=settings.NLP_MODEL,
+        trimmed=settings.NLP_TRIMMED_PIPELINE,
+        catalog=inventory,
+        max_edit_distance=settings.NLP_FUZZY_MAX_DISTANCE,
+        min_score=settings.NLP_FUZZY_MIN_SCORE,
+        fast_path=settings.NLP_FAST_PATH
+    )
+
+
+# This process's parser; with NLP_PROCESSES every worker process loads its own,
+# from its own copy of the catalog. Catalog listeners only fire in the process
+# that made the change, so worker parsers keep the names they started with.
+parser = LazyComponent("nlp", load_parser)
+
+
+def _load_worker_parser():
+    parser.get()
+
+
+def analyze(query):
+    return parser.analyze(query)
+
+
+def analyze_batch(queries, batch_size, n_process):
+    return parser.analyze_batch(queries, batch_size=batch_size, n_process=n_process)
+
+
+nlp_executor = bounded_executor(
+    "nlp",
+    workers=settings.NLP_WORKERS,
+    max_queue=settings.NLP_QUEUE,
+    processes=settings.NLP_PROCESSES,
+    initializer=_load_worker_parser if settings.NLP_PROCESSES else None
+)
+
+
+def load_nlp():
+    # Worker threads share this process's parser; worker processes load
+    # theirs as they start
+    if not nlp_executor.processes:
+        parser.get()
+    nlp_executor.start()
+    return nlp_executor
+
+
+register("nlp", load_nlp)
 
 class NLPRequest(BaseModel):
     query: str
 
+class NLPBatchRequest(BaseModel):
+    queries: List[str]
+    batch_size: Optional[int] = Field(default=None, ge=1, le=1024)
+    n_process: Optional[int] = Field(default=None, ge=1, le=settings.NLP_MAX_PROCESSES)
+
 @router.post("/parse")
-def parse_user_query(request: NLPRequest):
+async def parse_user_query(request: NLPRequest):
     query = request.query.strip()
 
     if not query:
         raise HTTPException(status_code=400, detail="Query is empty")
 
-    intent, entities = parser.parse(query)
+    result = await nlp_executor.run(analyze, query)
 
     return {
         "query": query,
-        "intent": intent,
-        "entities": entities
+        **result
+    }
+
+
+@router.post("/parse_batch")
+async def parse_user_queries(request: NLPBatchRequest):
+    """
+    Parse many queries in one call using spaCy's nlp.pipe.
+    """
+    queries = [q.strip() for q in request.queries]
+
+    if not queries:
+        raise HTTPException(status_code=400, detail="No queries given")
+    if len(queries) > settings.NLP_MAX_BATCH_QUERIES:
+        raise HTTPException(status_code=413, detail="Too many queries in one batch")
+
+    parsed = await nlp_executor.run(
+        analyze_batch,
+        queries,
+        batch_size=request.batch_size or settings.NLP_BATCH_SIZE,
+        n_process=request.n_process or settings.NLP_N_PROCESS
+    )
+
+    return {
+        "results": [
+            {"query": query, **result}
+            for query, result in zip(queries, parsed)
+        ]
     }
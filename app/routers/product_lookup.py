@@ -1,46 +1,78 @@
-from fastapi import APIRouter, HTTPException, Query
-from utils.inventory import InventoryAPI
-from app.config import settings
-import json
+from fastapi import APIRouter, HTTPException, Query, Request
+from pydantic import BaseModel, Field
+from typing import Dict
+from app.caching import cached_json, catalog_version
+from app.catalog import inventory
+from app.executors import ensure_loaded
+from utils.inventory import ReservationError
 
 router = APIRouter()
 
-# Load product database
-with open(settings.INVENTORY_PATH, "r") as f:
-    product_data = json.load(f)["products"]
-
-# Initialize in-memory inventory API
-inventory = InventoryAPI(product_data)
-
 @router.get("/search")
-def search_products(query: str = Query(..., min_length=2)):
+async def search_products(
+    query: str = Query(..., min_length=2),
+    limit: int = Query(default=20, ge=1, le=100)
+):
     """
-    Search products by name substring.
+    Search products by name substring, best matches first.
     """
-    results = inventory.search_products(query)
+    await ensure_loaded(inventory)
+    results = inventory.search_products(query, limit=limit)
     return {"query": query, "results": results}
 
 @router.get("/info")
-def get_product_info(product_id: str = Query(...)):
+async def get_product_info(request: Request, product_id: str = Query(...)):
     """
     Get detailed product info by ID.
     """
-    product = inventory.get_product(product_id)
-    if not product:
-        raise HTTPException(status_code=404, detail="Product not found")
-    return product
+    await ensure_loaded(inventory)
+
+    def build():
+        product = inventory.get_product(product_id)
+        if not product:
+            raise HTTPException(status_code=404, detail="Product not found")
+        return product
+
+    return await cached_json(request, ("info", product_id), catalog_version(product_id=product_id), build)
 
 @router.get("/location")
-def get_product_location(product_id: str = Query(...)):
+async def get_product_location(request: Request, product_id: str = Query(...)):
     """
     Get shelf and aisle location for a product.
     """
-    product = inventory.get_product(product_id)
-    if not product:
-        raise HTTPException(status_code=404, detail="Product not found")
-    return {
-        "product_id": product_id,
-        "name": product["name"],
-        "aisle": product["aisle_id"],
-        "shelf": product["shelf_id"]
-    }
+    await ensure_loaded(inventory)
+
+    def build():
+        product = inventory.get_product(product_id)
+        if not product:
+            raise HTTPException(status_code=404, detail="Product not found")
+        return {
+            "product_id": product_id,
+            "name": product["name"],
+            "aisle": product["aisle_id"],
+            "shelf": product["shelf_id"]
+        }
+
+    # Locations do not depend on stock levels
+    return await cached_json(request, ("location", product_id), catalog_version(stock=False), build)
+
+
+class ReserveRequest(BaseModel):
+    items: Dict[str, int] = Field(..., description="product_id -> quantity")
+
+
+@router.post("/reserve")
+def reserve_products(request: ReserveRequest):
+    """
+    Take stock for a whole basket at once: either every item is reserved
+    or none is (409 with the available stock of the short items).
+    """
+    if not request.items:
+        raise HTTPException(status_code=400, detail="No items given")
+    try:
+        remaining = inventory.reserve(request.items)
+    except ReservationError as exc:
+        raise HTTPException(status_code=409, detail={"shortages": exc.shortages})
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+    return {"reserved": request.items, "remaining": remaining}
@@ -1,17 +1,76 @@
-from fastapi import APIRouter, Query
-from utils.inventory import InventoryAPI
+from fastapi import APIRouter, Query, Request
+from pydantic import BaseModel, Field
+from typing import List
+from app.caching import cached_json, catalog_version
+from app.catalog import inventory
+from app.components import register
 from app.config import settings
+from app.executors import bounded_executor, ensure_loaded
+from itertools import chain
 import json
+import os
 import random
 
 router = APIRouter()
 
-# Load products
-with open(settings.INVENTORY_PATH, "r") as f:
-    product_data = json.load(f)["products"]
 
-# Initialize inventory
-inventory = InventoryAPI(product_data)
+def load_users(path):
+    """
+    Users from a user.json style file; empty if there is none.
+    """
+    if not os.path.exists(path):
+        return []
+    with open(path, "r") as f:
+        return json.load(f)["users"]
+
+
+def load_personalizer():
+    # scipy is slow to import; keep it out of app import
+    from models.recommender import PurchaseRecommender
+
+    recommender = PurchaseRecommender(
+        window=settings.PURCHASE_HISTORY_WINDOW,
+        max_neighbours=settings.COOCCURRENCE_MAX_NEIGHBOURS,
+        compact_threshold=settings.COOCCURRENCE_MERGE_THRESHOLD
+    )
+    recommender.index_catalog(inventory.get())
+
+    users = load_users(settings.USER_DATA_PATH)
+    for user in users:
+        recommender.set_preferences(user["user_id"], user.get("preferences", {}))
+    recommender.add_histories(
+        (
+            user["user_id"],
+            [p["product_id"] for p in sorted(user.get("past_purchases", []), key=lambda p: p.get("date", ""))]
+        )
+        for user in users
+    )
+    return recommender
+
+
+personalizer = register("personalization", load_personalizer)
+
+
+def load_neighbour_table():
+    # Memory-mapped: pages are read on demand and shared between workers
+    from utils.neighbour_table import NeighbourTable
+
+    if not os.path.exists(settings.NEIGHBOUR_TABLE_PATH):
+        return None
+    return NeighbourTable(settings.NEIGHBOUR_TABLE_PATH)
+
+
+neighbour_table = register("neighbours", load_neighbour_table)
+
+# Personalized scoring runs here, off the event loop
+recommend_executor = bounded_executor(
+    "recommend", workers=settings.RECOMMEND_WORKERS, max_queue=settings.RECOMMEND_QUEUE
+)
+
+
+class PurchaseRequest(BaseModel):
+    user_id: str
+    product_ids: List[str] = Field(..., min_length=1)
 
 
 @router.get("/random")
@@ -21,48 +80,123 @@ def recommend_random(
     """
     Recommend random products (fallback or for cold start).
     """
-    all_products = inventory.list_all_products()
-    return random.sample(all_products, min(count, len(all_products)))
+    # Sample the shared id snapshot in place instead of copying the catalog
+    product_ids = inventory.id_snapshot()
+    picked = random.sample(product_ids, min(count, len(product_ids)))
+    products = (inventory.get_product(product_id) for product_id in picked)
+    return [product for product in products if product is not None]
 
 
 @router.get("/by_category")
-def recommend_by_category(
+async def recommend_by_category(
+    request: Request,
     category: str = Query(..., description="Product category (e.g., Dairy, Snacks)")
 ):
     """
     Recommend products from the same category.
     """
-    products = inventory.list_all_products()
-    results = [p for p in products if p["category"].lower() == category.lower()]
+    await ensure_loaded(inventory)
+
+    def build():
+        results = inventory.find_products(category=category, limit=settings.MAX_RECOMMENDATIONS)
+
+        return {
+            "category": category,
+            "results": results
+        }
+
+    return await cached_json(request, ("by_category", category), catalog_version(), build)
+
+
+def similar_products(product_id):
+    target = inventory.get_product(product_id)
+    if not target:
+        return {"error": "Product not found"}
+
+    table = neighbour_table.get()
+    if table is not None and product_id in table:
+        recommendations = []
+        for neighbour_id, _ in table.lookup(product_id):
+            product = inventory.get_product(neighbour_id)
+            if product:
+                recommendations.append(product)
+                if len(recommendations) >= settings.MAX_RECOMMENDATIONS:
+                    break
+        return {
+            "based_on": target["name"],
+            "recommendations": recommendations
+        }
+
+    # Not in the precomputed table (no table, or added since it was built)
+    category = target["category"]
+    tags = target.get("diet_tags", [])
+
+    # Recommend if category matches or shares diet tags; closest matches
+    # (same category and a shared tag) are taken first
+    candidates = chain(
+        chain.from_iterable(inventory.iter_ids(category=category, diet_tags=t) for t in tags),
+        inventory.iter_ids(category=category),
+        chain.from_iterable(inventory.iter_ids(diet_tags=t) for t in tags),
+    )
+    seen = {product_id}
+    recommendations = []
+    for pid in candidates:
+        if pid in seen:
+            continue
+        seen.add(pid)
+        recommendations.append(inventory.get_product(pid))
+        if len(recommendations) >= settings.MAX_RECOMMENDATIONS:
+            break
 
     return {
-        "category": category,
-        "results": results[:settings.MAX_RECOMMENDATIONS]
+        "based_on": target["name"],
+        "recommendations": recommendations
     }
 
 
 @router.get("/similar")
-def recommend_similar(product_id: str):
+async def recommend_similar(request: Request, product_id: str):
     """
     Recommend similar items by diet tag/category.
     """
-    target = inventory.get_product(product_id)
-    if not target:
-        return {"error": "Product not found"}
+    await ensure_loaded(inventory, neighbour_table)
+    return await cached_json(
+        request, ("similar", product_id), catalog_version(), lambda: similar_products(product_id)
+    )
 
-    all_products = inventory.list_all_products()
+
+def personalized_products(user_id, count):
     recommendations = []
+    for product_id, score in personalizer.recommend(user_id, k=count):
+        product = inventory.get_product(product_id)
+        if product:
+            recommendations.append({**product, "score": score})
+    return recommendations
 
-    for p in all_products:
-        if p["product_id"] == product_id:
-            continue
-        # Recommend if category matches or shares diet tags
-        same_category = p["category"] == target["category"]
-        shared_tags = bool(set(p.get("diet_tags", [])) & set(target.get("diet_tags", [])))
-        if same_category or shared_tags:
-            recommendations.append(p)
+
+@router.get("/for_user")
+async def recommend_for_user(
+    user_id: str,
+    count: int = Query(default=settings.MAX_RECOMMENDATIONS, ge=1, le=100)
+):
+    """
+    Personalized picks: products other shoppers bought together with this
+    user's purchases, filtered by their diet and allergies. Popular products
+    from their favourite categories fill in for new users.
+    """
+    recommendations = await recommend_executor.run(personalized_products, user_id, count)
 
     return {
-        "based_on": target["name"],
-        "recommendations": recommendations[:settings.MAX_RECOMMENDATIONS]
+        "user_id": user_id,
+        "recommendations": recommendations
     }
+
+
+@router.post("/purchases")
+def record_purchases(request: PurchaseRequest):
+    """
+    Add purchases to a user's history. Co-occurrence counts are updated in
+    place, so recommendations reflect them right away.
+    """
+    recorded = personalizer.record_purchase(request.user_id, request.product_ids)
+    return {"user_id": request.user_id, "recorded": recorded}
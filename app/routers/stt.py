@@ -0,0 +1,193 @@
+import asyncio
+import json
+from concurrent.futures.process import BrokenProcessPool
+
+from fastapi import APIRouter, File, HTTPException, Query, UploadFile, WebSocket, WebSocketDisconnect
+from app.components import register
+from app.config import settings
+from utils.speechtotext import SAMPLE_RATE, InvalidAudio
+from utils.executors import Overloaded
+from utils.transcription import TranscriptionService
+from utils.vad import EnergyVAD, PCM16Decoder, SpeechSegmenter
+
+router = APIRouter()
+
+# Whisper runs in worker processes, each loading STT_MODEL_SIZE once
+transcriber = TranscriptionService(
+    model_size=settings.STT_MODEL_SIZE,
+    workers=settings.STT_WORKERS,
+    max_batch=settings.STT_MAX_BATCH,
+    batch_window_ms=settings.STT_BATCH_WINDOW_MS,
+    warmup=settings.STT_WARMUP,
+    cache_size=settings.STT_CACHE_SIZE,
+    cache_dir=settings.STT_CACHE_DIR,
+    buffer_cache_mb=settings.STT_BUFFER_CACHE_MB,
+    max_queue=settings.STT_MAX_QUEUE
+)
+
+
+def load_transcriber():
+    transcriber.load()
+    return transcriber
+
+
+# Worker processes start during the app warmup (or on the first request)
+register("speech", load_transcriber)
+
+
+@router.on_event("shutdown")
+async def stop_transcriber():
+    await transcriber.stop()
+
+
+def transcription_error(exc):
+    """
+    (status code, detail) reported for a failed transcription.
+    """
+    if isinstance(exc, InvalidAudio):
+        return 400, str(exc)
+    if isinstance(exc, BrokenProcessPool):
+        return 503, "Speech workers are restarting, try again"
+    return 500, repr(exc)
+
+
+@router.post("/transcribe")
+async def transcribe_file(file: UploadFile = File(...)):
+    """
+    Transcribe an uploaded audio file (wav, flac, ogg...).
+    """
+    data = await file.read()
+    if not data:
+        raise HTTPException(status_code=400, detail="Empty audio file")
+    try:
+        text = await transcriber.transcribe(data)
+    except (InvalidAudio, BrokenProcessPool) as exc:
+        status, detail = transcription_error(exc)
+        raise HTTPException(status_code=status, detail=detail)
+    return {"text": text.strip()}
+
+
+@router.get("/stats")
+def get_transcriber_stats():
+    """
+    Queue depth, batching and per-stage timings of the transcription workers.
+    """
+    return transcriber.stats()
+
+
+def is_end_message(text):
+    """The client ends the stream with "end" or {"event": "end"}."""
+    text = text.strip()
+    if text == "end":
+        return True
+    try:
+        return json.loads(text).get("event") == "end"
+    except (ValueError, AttributeError):
+        return False
+
+
+@router.websocket("/stream")
+async def stream_transcription(
+    websocket: WebSocket,
+    sample_rate: int = Query(default=SAMPLE_RATE, ge=8000, le=48000)
+):
+    """
+    Streaming speech-to-text.
+
+    The client sends binary messages of 16-bit little-endian mono PCM at
+    sample_rate, and the text message "end" when done. The server segments
+    the audio with voice-activity detection and replies with JSON messages:
+    {"type": "partial", "segment": n, "text": ...} while an utterance is in
+    progress, {"type": "final", "segment": n, "text": ...} when it ends, and
+    {"type": "end"} after the last final. A segment that cannot be
+    transcribed gets {"type": "error", "segment": n, "status", "detail"}
+    instead, with the status /transcribe would return, and the stream
+    stays open.
+
+    Segmentation runs at sample_rate; each utterance is resampled to 16 kHz
+    as a whole by the transcription workers.
+    """
+    if transcriber.overloaded():
+        # 1013: try again later
+        await websocket.close(code=1013)
+        return
+    await websocket.accept()
+
+    pcm = PCM16Decoder()
+    vad = EnergyVAD(sample_rate, settings.STT_VAD_FRAME_MS, settings.STT_VAD_THRESHOLD_DB)
+    segmenter = SpeechSegmenter(
+        vad,
+        silence_ms=settings.STT_VAD_SILENCE_MS,
+        max_segment_s=settings.STT_MAX_SEGMENT_S
+    )
+    partial_every = sample_rate * settings.STT_PARTIAL_INTERVAL_MS // 1000
+
+    segment_id = 0
+    last_partial_at = 0
+    partial_task = None
+
+    async def send_error(segment, exc):
+        status, detail = transcription_error(exc)
+        await websocket.send_json({"type": "error", "segment": segment, "status": status, "detail": detail})
+
+    async def send_partial(segment, audio):
+        # Partials are best effort: skipped while the workers are saturated
+        try:
+            text = await transcriber.transcribe(audio, sample_rate, cache=False)
+        except Overloaded:
+            return
+        except Exception as exc:
+            if segment == segment_id:
+                await send_error(segment, exc)
+            return
+        # Drop partials that arrive after their utterance was finalized
+        if segment == segment_id and text.strip():
+            await websocket.send_json({"type": "partial", "segment": segment, "text": text.strip()})
+
+    async def send_final(audio):
+        nonlocal segment_id, last_partial_at, partial_task
+        if partial_task is not None:
+            await partial_task
+            partial_task = None
+        try:
+            # An admitted stream always gets its finals
+            text = await transcriber.transcribe(audio, sample_rate, cache=False, bounded=False)
+        except Exception as exc:
+            await send_error(segment_id, exc)
+        else:
+            await websocket.send_json({"type": "final", "segment": segment_id, "text": text.strip()})
+        segment_id += 1
+        last_partial_at = 0
+
+    try:
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                break
+
+            if message.get("bytes"):
+                for audio in segmenter.push(pcm.decode(message["bytes"])):
+                    await send_final(audio)
+
+                # One partial decode in flight at a time, once enough new audio arrived
+                if (segmenter.active
+                        and segmenter.active_samples - last_partial_at >= partial_every
+                        and (partial_task is None or partial_task.done())):
+                    last_partial_at = segmenter.active_samples
+                    partial_task = asyncio.create_task(
+                        send_partial(segment_id, segmenter.current_audio())
+                    )
+
+            elif message.get("text") is not None and is_end_message(message["text"]):
+                audio = segmenter.flush()
+                if audio is not None and len(audio):
+                    await send_final(audio)
+                elif partial_task is not None:
+                    await partial_task
+                await websocket.send_json({"type": "end"})
+                break
+    except WebSocketDisconnect:
+        pass
+    finally:
+        if partial_task is not None and not partial_task.done():
+            partial_task.cancel()
@@ -0,0 +1,121 @@
+"""
+Latency and accuracy drift of the detector backends on a folder of images.
+
+Every backend runs on the same images. The PyTorch detections serve as the
+reference: drift is reported as mAP@0.5 of each backend against them (1.0
+means identical boxes and classes), so no labelled data is needed.
+
+Usage: python -m benchmarks.bench_detector --images data/shelf_images
+           [--backends torch onnx onnx-int8 openvino openvino-int8]
+"""
+import argparse
+import glob
+import os
+import time
+
+import cv2
+import numpy as np
+
+from models.detetor import StoreObjectDetector
+from utils.tracking import iou_matrix
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp")
+
+
+def load_images(folder, limit=None):
+    paths = sorted(
+        p for p in glob.glob(os.path.join(folder, "*")) if p.lower().endswith(IMAGE_EXTENSIONS)
+    )[:limit]
+    return [cv2.imread(p) for p in paths]
+
+
+def average_precision(predictions, references, iou_threshold=0.5):
+    """
+    mAP@iou_threshold over classes of predictions against reference detections.
+    Args:
+        predictions, references: per image lists of detection dicts
+    """
+    classes = {d["class_id"] for dets in references for d in dets}
+    if not classes:
+        return 1.0 if not any(predictions) else 0.0
+
+    aps = []
+    for cls in classes:
+        scored = []  # (confidence, is true positive)
+        total = 0
+        for preds, refs in zip(predictions, references):
+            ref_boxes = np.array([d["bbox"] for d in refs if d["class_id"] == cls]).reshape(-1, 4)
+            total += len(ref_boxes)
+            preds = sorted((d for d in preds if d["class_id"] == cls), key=lambda d: -d["confidence"])
+            if not preds:
+                continue
+            iou = iou_matrix(np.array([d["bbox"] for d in preds]), ref_boxes)
+            used = np.zeros(len(ref_boxes), dtype=bool)
+            for i, det in enumerate(preds):
+                j = int(np.argmax(iou[i])) if len(ref_boxes) else -1
+                hit = j >= 0 and iou[i, j] >= iou_threshold and not used[j]
+                if hit:
+                    used[j] = True
+                scored.append((det["confidence"], hit))
+
+        if not scored:
+            aps.append(0.0)
+            continue
+        scored.sort(key=lambda s: -s[0])
+        hits = np.array([hit for _, hit in scored], dtype=float)
+        tp = np.cumsum(hits)
+        precision = tp / np.arange(1, len(hits) + 1)
+        recall = tp / max(total, 1)
+        # Area under the interpolated precision/recall curve
+        precision = np.maximum.accumulate(precision[::-1])[::-1]
+        recall = np.concatenate([[0.0], recall])
+        aps.append(float(np.sum((recall[1:] - recall[:-1]) * precision)))
+    return float(np.mean(aps))
+
+
+def run(detector, images, conf_threshold, warmup):
+    for image in images[:warmup]:
+        detector.detect_objects(image, conf_threshold)
+    latencies = []
+    detections = []
+    for image in images:
+        start = time.perf_counter()
+        detections.append(detector.detect_objects(image, conf_threshold))
+        latencies.append((time.perf_counter() - start) * 1000)
+    return detections, np.array(latencies)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--images", required=True, help="folder of test images")
+    parser.add_argument("--model", default="yolov8n.pt")
+    parser.add_argument("--backends", nargs="+",
+                        default=["torch", "onnx", "onnx-int8", "openvino", "openvino-int8"])
+    parser.add_argument("--conf", type=float, default=0.3)
+    parser.add_argument("--limit", type=int, default=None, help="use at most this many images")
+    parser.add_argument("--warmup", type=int, default=3)
+    parser.add_argument("--calibration-data", default=None,
+                        help="dataset yaml for OpenVINO INT8 calibration")
+    args = parser.parse_args()
+
+    images = load_images(args.images, args.limit)
+    if not images:
+        parser.error(f"no images found in {args.images}")
+
+    reference, _ = run(StoreObjectDetector(args.model), images, args.conf, args.warmup)
+
+    print(f"{len(images)} images, reference: torch")
+    print(f"{'backend':>14} {'mean ms':>8} {'p50 ms':>8} {'p90 ms':>8} {'fps':>7} {'mAP@0.5':>8}")
+    for name in args.backends:
+        backend, _, quant = name.partition("-")
+        detector = StoreObjectDetector(
+            args.model, backend=backend, int8=quant == "int8", calibration_data=args.calibration_data
+        )
+        detections, latencies = run(detector, images, args.conf, args.warmup)
+        drift = average_precision(detections, reference)
+        print(f"{name:>14} {latencies.mean():>8.1f} {np.percentile(latencies, 50):>8.1f} "
+              f"{np.percentile(latencies, 90):>8.1f} {1000 / latencies.mean():>7.1f} {drift:>8.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""
+Fuzzy product-name lookup: FuzzyNameIndex against difflib.get_close_matches
+(the original IntentParser fallback) on synthetic catalogs
+(benchmarks.synthetic) with typos.
+
+Usage: python -m benchmarks.bench_fuzzy [--sizes 1000 100000] [--aisles 200]
+"""
+import argparse
+import random
+import time
+from difflib import get_close_matches
+
+from benchmarks.synthetic import make_catalog, make_store_map
+from utils.fuzzy import FuzzyNameIndex
+
+
+def add_typo(text, rng):
+    i = rng.randrange(len(text))
+    return text[:i] + text[i + 1:]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--difflib-max", type=int, default=10000,
+                        help="largest catalog to run the difflib baseline on")
+    parser.add_argument("--aisles", type=int, default=200)
+    args = parser.parse_args()
+    store_map = make_store_map(args.aisles, floorplan=False)
+
+    print(f"{'names':>8} {'build s':>8} {'index ms':>9} {'hit rate':>9} {'difflib ms':>11}")
+    for size in args.sizes:
+        catalog = make_catalog(size, store_map)
+        names = [p["name"].lower() for p in catalog]
+
+        start = time.perf_counter()
+        index = FuzzyNameIndex()
+        for p in catalog:
+            index.add(p["product_id"], p["name"])
+        build_s = time.perf_counter() - start
+
+        rng = random.Random(1)
+        queries = [add_typo(rng.choice(names), rng) for _ in range(args.queries)]
+
+        start = time.perf_counter()
+        hits = sum(bool(index.lookup(q, min_score=0.7)) for q in queries)
+        index_ms = (time.perf_counter() - start) / len(queries) * 1000
+
+        difflib = "-"
+        if size <= args.difflib_max:
+            sample = queries[:20]
+            start = time.perf_counter()
+            for q in sample:
+                get_close_matches(q, names, n=1, cutoff=0.7)
+            difflib = f"{(time.perf_counter() - start) / len(sample) * 1000:.2f}"
+        print(f"{size:>8} {build_s:>8.2f} {index_ms:>9.3f} {hits / len(queries):>9.2f} {difflib:>11}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+Compare jump point search with plain 8-connected A* on the floorplans of
+synthetic store maps (benchmarks.synthetic; default 80 aisles, about
+75 m x 87 m, at 25 cm resolution).
+
+Usage: python -m benchmarks.bench_grid [--aisles 80 --resolution 0.25]
+"""
+import argparse
+import heapq
+import random
+import time
+
+from benchmarks.synthetic import make_store_map
+from utils.grid import SQRT2, OccupancyGrid, grid_route, jump_point_search
+
+
+def grid_astar(grid, start, goal):
+    """Baseline: A* expanding every cell, same movement rules as JPS."""
+    cells, stride = grid.cells, grid.stride
+    s, g = grid.flat(start), grid.flat(goal)
+    goal_row, goal_col = divmod(g, stride)
+
+    def h(i):
+        r, c = divmod(i, stride)
+        dr, dc = abs(r - goal_row), abs(c - goal_col)
+        return dr + dc + (SQRT2 - 2) * min(dr, dc)
+
+    moves = [(1, 1.0), (-1, 1.0), (stride, 1.0), (-stride, 1.0)]
+    diagonals = [(dc, dr) for dc in (1, -1) for dr in (stride, -stride)]
+    best = {s: 0.0}
+    closed = set()
+    queue = [(h(s), 0.0, s)]
+    while queue:
+        _, cost, node = heapq.heappop(queue)
+        if node in closed:
+            continue
+        closed.add(node)
+        if node == g:
+            return cost, len(closed)
+        steps = [(node + d, w) for d, w in moves if cells[node + d]]
+        steps += [
+            (node + dc + dr, SQRT2) for dc, dr in diagonals
+            if cells[node + dc + dr] and cells[node + dc] and cells[node + dr]
+        ]
+        for nxt, w in steps:
+            new_cost = cost + w
+            if new_cost < best.get(nxt, float('inf')):
+                best[nxt] = new_cost
+                heapq.heappush(queue, (new_cost + h(nxt), new_cost, nxt))
+    return float('inf'), len(closed)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--aisles", type=int, default=80)
+    parser.add_argument("--resolution", type=float, default=0.25)
+    parser.add_argument("--queries", type=int, default=10)
+    args = parser.parse_args()
+
+    floorplan = make_store_map(args.aisles)["floorplan"]
+    floorplan["resolution"] = args.resolution
+    grid = OccupancyGrid.from_floorplan(floorplan)
+    print(f"grid {grid.width}x{grid.height} cells, {len(floorplan['obstacles'])} obstacles")
+
+    rng = random.Random(1)
+    points = [
+        (rng.uniform(0, floorplan["width"]), rng.uniform(0, floorplan["height"]))
+        for _ in range(args.queries * 2)
+    ]
+    pairs = list(zip(points[::2], points[1::2]))
+
+    astar_total = jps_total = route_total = 0.0
+    waypoint_count = 0
+    for a, b in pairs:
+        start = grid.nearest_walkable(grid.to_cell(a))
+        goal = grid.nearest_walkable(grid.to_cell(b))
+
+        t0 = time.perf_counter()
+        astar_cost, _ = grid_astar(grid, start, goal)
+        t1 = time.perf_counter()
+        _, jps_cost = jump_point_search(grid, start, goal)
+        t2 = time.perf_counter()
+        waypoints, _ = grid_route(grid, a, b)
+        t3 = time.perf_counter()
+
+        assert abs(astar_cost - jps_cost) < 1e-6, (astar_cost, jps_cost)
+        astar_total += t1 - t0
+        jps_total += t2 - t1
+        route_total += t3 - t2
+        waypoint_count += len(waypoints)
+
+    n = len(pairs)
+    print(f"A* {astar_total / n * 1000:.2f} ms/query, "
+          f"JPS {jps_total / n * 1000:.2f} ms/query, "
+          f"JPS + smoothing {route_total / n * 1000:.2f} ms/query, "
+          f"{waypoint_count / n:.1f} waypoints/route")
+
+
+if __name__ == "__main__":
+    main()
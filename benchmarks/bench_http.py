@@ -0,0 +1,231 @@
+"""
+HTTP load test of app.main:app on a synthetic dataset: a weighted mix of
+catalog, recommendation, navigation and NLP requests from a number of
+concurrent closed-loop clients. Reports per-endpoint latency, throughput
+and status codes (429s from full executors included) as a results file.
+
+By default the app runs in process behind httpx's ASGI transport, with its
+data paths pointed at the dataset; --url targets a running server instead
+(start it on the same --data).
+
+Usage: python -m benchmarks.bench_http [--data data/synthetic] [--concurrency 16]
+           [--duration 10] [--output results.json] [--url http://localhost:8000]
+"""
+import argparse
+import asyncio
+import collections
+import json
+import os
+import random
+import tempfile
+import time
+
+import httpx
+
+from benchmarks.results import print_results, save_results, summarize
+from benchmarks.synthetic import ADJECTIVES, CATEGORY_NOUNS, write_dataset
+
+# Default request mix, by relative weight
+MIX = {
+    "product.info": 30,
+    "product.search": 20,
+    "product.location": 10,
+    "recommend.similar": 10,
+    "recommend.by_category": 5,
+    "recommend.for_user": 10,
+    "navigate.path": 10,
+    "nlp.parse": 5,
+}
+
+# Components each kind of request needs; loaded before the clock starts
+COMPONENTS = {
+    "recommend.similar": ["neighbours"],
+    "recommend.for_user": ["personalization"],
+    "navigate.path": ["navigation"],
+    "nlp.parse": ["nlp"],
+}
+
+
+class Workload:
+    """
+    Request factories over the ids in a dataset directory.
+    """
+
+    def __init__(self, data, seed=0):
+        with open(os.path.join(data, "product_db.json")) as f:
+            products = json.load(f)["products"]
+        with open(os.path.join(data, "store_map.json")) as f:
+            store_map = json.load(f)
+        with open(os.path.join(data, "user.json")) as f:
+            users = json.load(f)["users"]
+        self.rng = random.Random(seed)
+        self.product_ids = [p["product_id"] for p in products]
+        self.categories = sorted({p["category"] for p in products})
+        self.locations = [a["id"] for a in store_map["aisles"]] + [s["id"] for s in store_map["shelves"]]
+        self.user_ids = [u["user_id"] for u in users] or ["u0"]
+        self.nouns = [noun for nouns in CATEGORY_NOUNS.values() for noun in nouns]
+
+    def request(self, kind):
+        """(method, path, params, json body) for one request of a kind."""
+        rng = self.rng
+        if kind == "product.info":
+            return "GET", "/product/info", {"product_id": rng.choice(self.product_ids)}, None
+        if kind == "product.search":
+            return "GET", "/product/search", {"query": rng.choice(self.nouns)}, None
+        if kind == "product.location":
+            return "GET", "/product/location", {"product_id": rng.choice(self.product_ids)}, None
+        if kind == "recommend.similar":
+            return "GET", "/recommend/similar", {"product_id": rng.choice(self.product_ids)}, None
+        if kind == "recommend.by_category":
+            return "GET", "/recommend/by_category", {"category": rng.choice(self.categories)}, None
+        if kind == "recommend.for_user":
+            return "GET", "/recommend/for_user", {"user_id": rng.choice(self.user_ids)}, None
+        if kind == "navigate.path":
+            start, end = rng.sample(self.locations, 2)
+            return "GET", "/navigate/path", {"start": start, "end": end}, None
+        if kind == "nlp.parse":
+            query = f"where can i find {rng.choice(ADJECTIVES)} {rng.choice(self.nouns)}"
+            return "POST", "/nlp/parse", None, {"query": query}
+        raise ValueError(f"Unknown request kind {kind}")
+
+
+def in_process_app(data):
+    """
+    Import app.main with its settings pointed at the dataset, and load the
+    components the mix needs. Returns (app, {component: error}).
+    """
+    os.environ["INVENTORY_PATH"] = os.path.join(data, "product_db.json")
+    os.environ["STORE_MAP_PATH"] = os.path.join(data, "store_map.json")
+    os.environ["USER_DATA_PATH"] = os.path.join(data, "user.json")
+    os.environ["NEIGHBOUR_TABLE_PATH"] = os.path.join(data, "neighbours.bin")
+    os.environ["WARMUP_ON_STARTUP"] = "false"
+
+    from app.components import components
+    from app.main import app
+
+    errors = {}
+    for name in ["catalog"] + sorted({c for names in COMPONENTS.values() for c in names}):
+        try:
+            components[name].get()
+        except Exception as exc:
+            errors[name] = repr(exc)
+    return app, errors
+
+
+async def run_load(client, workload, mix, concurrency, duration, max_requests):
+    """
+    Closed-loop clients sending requests until duration seconds pass or
+    max_requests are sent. Returns ([(kind, status, ms)], seconds).
+    """
+    kinds, weights = list(mix), list(mix.values())
+    samples = []
+    deadline = time.perf_counter() + duration
+
+    async def client_loop():
+        while time.perf_counter() < deadline and (not max_requests or len(samples) < max_requests):
+            kind = workload.rng.choices(kinds, weights)[0]
+            method, path, params, body = workload.request(kind)
+            start = time.perf_counter()
+            try:
+                status = (await client.request(method, path, params=params, json=body)).status_code
+            except httpx.HTTPError:
+                status = 0
+            samples.append((kind, status, (time.perf_counter() - start) * 1000))
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client_loop() for _ in range(concurrency)))
+    return samples, time.perf_counter() - start
+
+
+def report(samples, seconds):
+    """
+    Per-kind latency summaries of successful requests, with status counts.
+    """
+    by_kind = collections.defaultdict(list)
+    for kind, status, ms in samples:
+        by_kind[kind].append((status, ms))
+    results = {}
+    for kind, rows in sorted(by_kind.items()):
+        statuses = collections.Counter(str(status) for status, _ in rows)
+        results[f"http.{kind}"] = {
+            **summarize([ms for status, ms in rows if 200 <= status < 400]),
+            "requests": len(rows),
+            "statuses": dict(statuses),
+        }
+    results["http.all"] = {
+        **summarize([ms for _, status, ms in samples if 200 <= status < 400]),
+        "requests": len(samples),
+        "throughput_rps": round(len(samples) / seconds, 1) if seconds else 0.0,
+        "statuses": dict(collections.Counter(str(status) for _, status, _ in samples)),
+    }
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--data", help="dataset directory from benchmarks.synthetic (default: generate one)")
+    parser.add_argument("--products", type=int, default=100000, help="catalog size when generating")
+    parser.add_argument("--aisles", type=int, default=200, help="aisles when generating")
+    parser.add_argument("--users", type=int, default=10000, help="users when generating")
+    parser.add_argument("--url", help="base URL of a running server instead of the in-process app")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds of load")
+    parser.add_argument("--requests", type=int, default=0, help="stop after this many requests")
+    parser.add_argument("--warmup", type=int, default=200, help="untimed requests first")
+    parser.add_argument("--mix", nargs="+", metavar="KIND=WEIGHT",
+                        help=f"request weights (default: {' '.join(f'{k}={w}' for k, w in MIX.items())})")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="results JSON file to write")
+    args = parser.parse_args()
+
+    mix = dict(MIX)
+    if args.mix:
+        mix = {kind: float(weight) for kind, weight in (item.split("=", 1) for item in args.mix)}
+        unknown = set(mix) - set(MIX)
+        if unknown:
+            parser.error(f"unknown request kinds: {', '.join(sorted(unknown))}")
+
+    data = args.data
+    if data is None:
+        if args.url:
+            parser.error("--url needs the --data the server runs on")
+        data = tempfile.mkdtemp(prefix="bench_http_")
+        write_dataset(data, products=args.products, aisles=args.aisles, users=args.users, seed=args.seed)
+        print(f"generated dataset in {data}")
+
+    errors = {}
+    if args.url:
+        transport, base_url = None, args.url
+    else:
+        app, errors = in_process_app(data)
+        transport, base_url = httpx.ASGITransport(app=app), "http://bench"
+    for kind, needs in COMPONENTS.items():
+        failed = [name for name in needs if name in errors]
+        if kind in mix and failed:
+            print(f"skipping {kind}: {failed[0]} did not load: {errors[failed[0]]}")
+            del mix[kind]
+
+    workload = Workload(data, seed=args.seed)
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+
+    async def run():
+        async with httpx.AsyncClient(transport=transport, base_url=base_url, limits=limits, timeout=60) as client:
+            await run_load(client, workload, mix, args.concurrency, float("inf"), args.warmup)
+            return await run_load(client, workload, mix, args.concurrency, args.duration, args.requests)
+
+    samples, seconds = asyncio.run(run())
+    results = report(samples, seconds)
+    print_results(results)
+    print(f"{len(samples)} requests in {seconds:.1f} s: {results['http.all']['throughput_rps']} req/s")
+
+    params = {**vars(args), "mix": mix, "data": data}
+    if not args.url:
+        from app.executors import executor_stats
+
+        params["component_errors"] = errors
+        params["executors"] = executor_stats()
+    save_results(args.output, "http", params, results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+"""
+Checkout contention: many threads reserving random baskets at once.
+
+Compares InventoryAPI.reserve (striped locks, snapshot reads) with a
+baseline that serializes every basket behind one global lock, as
+update_stock used to. Reader threads call get_product meanwhile. After
+each run, the stock taken must equal the reserved quantities.
+
+--io-us adds a blocking pause per updated item inside the critical
+section, standing in for write-through persistence. Without it, CPython's
+GIL already serializes the in-memory work, and the extra locks and
+snapshot copies make the striped version slower per basket.
+
+Products come from benchmarks.synthetic, restocked to --stock.
+
+Usage: python -m benchmarks.bench_inventory [--threads 1 8 32] [--products 5000]
+"""
+import argparse
+import random
+import threading
+import time
+
+import numpy as np
+
+from benchmarks.synthetic import make_catalog, make_store_map
+from utils.inventory import InventoryAPI, ReservationError
+
+
+class GlobalLockInventory:
+    """Baseline: mutable dicts and one lock around every stock change."""
+
+    def __init__(self, products, io_seconds=0.0):
+        self.products = {p["product_id"]: dict(p) for p in products}
+        self.lock = threading.Lock()
+        self.io_seconds = io_seconds
+
+    def get_product(self, product_id):
+        with self.lock:
+            product = self.products.get(product_id)
+            return dict(product) if product else None
+
+    def reserve(self, items):
+        with self.lock:
+            shortages = {
+                pid: self.products[pid]["stock_quantity"] if pid in self.products else None
+                for pid, qty in items.items()
+                if pid not in self.products or self.products[pid]["stock_quantity"] < qty
+            }
+            if shortages:
+                raise ReservationError(shortages)
+            for pid, qty in items.items():
+                self.products[pid]["stock_quantity"] -= qty
+                if self.io_seconds:
+                    time.sleep(self.io_seconds)
+            return {pid: self.products[pid]["stock_quantity"] for pid in items}
+
+
+class StripedInventory(InventoryAPI):
+    """InventoryAPI with the same simulated per-item I/O."""
+
+    def __init__(self, products, io_seconds=0.0):
+        self.io_seconds = io_seconds
+        super().__init__(products)
+
+    def _set_stock(self, product_id, stock):
+        super()._set_stock(product_id, stock)
+        if self.io_seconds:
+            time.sleep(self.io_seconds)
+
+
+def make_baskets(n_products, count, seed):
+    """Baskets of 2-8 items, skewed towards popular products like a real store."""
+    rng = np.random.default_rng(seed)
+    popularity = 1.0 / np.arange(1, n_products + 1)
+    popularity /= popularity.sum()
+    baskets = []
+    for size in rng.integers(2, 9, size=count):
+        ids = rng.choice(n_products, size=size, replace=False, p=popularity)
+        baskets.append({f"p{i}": int(rng.integers(1, 3)) for i in ids})
+    return baskets
+
+
+def run(inventory, threads, baskets_per_thread, n_products, readers):
+    latencies = [[] for _ in range(threads)]
+    taken = [dict() for _ in range(threads)]
+    failures = [0] * threads
+    spans = [None] * threads
+    start_gate = threading.Barrier(threads + readers + 1)
+    stop_readers = threading.Event()
+
+    def checkout(t):
+        baskets = make_baskets(n_products, baskets_per_thread, seed=t)
+        start_gate.wait()
+        began = time.perf_counter()
+        for basket in baskets:
+            start = time.perf_counter()
+            try:
+                inventory.reserve(basket)
+            except ReservationError:
+                failures[t] += 1
+            else:
+                for pid, qty in basket.items():
+                    taken[t][pid] = taken[t].get(pid, 0) + qty
+            latencies[t].append(time.perf_counter() - start)
+        spans[t] = (began, time.perf_counter())
+
+    def browse(r):
+        rng = random.Random(1000 + r)
+        start_gate.wait()
+        while not stop_readers.is_set():
+            for _ in range(20):
+                inventory.get_product(f"p{rng.randrange(n_products)}")
+            time.sleep(0.0005)
+
+    workers = [threading.Thread(target=checkout, args=(t,)) for t in range(threads)]
+    browsers = [threading.Thread(target=browse, args=(r,)) for r in range(readers)]
+    for thread in workers + browsers:
+        thread.start()
+    start_gate.wait()
+    for thread in workers:
+        thread.join()
+    elapsed = max(end for _, end in spans) - min(start for start, _ in spans)
+    stop_readers.set()
+    for thread in browsers:
+        thread.join()
+
+    all_latencies = np.concatenate([np.array(l) for l in latencies]) * 1000
+    total_taken = {}
+    for t in taken:
+        for pid, qty in t.items():
+            total_taken[pid] = total_taken.get(pid, 0) + qty
+    return elapsed, all_latencies, sum(failures), total_taken
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--threads", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--products", type=int, default=5000)
+    parser.add_argument("--baskets", type=int, default=2000, help="baskets per thread")
+    parser.add_argument("--stock", type=int, default=50000)
+    parser.add_argument("--aisles", type=int, default=200)
+    parser.add_argument("--readers", type=int, default=2, help="threads calling get_product meanwhile")
+    parser.add_argument("--io-us", type=float, default=0.0,
+                        help="simulated blocking I/O per updated item, in microseconds")
+    args = parser.parse_args()
+
+    products = make_catalog(args.products, make_store_map(args.aisles, floorplan=False))
+    # Deep enough that baskets rarely run out during a run
+    rng = random.Random(0)
+    for product in products:
+        product["stock_quantity"] = rng.randint(args.stock // 2, args.stock)
+    initial = {p["product_id"]: p["stock_quantity"] for p in products}
+
+    print(f"{'impl':>8} {'threads':>7} {'baskets/s':>10} {'p50 us':>8} {'p99 us':>8} {'failed':>7} {'stock ok':>8}")
+    for threads in args.threads:
+        for name, factory in (("global", GlobalLockInventory), ("striped", StripedInventory)):
+            inventory = factory(products, args.io_us / 1e6)
+            elapsed, latencies, failed, taken = run(
+                inventory, threads, args.baskets, args.products, args.readers
+            )
+            consistent = all(
+                initial[pid] - inventory.get_product(pid)["stock_quantity"] == taken.get(pid, 0)
+                for pid in initial
+            )
+            print(f"{name:>8} {threads:>7} {threads * args.baskets / elapsed:>10.0f} "
+                  f"{np.percentile(latencies, 50) * 1000:>8.1f} {np.percentile(latencies, 99) * 1000:>8.1f} "
+                  f"{failed:>7} {str(consistent):>8}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+"""
+Microbenchmarks of the hot paths on a synthetic dataset: catalog search,
+A* routing, intent parsing and content-based recommendations. Writes a
+results file that `python -m benchmarks.results` can compare.
+
+Usage: python -m benchmarks.bench_micro [--products 100000] [--aisles 200]
+           [--queries 2000] [--output results.json]
+"""
+import argparse
+import random
+import time
+
+from benchmarks.results import print_results, save_results, summarize
+from benchmarks.synthetic import ADJECTIVES, CATEGORY_NOUNS, make_catalog, make_store_map
+from models.recommender import ContentBasedRecommender, ProductFeatureEncoder
+from utils.inventory import InventoryAPI
+from utils.nav import astar
+
+QUERIES = [
+    "i need almond milk", "where can i find bread", "do you have organic apples",
+    "show me gluten free pasta", "looking for smoked salmon and cheese",
+]
+
+
+def timed(fn, args_list):
+    """Per-call latencies (ms) of fn over args_list."""
+    samples = []
+    for args in args_list:
+        start = time.perf_counter()
+        fn(*args)
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+def bench_search(products, rng, queries):
+    inventory = InventoryAPI(products)
+    nouns = [noun for nouns in CATEGORY_NOUNS.values() for noun in nouns]
+    terms = {
+        "word": [(rng.choice(nouns),) for _ in range(queries)],
+        "phrase": [(f"{rng.choice(ADJECTIVES)} {rng.choice(nouns)}",) for _ in range(queries)],
+        "exact": [(rng.choice(products)["name"],) for _ in range(queries)],
+        "miss": [(f"zz{rng.randrange(10**6)}",) for _ in range(queries)],
+    }
+    return {
+        f"search.{kind}": summarize(timed(lambda q: inventory.search_products(q, limit=20), args))
+        for kind, args in terms.items()
+    }
+
+
+def bench_navigation(store_map, rng, queries):
+    # Imported here: the router module reads settings and registers components
+    from app.routers.navigation import StoreNavigation
+
+    start = time.perf_counter()
+    store = StoreNavigation(store_map)
+    build_ms = (time.perf_counter() - start) * 1000
+    nodes = list(store.positions)
+    pairs = [tuple(rng.sample(nodes, 2)) for _ in range(queries)]
+    return {
+        "navigation.build": {**summarize([build_ms]), "nodes": len(nodes)},
+        "navigation.astar": summarize(timed(
+            lambda a, b: astar(store.graph, a, b, store.positions), pairs
+        )),
+        "navigation.route": summarize(timed(store.planner.route, pairs)),
+    }
+
+
+def bench_recommender(products, rng, queries):
+    start = time.perf_counter()
+    features = ProductFeatureEncoder(products).encode_all()
+    recommender = ContentBasedRecommender(features, [p["name"] for p in products])
+    build_ms = (time.perf_counter() - start) * 1000
+    names = [(rng.choice(products)["name"],) for _ in range(queries)]
+    return {
+        "recommender.build": summarize([build_ms]),
+        "recommender.recommend": summarize(timed(lambda name: recommender.recommend(name, top_k=10), names)),
+    }
+
+
+def bench_nlp(products, rng, queries, model_name):
+    try:
+        from models.nlp import IntentParser
+
+        parser = IntentParser(catalog=InventoryAPI(products), model_name=model_name, trimmed=True)
+    except (ImportError, OSError) as exc:
+        # spaCy or its model is not installed here
+        return {"nlp.parse": {"skipped": str(exc).splitlines()[0]}}
+    texts = [(rng.choice(QUERIES),) for _ in range(queries)]
+    # Exact catalog names, which the fast path answers without spaCy
+    exact = [(f"where can i find {rng.choice(products)['name']}",) for _ in range(queries)]
+    return {
+        "nlp.parse": summarize(timed(parser.parse, texts)),
+        "nlp.parse_exact": summarize(timed(parser.parse, exact)),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--products", type=int, default=100000)
+    parser.add_argument("--aisles", type=int, default=200)
+    parser.add_argument("--shelves-per-aisle", type=int, default=4)
+    parser.add_argument("--queries", type=int, default=2000, help="timed calls per case")
+    parser.add_argument("--nlp-model", default="en_core_web_sm")
+    parser.add_argument("--only", nargs="+", choices=["search", "navigation", "recommender", "nlp"])
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="results JSON file to write")
+    args = parser.parse_args()
+
+    store_map = make_store_map(args.aisles, args.shelves_per_aisle)
+    products = make_catalog(args.products, store_map, seed=args.seed)
+    rng = random.Random(args.seed)
+
+    suites = {
+        "search": lambda: bench_search(products, rng, args.queries),
+        "navigation": lambda: bench_navigation(store_map, rng, args.queries),
+        "recommender": lambda: bench_recommender(products, rng, args.queries),
+        "nlp": lambda: bench_nlp(products, rng, args.queries, args.nlp_model),
+    }
+    results = {}
+    for name, run in suites.items():
+        if not args.only or name in args.only:
+            results.update(run())
+
+    print_results(results)
+    save_results(args.output, "micro", vars(args), results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""
+Compare the original path-copying A* with parent-pointer A* on a
+dict Graph and on a CSRGraph, over synthetic store maps
+(benchmarks.synthetic).
+
+Usage: python -m benchmarks.bench_nav [--sizes 10000 50000 100000]
+"""
+import argparse
+import heapq
+import random
+import time
+
+from benchmarks.synthetic import AISLE_SPACING_X, AISLE_SPACING_Y, make_store_map
+from utils.nav import CSRGraph, Graph, astar, heuristic
+
+
+def store_graph(num_nodes, shelves_per_aisle=4, seed=0):
+    """
+    Routing graph over a benchmarks.synthetic store map with about
+    num_nodes aisles and shelves, returned as (Graph, positions). Shelves
+    link to their aisle and each aisle to its row and column neighbours,
+    at up to twice the Manhattan distance so routes are not all ties.
+    """
+    rng = random.Random(seed)
+    n_aisles = max(1, num_nodes // (shelves_per_aisle + 1))
+    store_map = make_store_map(n_aisles, shelves_per_aisle, floorplan=False)
+    graph = Graph()
+    positions = {}
+    aisle_at = {}
+    for node in store_map["aisles"] + store_map["shelves"]:
+        positions[node["id"]] = (node["coordinates"]["x"], node["coordinates"]["y"])
+        graph.add_node(node["id"])
+    for aisle in store_map["aisles"]:
+        aisle_at[positions[aisle["id"]]] = aisle["id"]
+    for shelf in store_map["shelves"]:
+        graph.add_edge(shelf["id"], shelf["aisle_id"],
+                       cost=heuristic(positions[shelf["id"]], positions[shelf["aisle_id"]]))
+    for (x, y), aisle_id in aisle_at.items():
+        for neighbour in ((x + AISLE_SPACING_X, y), (x, y + AISLE_SPACING_Y)):
+            if neighbour in aisle_at:
+                graph.add_edge(aisle_id, aisle_at[neighbour],
+                               cost=heuristic((x, y), neighbour) * (1 + rng.random()))
+    return graph, positions
+
+
+def legacy_astar(graph, start, goal, positions):
+    """The original implementation, copying the path on every pop."""
+    queue = [(0 + heuristic(positions[start], positions[goal]), 0, start, [])]
+    visited = set()
+    while queue:
+        (est_total_cost, cost_so_far, node, path) = heapq.heappop(queue)
+        if node in visited:
+            continue
+        path = path + [node]
+        visited.add(node)
+        if node == goal:
+            return path, cost_so_far
+        for neighbor, weight in graph.edges.get(node, []):
+            if neighbor not in visited:
+                new_cost = cost_so_far + weight
+                est = new_cost + heuristic(positions[neighbor], positions[goal])
+                heapq.heappush(queue, (est, new_cost, neighbor, path))
+    return None, float('inf')
+
+
+def time_queries(fn, pairs):
+    start = time.perf_counter()
+    for a, b in pairs:
+        fn(a, b)
+    return (time.perf_counter() - start) / len(pairs) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 50000, 100000])
+    parser.add_argument("--queries", type=int, default=10)
+    args = parser.parse_args()
+
+    print(f"{'nodes':>8} {'legacy ms':>10} {'dict ms':>10} {'csr ms':>10} {'csr build ms':>13}")
+    for size in args.sizes:
+        graph, positions = store_graph(size)
+        rng = random.Random(1)
+        nodes = sorted(graph.nodes)
+        pairs = [(rng.choice(nodes), rng.choice(nodes)) for _ in range(args.queries)]
+
+        start = time.perf_counter()
+        csr = CSRGraph.from_graph(graph, positions)
+        csr.search_tables()
+        build_ms = (time.perf_counter() - start) * 1000
+
+        legacy_ms = time_queries(lambda a, b: legacy_astar(graph, a, b, positions), pairs)
+        dict_ms = time_queries(lambda a, b: astar(graph, a, b, positions), pairs)
+        csr_ms = time_queries(lambda a, b: astar(csr, a, b, positions), pairs)
+        print(f"{len(nodes):>8} {legacy_ms:>10.2f} {dict_ms:>10.2f} {csr_ms:>10.2f} {build_ms:>13.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+Bulk load, purchase recording and /recommend/for_user latency of the
+co-occurrence recommender on a synthetic catalog and user base
+(benchmarks.synthetic) with skewed (few bestsellers, long tail) purchases.
+
+Usage: python -m benchmarks.bench_personalized [--skus 100000] [--users 1000000] [--aisles 200]
+"""
+import argparse
+import random
+import time
+
+import numpy as np
+
+from benchmarks.synthetic import iter_users, make_catalog, make_store_map
+from models.recommender import PurchaseRecommender
+
+
+def percentiles(samples_ms):
+    samples = np.array(samples_ms)
+    return f"p50 {np.percentile(samples, 50):.2f} ms, p99 {np.percentile(samples, 99):.2f} ms"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--skus", type=int, default=100000)
+    parser.add_argument("--users", type=int, default=200000)
+    parser.add_argument("--items", type=int, default=20, help="mean purchases per user")
+    parser.add_argument("--queries", type=int, default=2000)
+    parser.add_argument("--purchases", type=int, default=20000)
+    parser.add_argument("--window", type=int, default=50)
+    parser.add_argument("--neighbours", type=int, default=200)
+    parser.add_argument("--aisles", type=int, default=200)
+    args = parser.parse_args()
+    products = make_catalog(args.skus, make_store_map(args.aisles, floorplan=False))
+
+    recommender = PurchaseRecommender(window=args.window, max_neighbours=args.neighbours)
+    start = time.perf_counter()
+    for product in products:
+        recommender.add_product(product)
+    print(f"indexed {args.skus} products in {time.perf_counter() - start:.2f} s")
+
+    # Only the purchased ids are kept, not every user dict
+    histories = []
+    for user in iter_users(args.users, products, args.items):
+        recommender.set_preferences(user["user_id"], user["preferences"])
+        histories.append((user["user_id"], [p["product_id"] for p in user["past_purchases"]]))
+
+    start = time.perf_counter()
+    recommender.add_histories(histories)
+    stats = recommender.stats()
+    matrix_mb = (recommender._base.data.nbytes + recommender._base.indices.nbytes
+                 + recommender._base.indptr.nbytes) / 2**20
+    print(f"loaded {args.users} users in {time.perf_counter() - start:.2f} s, "
+          f"{stats['cooccurrence_entries']} entries ({matrix_mb:.0f} MB)")
+
+    rng = random.Random(1)
+    latencies = []
+    for _ in range(args.queries):
+        user_id = f"u{rng.randrange(args.users)}"
+        t = time.perf_counter()
+        recommender.recommend(user_id, k=10)
+        latencies.append((time.perf_counter() - t) * 1000)
+    print(f"recommend (k=10): {percentiles(latencies)}")
+
+    latencies = []
+    for _ in range(args.purchases):
+        user_id = f"u{rng.randrange(args.users)}"
+        t = time.perf_counter()
+        recommender.record_purchase(user_id, [f"p{rng.randrange(args.skus)}"])
+        latencies.append((time.perf_counter() - t) * 1000)
+    print(f"record_purchase: {percentiles(latencies)}, "
+          f"{recommender.stats()['pending_entries']} increments pending")
+
+    start = time.perf_counter()
+    recommender.compact()
+    print(f"merge into matrix: {(time.perf_counter() - start) * 1000:.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+Memory and latency of the sparse encoder / top-k recommender on synthetic
+catalogs, against the original dense N x N cosine matrix where it fits.
+
+Usage: python -m benchmarks.bench_recommender [--sizes 10000 100000 1000000]
+"""
+import argparse
+import random
+import time
+import tracemalloc
+
+import numpy as np
+
+from models.recommender import ContentBasedRecommender, ProductFeatureEncoder
+
+CATEGORIES = ["Dairy", "Bakery", "Beverages", "Produce", "Snacks", "Frozen Foods",
+              "Pantry", "Meat", "Seafood", "Household", "Personal Care", "Baby"]
+DIET_TAGS = ["vegan", "vegetarian", "gluten-free", "nut-free", "organic", "keto",
+             "dairy-free", "low-sugar", "halal", "kosher"]
+
+
+def make_products(n, seed=0):
+    rng = random.Random(seed)
+    aisles = [f"A{i}" for i in range(1, 61)]
+    return [
+        {
+            "product_id": f"p{i}",
+            "name": f"Product {i}",
+            "category": rng.choice(CATEGORIES),
+            "aisle_id": rng.choice(aisles),
+            "diet_tags": rng.sample(DIET_TAGS, rng.randint(0, 3)),
+            "price": round(rng.uniform(0.5, 10), 2),
+        }
+        for i in range(n)
+    ]
+
+
+def measure(fn):
+    """Run fn, returning (result, seconds, peak traced MB)."""
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, elapsed, peak / 2**20
+
+
+def legacy_build(products):
+    """The original path: per-product dense vectors and a dense N x N cosine matrix."""
+    encoder = ProductFeatureEncoder(products)
+    features = np.array([encoder.encode(p) for p in products])
+    normed = features / np.linalg.norm(features, axis=1, keepdims=True)
+    return normed @ normed.T
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000, 1000000])
+    parser.add_argument("--queries", type=int, default=20)
+    parser.add_argument("--legacy-max", type=int, default=10000,
+                        help="largest catalog to run the dense N x N baseline on")
+    args = parser.parse_args()
+
+    print(f"{'products':>9} {'encode s':>9} {'build MB':>9} {'query ms':>9} {'legacy s':>9} {'legacy MB':>10}")
+    for n in args.sizes:
+        products = make_products(n)
+        names = [p["name"] for p in products]
+
+        features, encode_s, _ = measure(lambda: ProductFeatureEncoder(products).encode_all())
+        recommender, _, build_mb = measure(lambda: ContentBasedRecommender(features, names))
+
+        rng = random.Random(1)
+        queries = [rng.choice(names) for _ in range(args.queries)]
+        start = time.perf_counter()
+        for q in queries:
+            recommender.recommend(q, top_k=5)
+        query_ms = (time.perf_counter() - start) / len(queries) * 1000
+
+        legacy = f"{'-':>9} {'-':>10}"
+        if n <= args.legacy_max:
+            _, legacy_s, legacy_mb = measure(lambda: legacy_build(products))
+            legacy = f"{legacy_s:>9.2f} {legacy_mb:>10.1f}"
+        print(f"{n:>9} {encode_s:>9.2f} {build_mb:>9.1f} {query_ms:>9.2f} {legacy}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+"""
+Compare InventoryAPI.search_products (n-gram index) with the old
+linear substring scan on synthetic catalogs (benchmarks.synthetic).
+
+Usage: python -m benchmarks.bench_search [--sizes 1000 20000 200000] [--aisles 200]
+"""
+import argparse
+import time
+
+from benchmarks.synthetic import make_catalog, make_store_map
+from utils.inventory import InventoryAPI
+
+QUERIES = ["milk", "almond milk", "crack", "greek yogurt", "sea", "pasta", "zzz"]
+
+
+def linear_search(products, query):
+    """The original O(catalog) scan, kept here as the baseline."""
+    q = query.lower()
+    return [p for p in products.values() if q in p['name'].lower()]
+
+
+def time_it(fn, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 20000, 200000])
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--limit", type=int, default=20)
+    parser.add_argument("--aisles", type=int, default=200)
+    args = parser.parse_args()
+    store_map = make_store_map(args.aisles, floorplan=False)
+
+    print(f"{'size':>8} {'query':>14} {'scan ms':>9} {'index ms':>9} {'hits':>7}")
+    for size in args.sizes:
+        catalog = make_catalog(size, store_map)
+        start = time.perf_counter()
+        api = InventoryAPI(catalog)
+        build_ms = (time.perf_counter() - start) * 1000
+        print(f"{size:>8} index build: {build_ms:.1f} ms")
+
+        for query in QUERIES:
+            scan_ms = time_it(lambda: linear_search(api.products, query), args.repeat)
+            index_ms = time_it(lambda: api.search_products(query, limit=args.limit), args.repeat)
+            hits = len(linear_search(api.products, query))
+            print(f"{size:>8} {query:>14} {scan_ms:>9.3f} {index_ms:>9.3f} {hits:>7}")
+
+
+if __name__ == "__main__":
+    main()
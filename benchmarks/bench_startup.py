@@ -0,0 +1,94 @@
+"""
+Startup report: where the time goes when importing the app.
+
+Runs `python -X importtime -c "import app.main"` in a fresh interpreter and
+prints the slowest modules by cumulative import time. With --serve it also
+starts uvicorn and measures how long until /health and /ready answer.
+
+Usage: python -m benchmarks.bench_startup [--top 25] [--serve]
+"""
+import argparse
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+
+
+def import_times(module):
+    """
+    [(cumulative us, self us, module name)] from -X importtime, and the wall
+    time of the import in seconds.
+    """
+    start = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True
+    )
+    elapsed = time.perf_counter() - start
+    if proc.returncode != 0:
+        sys.exit(f"import {module} failed:\n{proc.stderr[-2000:]}")
+
+    rows = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        rows.append((int(cumulative_us), int(self_us), name.rstrip()))
+    return rows, elapsed
+
+
+def wait_for(url, timeout):
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        try:
+            with urllib.request.urlopen(url, timeout=1) as response:
+                if response.status == 200:
+                    return True
+        except (urllib.error.URLError, ConnectionError, OSError):
+            pass
+        time.sleep(0.05)
+    return False
+
+
+def serve_times(port, timeout):
+    """Seconds from launching uvicorn until /health, then /ready, return 200."""
+    start = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port)],
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        base = f"http://127.0.0.1:{port}"
+        health = time.perf_counter() - start if wait_for(f"{base}/health", timeout) else None
+        ready = time.perf_counter() - start if wait_for(f"{base}/ready", timeout) else None
+    finally:
+        proc.terminate()
+        proc.wait()
+    return health, ready
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--module", default="app.main")
+    parser.add_argument("--top", type=int, default=25)
+    parser.add_argument("--serve", action="store_true", help="also time /health and /ready under uvicorn")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--timeout", type=float, default=300.0)
+    args = parser.parse_args()
+
+    rows, elapsed = import_times(args.module)
+    total = max((cumulative for cumulative, _, name in rows if name.strip() == args.module), default=0)
+    print(f"import {args.module}: {total / 1000:.1f} ms in imports, {elapsed:.2f} s wall (incl. interpreter)")
+    print(f"{'cumulative ms':>14} {'self ms':>9}  module")
+    for cumulative, self_us, name in sorted(rows, reverse=True)[:args.top]:
+        print(f"{cumulative / 1000:>14.1f} {self_us / 1000:>9.1f}  {name}")
+
+    if args.serve:
+        health, ready = serve_times(args.port, args.timeout)
+        fmt = lambda t: f"{t:.2f} s" if t is not None else f"> {args.timeout:.0f} s"
+        print(f"\nuvicorn: /health after {fmt(health)}, /ready after {fmt(ready)}")
+
+
+if __name__ == "__main__":
+    main()
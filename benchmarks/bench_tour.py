@@ -0,0 +1,45 @@
+"""
+Time plan_tour (batched Dijkstra + nearest neighbour + 2-opt) for
+shopping lists on generated store maps. Target: < 50 ms for 40 items.
+
+Usage: python -m benchmarks.bench_tour [--nodes 10000] [--items 10 40]
+"""
+import argparse
+import random
+import time
+
+from benchmarks.bench_nav import store_graph
+from utils.nav import CSRGraph, RouteTable
+from utils.tour import plan_tour
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--nodes", type=int, nargs="+", default=[1000, 10000, 50000])
+    parser.add_argument("--items", type=int, nargs="+", default=[10, 40])
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("--table-max-nodes", type=int, default=2000,
+                        help="also time tours served from a RouteTable up to this size")
+    args = parser.parse_args()
+
+    print(f"{'nodes':>8} {'items':>6} {'mode':>9} {'ms/tour':>9} {'cost':>10}")
+    for size in args.nodes:
+        graph, positions = store_graph(size)
+        csr = CSRGraph.from_graph(graph, positions)
+        csr.to_sparse()
+        modes = {"dijkstra": None}
+        if csr.num_nodes <= args.table_max_nodes:
+            modes["table"] = RouteTable(csr)
+        rng = random.Random(2)
+        for items in args.items:
+            lists = [rng.sample(csr.names, items) for _ in range(args.repeat)]
+            for mode, table in modes.items():
+                start = time.perf_counter()
+                for stops in lists:
+                    _, _, cost = plan_tour(csr, stops, table=table)
+                ms = (time.perf_counter() - start) / args.repeat * 1000
+                print(f"{csr.num_nodes:>8} {items:>6} {mode:>9} {ms:>9.2f} {cost:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+"""
+Benchmark results as JSON files that can be kept and diffed between runs.
+
+A results file holds the run environment (commit, Python, machine), the
+parameters, and per-case latency summaries in milliseconds. Compare two
+files to see what got slower:
+
+Usage: python -m benchmarks.results old.json new.json [--threshold 0.10] [--metric p50_ms]
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import subprocess
+import sys
+
+import numpy as np
+
+
+def summarize(samples_ms):
+    """
+    Latency summary of a list of per-operation timings in milliseconds.
+    """
+    samples = np.asarray(samples_ms, dtype=float)
+    if not len(samples):
+        return {"count": 0}
+    p50, p90, p99 = np.percentile(samples, [50, 90, 99])
+    return {
+        "count": int(len(samples)),
+        "mean_ms": round(float(samples.mean()), 4),
+        "p50_ms": round(float(p50), 4),
+        "p90_ms": round(float(p90), 4),
+        "p99_ms": round(float(p99), 4),
+        "max_ms": round(float(samples.max()), 4),
+    }
+
+
+def environment():
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, timeout=10
+        ).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        commit = None
+    return {
+        "commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+    }
+
+
+def save_results(path, suite, params, results):
+    """
+    Write a results file (unless path is empty) and return its document.
+    results maps case name to a summarize() dict, plus any extra fields,
+    or to {"skipped": reason}.
+    """
+    document = {
+        "suite": suite,
+        "environment": environment(),
+        "params": params,
+        "results": results,
+    }
+    if path:
+        with open(path, "w") as f:
+            json.dump(document, f, indent=2, sort_keys=True)
+    return document
+
+
+def print_results(results):
+    for name, summary in results.items():
+        if "skipped" in summary:
+            print(f"{name:40} skipped: {summary['skipped']}")
+        elif summary.get("count"):
+            print(f"{name:40} n={summary['count']:<7} p50 {summary['p50_ms']:9.3f} ms  "
+                  f"p99 {summary['p99_ms']:9.3f} ms")
+
+
+def compare(old, new, metric="p50_ms", threshold=0.10):
+    """
+    [(case, old value, new value, relative change, flag)] for cases in
+    either results document; flag is "slower"/"faster" beyond threshold.
+    """
+    rows = []
+    old_results, new_results = old["results"], new["results"]
+    for name in sorted(set(old_results) | set(new_results)):
+        before = old_results.get(name, {}).get(metric)
+        after = new_results.get(name, {}).get(metric)
+        if before is None or after is None:
+            flag = "new" if name not in old_results else "missing" if name not in new_results else "skipped"
+            rows.append((name, before, after, None, flag))
+            continue
+        change = (after - before) / before if before else 0.0
+        flag = "slower" if change > threshold else "faster" if change < -threshold else ""
+        rows.append((name, before, after, change, flag))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("old", help="baseline results file")
+    parser.add_argument("new", help="results file to compare")
+    parser.add_argument("--metric", default="p50_ms", help="summary field to compare (p50_ms, p99_ms, ...)")
+    parser.add_argument("--threshold", type=float, default=0.10, help="relative change to flag")
+    args = parser.parse_args()
+
+    with open(args.old) as f:
+        old = json.load(f)
+    with open(args.new) as f:
+        new = json.load(f)
+
+    print(f"{old['environment'].get('commit')} -> {new['environment'].get('commit')}, {args.metric}")
+    rows = compare(old, new, args.metric, args.threshold)
+    for name, before, after, change, flag in rows:
+        if change is None:
+            print(f"{name:40} {before!s:>10} {after!s:>10}  {flag}")
+        else:
+            print(f"{name:40} {before:10.3f} {after:10.3f} {change:+8.1%}  {flag}")
+
+    # Non-zero exit on regressions, for use in scripts
+    sys.exit(1 if any(row[4] == "slower" for row in rows) else 0)
+
+
+if __name__ == "__main__":
+    main()
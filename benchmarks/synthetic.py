@@ -0,0 +1,207 @@
+"""
+Synthetic datasets at scale, in the schemas of data/product_db.json,
+data/store_map.json and data/user.json, for benchmarks and load tests.
+
+Aisles are laid out in rows with a shelving block beside each one, shelves
+line the shelving, and every product sits on a shelf of an aisle of its
+category. Purchases are skewed: a few bestsellers, a long tail, and users
+who mostly buy from their favourite categories.
+
+Usage: python -m benchmarks.synthetic --out data/synthetic
+           [--products 100000] [--aisles 200] [--shelves-per-aisle 4] [--users 10000]
+"""
+import argparse
+import datetime
+import json
+import os
+import random
+import time
+
+CATEGORY_NOUNS = {
+    "Dairy": ["milk", "cheese", "yogurt", "butter", "cream"],
+    "Bakery": ["bread", "muffin", "bagel", "croissant", "tortillas"],
+    "Beverages": ["juice", "coffee", "tea", "soda", "water"],
+    "Produce": ["apples", "carrots", "spinach", "bananas", "tomatoes"],
+    "Snacks": ["chips", "crackers", "pretzels", "popcorn", "granola bar"],
+    "Frozen Foods": ["pizza", "ice cream", "peas", "waffles", "dumplings"],
+    "Pantry": ["pasta", "rice", "beans", "soup", "peanut butter"],
+    "Meat": ["chicken", "beef", "sausages", "bacon", "turkey"],
+    "Seafood": ["salmon", "shrimp", "tuna", "cod", "crab"],
+    "Household": ["detergent", "paper towels", "sponges", "trash bags", "dish soap"],
+}
+CATEGORIES = list(CATEGORY_NOUNS)
+ADJECTIVES = ["organic", "whole", "almond", "smoked", "fresh", "frozen", "spicy", "vanilla",
+              "honey", "sea salt", "greek", "roasted", "wild", "dark", "classic", "lite"]
+DIET_TAGS = ["vegan", "vegetarian", "gluten-free", "nut-free", "dairy-free", "organic", "keto"]
+DIETS = [None, None, "vegetarian", "vegan", "gluten-free", "pescatarian"]
+ALLERGIES = ["nuts", "gluten", "dairy", "shellfish"]
+
+# Floorplan layout, in metres: aisle columns and rows, shelving block size
+AISLE_SPACING_X = 6
+AISLE_SPACING_Y = 12
+SHELVING_WIDTH = 3
+SHELVING_HEIGHT = 6
+
+
+def make_store_map(n_aisles, shelves_per_aisle=4, floorplan=True):
+    """
+    Store map with n_aisles aisles (named after categories, round robin)
+    and shelves_per_aisle shelves each; with a floorplan of shelving blocks
+    when floorplan is set.
+    """
+    columns = max(1, int((n_aisles * AISLE_SPACING_Y / AISLE_SPACING_X) ** 0.5))
+    aisles, shelves, obstacles = [], [], []
+    for i in range(n_aisles):
+        x = 3 + (i % columns) * AISLE_SPACING_X
+        y = 3 + (i // columns) * AISLE_SPACING_Y
+        aisle_id = f"A{i + 1}"
+        aisles.append({
+            "id": aisle_id,
+            "name": CATEGORIES[i % len(CATEGORIES)],
+            "coordinates": {"x": x, "y": y}
+        })
+        # Shelving east of the aisle point; shelves face it from the walkway
+        obstacles.append({"type": "shelving", "x": x + 1, "y": y + 1,
+                          "width": SHELVING_WIDTH, "height": SHELVING_HEIGHT})
+        for j in range(shelves_per_aisle):
+            shelves.append({
+                "id": f"S{i * shelves_per_aisle + j + 1}",
+                "aisle_id": aisle_id,
+                "name": f"{aisles[-1]['name']} {j + 1}",
+                "coordinates": {"x": x + 0.5, "y": y + 1 + (j + 0.5) * SHELVING_HEIGHT / shelves_per_aisle}
+            })
+
+    store_map = {"aisles": aisles, "shelves": shelves}
+    if floorplan:
+        rows = -(-n_aisles // columns)
+        store_map["floorplan"] = {
+            "width": 3 + columns * AISLE_SPACING_X,
+            "height": 3 + rows * AISLE_SPACING_Y,
+            "resolution": 0.5,
+            "obstacles": obstacles
+        }
+    return store_map
+
+
+def make_catalog(n, store_map, seed=0):
+    """
+    n products in the product_db.json schema, each on a shelf of an aisle
+    whose name is its category.
+    """
+    rng = random.Random(seed)
+    shelves_by_aisle = {}
+    for shelf in store_map["shelves"]:
+        shelves_by_aisle.setdefault(shelf["aisle_id"], []).append(shelf["id"])
+    aisles_by_category = {}
+    for aisle in store_map["aisles"]:
+        if shelves_by_aisle.get(aisle["id"]):
+            aisles_by_category.setdefault(aisle["name"], []).append(aisle["id"])
+    categories = list(aisles_by_category)
+
+    products = []
+    for i in range(n):
+        category = rng.choice(categories)
+        aisle_id = rng.choice(aisles_by_category[category])
+        noun = rng.choice(CATEGORY_NOUNS.get(category, ["item"]))
+        products.append({
+            "product_id": f"p{i}",
+            "name": f"{rng.choice(ADJECTIVES)} {noun} {rng.randint(1, 999)}".title(),
+            "category": category,
+            "aisle_id": aisle_id,
+            "shelf_id": rng.choice(shelves_by_aisle[aisle_id]),
+            "price": round(rng.uniform(0.5, 20), 2),
+            "barcode": f"{100000000000 + i:013d}",
+            "image_url": f"https://example.com/images/p{i}.jpg",
+            "diet_tags": rng.sample(DIET_TAGS, rng.randint(0, 3)),
+            "allergens": rng.sample(ALLERGIES, rng.choice([0, 0, 1, 1, 2])),
+            "stock_quantity": rng.randint(0, 200)
+        })
+    return products
+
+
+def make_users(n, products, mean_purchases=20, seed=0):
+    """
+    n users in the user.json schema. Each buys mostly from one to three
+    favourite categories, with a bias towards low product numbers
+    (bestsellers), on increasing dates.
+    """
+    return list(iter_users(n, products, mean_purchases, seed))
+
+
+def iter_users(n, products, mean_purchases=20, seed=0):
+    """
+    The users of make_users one at a time, for user bases too large to
+    hold as dicts.
+    """
+    rng = random.Random(seed)
+    by_category = {}
+    for product in products:
+        by_category.setdefault(product["category"], []).append(product["product_id"])
+    categories = list(by_category)
+    start = datetime.date(2025, 1, 1)
+
+    for i in range(n):
+        favourites = rng.sample(categories, min(len(categories), rng.randint(1, 3)))
+        purchases = []
+        day = rng.randint(0, 30)
+        for _ in range(max(1, int(rng.expovariate(1 / mean_purchases)))):
+            pool = by_category[rng.choice(favourites)] if rng.random() < 0.8 else \
+                by_category[rng.choice(categories)]
+            product_id = pool[int(len(pool) * rng.random() ** 3)]
+            day += rng.randint(0, 3)
+            purchases.append({"product_id": product_id,
+                              "date": (start + datetime.timedelta(days=day)).isoformat()})
+        yield {
+            "user_id": f"u{i}",
+            "name": f"User {i}",
+            "past_purchases": purchases,
+            "preferences": {
+                "diet": rng.choice(DIETS),
+                "allergies": rng.sample(ALLERGIES, rng.choice([0, 0, 0, 1, 2])),
+                "favorite_categories": favourites
+            }
+        }
+
+
+def write_dataset(out, products=100000, aisles=200, shelves_per_aisle=4, users=10000,
+                  floorplan=True, seed=0):
+    """
+    Write product_db.json, store_map.json and user.json to directory out.
+    Returns the paths by file kind.
+    """
+    os.makedirs(out, exist_ok=True)
+    store_map = make_store_map(aisles, shelves_per_aisle, floorplan=floorplan)
+    catalog = make_catalog(products, store_map, seed=seed)
+    paths = {
+        "products": os.path.join(out, "product_db.json"),
+        "store_map": os.path.join(out, "store_map.json"),
+        "users": os.path.join(out, "user.json"),
+    }
+    with open(paths["products"], "w") as f:
+        json.dump({"products": catalog}, f)
+    with open(paths["store_map"], "w") as f:
+        json.dump(store_map, f)
+    with open(paths["users"], "w") as f:
+        json.dump({"users": make_users(users, catalog, seed=seed)}, f)
+    return paths
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--out", required=True, help="directory to write the JSON files to")
+    parser.add_argument("--products", type=int, default=100000)
+    parser.add_argument("--aisles", type=int, default=200)
+    parser.add_argument("--shelves-per-aisle", type=int, default=4)
+    parser.add_argument("--users", type=int, default=10000)
+    parser.add_argument("--no-floorplan", action="store_true", help="omit the floorplan grid")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    paths = write_dataset(args.out, args.products, args.aisles, args.shelves_per_aisle, args.users,
+                          floorplan=not args.no_floorplan, seed=args.seed)
+    print(f"Wrote {', '.join(paths.values())} in {time.perf_counter() - start:.1f} s")
+
+
+if __name__ == "__main__":
+    main()
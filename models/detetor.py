@@ -1,19 +1,161 @@
 # detector.py
+import json
+import os
+import queue
+import shutil
+import threading
+import time
+
 from ultralytics import YOLO
 import cv2
 import numpy as np
 
+from utils.tracking import IoUTracker
+
+# "torch" runs the weights through PyTorch; the others run an exported copy
+# on a CPU-optimized runtime (onnxruntime or OpenVINO)
+BACKENDS = ("torch", "onnx", "openvino")
+
+
+def _export_options(model_path, **options):
+    """
+    What an export was made from: the options plus, when the weights are a
+    local file, their size and mtime, so replaced weights are re-exported.
+    """
+    if os.path.exists(model_path):
+        stat = os.stat(model_path)
+        options.update(source_size=stat.st_size, source_mtime=stat.st_mtime)
+    return options
+
+
+def _reusable(path, options):
+    # An export is reused only if its sidecar says it was made the same way
+    try:
+        with open(f"{path}.export.json") as f:
+            return os.path.exists(path) and json.load(f) == options
+    except (OSError, ValueError):
+        return False
+
+
+def _save_export(exported, path, options):
+    """
+    Move a fresh export to path, replacing a stale one, and record its options.
+    """
+    if os.path.abspath(exported) != os.path.abspath(path):
+        if os.path.isdir(path):
+            shutil.rmtree(path)
+        os.replace(exported, path)
+    with open(f"{path}.export.json", "w") as f:
+        json.dump(options, f)
+    return path
+
+
+def export_model(model_path, backend, int8=False, imgsz=640, calibration_data=None):
+    """
+    Export YOLO weights for a CPU runtime, reusing an earlier export.
+    Args:
+        model_path (str): PyTorch weights, e.g. 'yolov8n.pt'
+        backend (str): 'onnx' or 'openvino'
+        int8 (bool): quantize weights to INT8. ONNX uses onnxruntime dynamic
+            quantization; OpenVINO uses post-training quantization
+            calibrated on calibration_data (an ultralytics dataset yaml).
+        imgsz (int): input size the model is exported for
+    Returns:
+        path of the exported model, loadable with YOLO(path)
+    Exports are named after the weights, backend, imgsz and quantization,
+    and each has a "<path>.export.json" sidecar with the options it was
+    made with; one whose sidecar is missing or differs is exported again.
+    """
+    if backend not in BACKENDS or backend == "torch":
+        raise ValueError(f"Cannot export to backend {backend!r}")
+    stem = os.path.splitext(model_path)[0]
+
+    if backend == "onnx":
+        onnx_path = f"{stem}.{imgsz}.onnx"
+        options = _export_options(model_path, backend="onnx", imgsz=imgsz)
+        if not _reusable(onnx_path, options):
+            exported = YOLO(model_path).export(format="onnx", imgsz=imgsz, dynamic=True, simplify=True)
+            _save_export(exported, onnx_path, options)
+        if not int8:
+            return onnx_path
+        int8_path = f"{stem}.{imgsz}.int8.onnx"
+        int8_options = {**options, "int8": "dynamic-quint8"}
+        if not _reusable(int8_path, int8_options):
+            from onnxruntime.quantization import QuantType, quantize_dynamic
+            quantize_dynamic(onnx_path, int8_path, weight_type=QuantType.QUInt8)
+            _save_export(int8_path, int8_path, int8_options)
+        return int8_path
+
+    suffix = "_int8" if int8 else ""
+    target = f"{stem}_{imgsz}{suffix}_openvino_model"
+    options = _export_options(
+        model_path, backend="openvino", imgsz=imgsz, int8=int8,
+        calibration_data=calibration_data if int8 else None
+    )
+    if _reusable(target, options):
+        return target
+    export_options = {"format": "openvino", "imgsz": imgsz, "int8": int8}
+    if int8 and calibration_data:
+        export_options["data"] = calibration_data
+    exported = YOLO(model_path).export(**export_options)
+    return _save_export(exported, target, options)
+
+
+def results_to_detections(result, names, conf_threshold=0.3, scale=1.0):
+    """
+    Convert one ultralytics result into detection dicts.
+    The box tensors are moved to the CPU once for the whole frame and
+    filtered with numpy, instead of one .cpu() call per box.
+    Args:
+        result: ultralytics Results for one image
+        names: class id -> class name
+        conf_threshold (float): confidence score threshold
+        scale (float): factor from the inferred image back to the original
+    """
+    boxes = result.boxes
+    confs = boxes.conf.cpu().numpy()
+    keep = np.flatnonzero(confs >= conf_threshold)
+    if not len(keep):
+        return []
+    xyxy = boxes.xyxy.cpu().numpy()[keep]
+    if scale != 1.0:
+        xyxy = xyxy * scale
+    cls_ids = boxes.cls.cpu().numpy()[keep].astype(int)
+    confs = confs[keep]
+
+    return [
+        {
+            "bbox": bbox,  # [x1, y1, x2, y2]
+            "confidence": conf,
+            "class_id": int(cls_id),
+            "class_name": names[int(cls_id)]
+        }
+        for bbox, conf, cls_id in zip(xyxy, confs, cls_ids)
+    ]
+
+
 class StoreObjectDetector:
-    def __init__(self, model_path='yolov8n.pt', device='cpu'):
+    def __init__(self, model_path='yolov8n.pt', device='cpu', backend='torch', int8=False,
+                 imgsz=640, calibration_data=None):
         """
         Initialize the YOLOv8 detector.
         Args:
             model_path (str): Path to the YOLOv8 model weights.
             device (str): 'cpu' or 'cuda' for GPU.
+            backend (str): 'torch', or 'onnx' / 'openvino' to export the
+                weights (once) and run them on that CPU runtime.
+            int8 (bool): use an INT8-quantized export (non-torch backends).
+            imgsz (int): export input size.
+            calibration_data (str): dataset yaml for OpenVINO INT8 calibration.
         """
-        self.model = YOLO(model_path)
         self.device = device
-        self.model.to(device)
+        self.backend = backend
+        if backend == 'torch':
+            self.model = YOLO(model_path)
+            self.model.to(device)
+        else:
+            exported = export_model(model_path, backend, int8, imgsz, calibration_data)
+            self.model = YOLO(exported, task='detect')
 
     def detect_objects(self, image: np.ndarray, conf_threshold=0.3):
         """
@@ -24,43 +166,238 @@ class StoreObjectDetector:
         Returns:
             List of detected objects with bounding boxes and class names.
         """
-        results = self.model(image)
-
-        detections = []
-        for result in results:
-            for box in result.boxes:
-                conf = box.conf.cpu().numpy()[0]
-                if conf < conf_threshold:
-                    continue
-
-                cls_id = int(box.cls.cpu().numpy()[0])
-                bbox = box.xyxy.cpu().numpy()[0]  # [x1, y1, x2, y2]
-                detections.append({
-                    "bbox": bbox,
-                    "confidence": conf,
-                    "class_id": cls_id,
-                    "class_name": self.model.names[cls_id]
-                })
-        return detections
+        return self.detect_batch([image], conf_threshold)[0]
+
+    def detect_batch(self, images, conf_threshold=0.3, scales=None):
+        """
+        Detect objects in several images with one batched forward pass.
+        Args:
+            images (list of np.ndarray): BGR images
+            conf_threshold (float): confidence score threshold
+            scales (list of float): per image factor mapping boxes back to
+                the original frame, when the images were downscaled
+        Returns:
+            One list of detections per image.
+        """
+        if not images:
+            return []
+        results = self.model(images, device=self.device, verbose=False)
+        scales = scales or [1.0] * len(images)
+        return [
+            results_to_detections(result, self.model.names, conf_threshold, scale)
+            for result, scale in zip(results, scales)
+        ]
+
+
+class FrameItem:
+    """
+    A captured frame moving through DetectionPipeline.
+    """
+
+    __slots__ = ("index", "frame", "detect", "image", "scale", "detections")
+
+    def __init__(self, index, frame, detect):
+        self.index = index
+        self.frame = frame
+        self.detect = detect
+        self.image = None
+        self.scale = 1.0
+        self.detections = None
+
+
+_END = object()
+
+
+class DetectionPipeline:
+    """
+    Streaming detection over a video source with overlapping stages:
+
+        capture -> preprocess -> batched inference -> tracking/postprocess
+
+    Each stage runs in its own thread and hands frames on through bounded
+    queues, so reading the camera, resizing, the model and tracking all
+    work at the same time. Only every `stride`-th frame goes to the model;
+    the stride grows (up to max_skip) while inference falls behind and
+    shrinks again when it keeps up. Frames in between are filled in by an
+    IoUTracker, which also gives objects stable track ids.
+
+    Iterate over the pipeline to get (frame, tracked detections) in order.
+    """
+
+    def __init__(self, detector, source=0, conf_threshold=0.4, batch_size=4, queue_size=8,
+                 max_skip=4, infer_size=640, iou_threshold=0.3, max_age=3):
+        self.detector = detector
+        self.source = source
+        self.conf_threshold = conf_threshold
+        self.batch_size = batch_size
+        self.max_skip = max_skip
+        self.infer_size = infer_size
+        self.tracker = IoUTracker(iou_threshold=iou_threshold, max_age=max_age)
+
+        self.stride = 1
+        self.frames = 0
+        self.detected_frames = 0
+        self._started_at = None
+        self._stop = threading.Event()
+        self._captured = queue.Queue(maxsize=queue_size)
+        self._prepared = queue.Queue(maxsize=queue_size)
+        self._inferred = queue.Queue(maxsize=queue_size)
+        self._threads = []
+
+    def start(self):
+        self._started_at = time.perf_counter()
+        for target in (self._capture, self._preprocess, self._infer):
+            thread = threading.Thread(target=target, daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        return self
+
+    def stop(self):
+        self._stop.set()
+        for thread in self._threads:
+            thread.join(timeout=1.0)
+        self._threads = []
+
+    def _put(self, q, item):
+        # Block while the next stage is busy, but give up once stopped
+        while not self._stop.is_set():
+            try:
+                q.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _get(self, q):
+        while not self._stop.is_set():
+            try:
+                return q.get(timeout=0.1)
+            except queue.Empty:
+                continue
+        return _END
+
+    def _capture(self):
+        cap = self.source if hasattr(self.source, "read") else cv2.VideoCapture(self.source)
+        index = 0
+        since_detect = self.stride
+        try:
+            while not self._stop.is_set():
+                ret, frame = cap.read()
+                if not ret:
+                    break
+                # Adapt the stride to how far behind inference is
+                backlog = self._prepared.qsize() + self._inferred.qsize()
+                if backlog > self._prepared.maxsize // 2:
+                    self.stride = min(self.stride + 1, self.max_skip)
+                elif backlog == 0:
+                    self.stride = max(self.stride - 1, 1)
+
+                detect = since_detect >= self.stride
+                since_detect = 1 if detect else since_detect + 1
+                if not self._put(self._captured, FrameItem(index, frame, detect)):
+                    break
+                index += 1
+        finally:
+            if cap is not self.source:
+                cap.release()
+            self._put(self._captured, _END)
+
+    def _preprocess(self):
+        while True:
+            item = self._get(self._captured)
+            if item is _END:
+                break
+            if item.detect:
+                height, width = item.frame.shape[:2]
+                scale = max(height, width) / self.infer_size
+                if scale > 1.0:
+                    size = (int(round(width / scale)), int(round(height / scale)))
+                    item.image = cv2.resize(item.frame, size, interpolation=cv2.INTER_AREA)
+                    item.scale = scale
+                else:
+                    item.image = item.frame
+            if not self._put(self._prepared, item):
+                return
+        self._put(self._prepared, _END)
+
+    def _infer(self):
+        done = False
+        while not done:
+            item = self._get(self._prepared)
+            if item is _END:
+                break
+            # Take whatever else is already waiting, up to batch_size frames to detect
+            batch = [item]
+            wanted = int(item.detect)
+            while wanted < self.batch_size:
+                try:
+                    item = self._prepared.get_nowait()
+                except queue.Empty:
+                    break
+                if item is _END:
+                    done = True
+                    break
+                batch.append(item)
+                wanted += item.detect
+
+            to_detect = [item for item in batch if item.detect]
+            results = self.detector.detect_batch(
+                [item.image for item in to_detect],
+                self.conf_threshold,
+                [item.scale for item in to_detect]
+            )
+            for item, detections in zip(to_detect, results):
+                item.detections = detections
+                item.image = None
+            for item in batch:
+                if not self._put(self._inferred, item):
+                    return
+        self._put(self._inferred, _END)
+
+    def __iter__(self):
+        if not self._threads:
+            self.start()
+        try:
+            while True:
+                item = self._get(self._inferred)
+                if item is _END:
+                    break
+                if item.detections is not None:
+                    tracks = self.tracker.update(item.detections)
+                    self.detected_frames += 1
+                else:
+                    tracks = self.tracker.predict()
+                self.frames += 1
+                yield item.frame, tracks
+        finally:
+            self.stop()
+
+    def stats(self):
+        elapsed = time.perf_counter() - self._started_at if self._started_at else 0.0
+        return {
+            "frames": self.frames,
+            "detected_frames": self.detected_frames,
+            "stride": self.stride,
+            "fps": self.frames / elapsed if elapsed else 0.0,
+        }
+
 
 if __name__ == '__main__':
     # Quick test with webcam
-    cap = cv2.VideoCapture(0)
     detector = StoreObjectDetector()
+    pipeline = DetectionPipeline(detector, source=0, conf_threshold=0.4)
 
-    while True:
-        ret, frame = cap.read()
-        if not ret:
-            break
-
-        detections = detector.detect_objects(frame, conf_threshold=0.4)
+    for frame, detections in pipeline:
         for det in detections:
             x1, y1, x2, y2 = map(int, det['bbox'])
             cv2.rectangle(frame, (x1,y1), (x2,y2), (0,255,0), 2)
-            cv2.putText(frame, f"{det['class_name']} {det['confidence']:.2f}", (x1, y1-10),
+            cv2.putText(frame, f"#{det['track_id']} {det['class_name']} {det['confidence']:.2f}", (x1, y1-10),
                         cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0,255,0), 2)
+        stats = pipeline.stats()
+        cv2.putText(frame, f"{stats['fps']:.1f} fps, stride {stats['stride']}", (10, 25),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0,0,255), 2)
         cv2.imshow('Store Detector', frame)
         if cv2.waitKey(1) & 0xFF == ord('q'):
             break
-    cap.release()
+    pipeline.stop()
     cv2.destroyAllWindows()
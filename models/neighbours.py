@@ -0,0 +1,94 @@
+"""
+Offline job: precompute every product's top-k content-based neighbours into
+a memory-mappable table (see utils.neighbour_table) for /recommend/similar.
+
+Usage: python -m models.neighbours data/product_db.json data/neighbours.bin [--k 50] [--workers 4]
+"""
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from models.recommender import ContentBasedRecommender, ProductFeatureEncoder
+from utils.neighbour_table import NeighbourTable, allocate
+
+# Per worker process: the recommender and the table being filled
+_worker = {}
+
+
+def _init_worker(features, path, k, block_bytes):
+    _worker["recommender"] = ContentBasedRecommender(features, [])
+    _worker["table"] = NeighbourTable(path, writable=True)
+    _worker["k"] = k
+    _worker["block_bytes"] = block_bytes
+
+
+def _fill_rows(start, stop):
+    """
+    Compute neighbours of products start..stop and write them into the table.
+    """
+    table = _worker["table"]
+    ids, scores = _worker["recommender"].neighbours(
+        _worker["k"], start, stop, block_bytes=_worker["block_bytes"]
+    )
+    table.neighbours[start:stop, :ids.shape[1]] = ids
+    table.scores[start:stop, :scores.shape[1]] = scores
+    table.flush()
+    return stop - start
+
+
+def build_table(products, path, k=50, workers=None, chunk_rows=4096, block_bytes=64 * 2**20):
+    """
+    Write the top-k neighbour table of products to path. Rows are computed in
+    chunks of chunk_rows products across worker processes, which write
+    straight into the file; the finished table replaces path atomically.
+    Product ids must be unique, the table's hash index is keyed by them.
+    Returns the number of products.
+    """
+    workers = workers or os.cpu_count() or 1
+    features = ProductFeatureEncoder(products).encode_all()
+    k = max(0, min(k, len(products) - 1))
+
+    tmp = f"{path}.tmp"
+    allocate(tmp, [p["product_id"] for p in products], k)
+    chunks = [(start, min(start + chunk_rows, len(products)))
+              for start in range(0, len(products), chunk_rows)]
+    try:
+        if workers == 1 or len(chunks) <= 1:
+            _init_worker(features, tmp, k, block_bytes)
+            for start, stop in chunks:
+                _fill_rows(start, stop)
+            _worker.clear()
+        else:
+            with ProcessPoolExecutor(
+                max_workers=workers, initializer=_init_worker, initargs=(features, tmp, k, block_bytes)
+            ) as pool:
+                list(pool.map(_fill_rows, *zip(*chunks)))
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+    return len(products)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("products", help="product_db.json style file")
+    parser.add_argument("output", help="neighbour table to write")
+    parser.add_argument("--k", type=int, default=50, help="neighbours kept per product")
+    parser.add_argument("--workers", type=int, default=None, help="processes (default: all cores)")
+    parser.add_argument("--chunk-rows", type=int, default=4096)
+    args = parser.parse_args()
+
+    with open(args.products, "r") as f:
+        products = json.load(f)["products"]
+
+    start = time.perf_counter()
+    count = build_table(products, args.output, k=args.k, workers=args.workers, chunk_rows=args.chunk_rows)
+    print(f"Wrote neighbours of {count} products to {args.output} in {time.perf_counter() - start:.1f} s")
+
+
+if __name__ == "__main__":
+    main()
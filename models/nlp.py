@@ -1,59 +1,278 @@
+import re
+import threading
+import time
+
 import spacy
 from spacy.matcher import PhraseMatcher
-from difflib import get_close_matches
+from utils.aho_corasick import AhoCorasick
+from utils.fuzzy import FuzzyNameIndex
+from utils.metrics import registry
+
+# Pipeline components parse() never reads. noun_chunks needs the tagger,
+# attribute_ruler and parser; the PhraseMatcher only needs the tokenizer.
+UNUSED_COMPONENTS = ["ner", "lemmatizer"]
+
+# Intent keywords, in priority order, matched anywhere in the lowercased query
+INTENT_KEYWORDS = {
+    "navigate": ["find", "where", "locate", "get"],
+    "recommend": ["recommend", "suggest", "like"],
+    "add_to_cart": ["buy", "add to cart", "purchase"],
+}
+
+# Fast path: queries are split into these tokens and product names are
+# matched as whole token sequences
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+# Words a query may contain besides product names and still be answered
+# without spaCy: function words, request phrasing and intent keywords
+FILLER_WORDS = frozenset("""
+    a an the some any this that these those my me i we you your our it its
+    is are am be do does did can could would will should please s
+    to for of in on at with and or from
+    want need looking look show tell help there here
+    what which how much many aisle store item items
+""".split()) | frozenset(
+    word for keywords in INTENT_KEYWORDS.values() for keyword in keywords for word in keyword.split()
+)
+
+# Time per parse stage: "fast" (the automata), "spacy" (one query through
+# the pipeline), "spacy_batch" (a whole nlp.pipe batch), "matcher" and "fuzzy"
+PARSE_STAGE_SECONDS = registry.histogram(
+    "nlp_parse_stage_seconds", "Time spent in each IntentParser stage", ["stage"]
+)
+
+# Queries per tier that answered them: "fast" ("matched"), or "spacy" with
+# why the fast path could not: "no_entity" (no product name found),
+# "uncovered" (other words left, maybe a misspelt product) or "disabled"
+PARSE_TIERS = registry.counter(
+    "nlp_parse_tier_total", "Queries answered by each IntentParser tier", ["tier", "reason"]
+)
+
+
+def fast_tokens(text):
+    return TOKEN_PATTERN.findall(text.lower())
+
+
+def _intent_automaton():
+    automaton = AhoCorasick()
+    for intent, keywords in INTENT_KEYWORDS.items():
+        for keyword in keywords:
+            automaton.add((intent, keyword), keyword)
+    automaton.compile()
+    return automaton
+
+
+INTENT_AUTOMATON = _intent_automaton()
+
 
 class IntentParser:
-    def __init__(self, product_names=None):
-        self.nlp = spacy.load("en_core_web_sm")
-
-        # Known product names (load dynamically in production)
-        if product_names is None:
-            self.known_products = [
-                "almond milk", "cheddar cheese", "whole wheat bread",
-                "orange juice", "organic apples", "blueberry muffin",
-                "potato chips", "carrot sticks"
-            ]
-        else:
-            self.known_products = product_names
+    def __init__(self, product_names=None, model_name="en_core_web_sm", trimmed=False,
+                 catalog=None, max_edit_distance=2, min_score=0.7, fast_path=True):
+        """
+        product_names: known product names for entity matching
+        model_name: spaCy model to load
+        trimmed: skip loading components parse() does not use
+        catalog: InventoryAPI to take product names from; entities then carry
+            product_ids and follow catalog changes incrementally
+        max_edit_distance, min_score: bounds for fuzzy entity matches
+        fast_path: answer queries made of exact product names and filler
+            words from an Aho-Corasick automaton, without running spaCy
+        """
+        self.nlp = spacy.load(model_name, exclude=UNUSED_COMPONENTS if trimmed else [])
+        self.min_score = min_score
+        self.catalog = catalog
+        self.fast_path = fast_path
+        # Product names as token sequences, for the fast path
+        self.names = AhoCorasick()
 
+        # Entities are keyed by product_id with a catalog, by name otherwise
+        self.entity_index = FuzzyNameIndex(max_distance=max_edit_distance)
         self.matcher = PhraseMatcher(self.nlp.vocab, attr="LOWER")
-        patterns = [self.nlp.make_doc(p) for p in self.known_products]
-        self.matcher.add("PRODUCT", patterns)
+        # Catalog changes arrive on the writer's thread while requests parse
+        # on others: guards the matcher, and keeps it in step with the
+        # entity index and fast-path names
+        self._entities_lock = threading.Lock()
+
+        if catalog is not None:
+            for product_id, name in catalog.iter_names():
+                self.add_product(product_id, name)
+            catalog.add_listener(self._on_catalog_change)
+        else:
+            # Known product names (load dynamically in production)
+            if product_names is None:
+                product_names = [
+                    "almond milk", "cheddar cheese", "whole wheat bread",
+                    "orange juice", "organic apples", "blueberry muffin",
+                    "potato chips", "carrot sticks"
+                ]
+            for name in product_names:
+                self.add_product(FuzzyNameIndex.normalize(name), name)
+        self.names.compile()
+
+    def add_product(self, key, name):
+        """
+        Add or rename one matchable product. The fast path sees it once
+        self.names is recompiled; until then spaCy handles its queries.
+        """
+        pattern = self.nlp.make_doc(name)
+        with self._entities_lock:
+            self.entity_index.add(key, name)
+            if key in self.matcher:
+                self.matcher.remove(key)
+            self.matcher.add(key, [pattern])
+            self.names.add(key, fast_tokens(name))
+
+    def remove_product(self, key):
+        with self._entities_lock:
+            self.entity_index.remove(key)
+            if key in self.matcher:
+                self.matcher.remove(key)
+            self.names.remove(key)
+
+    def _on_catalog_change(self, event, product):
+        if event == "add":
+            self.add_product(product["product_id"], product["name"])
+        elif event == "remove":
+            self.remove_product(product["product_id"])
+        self.names.compile_later()
 
     def detect_intent(self, text):
         """Basic intent detection based on keyword matching"""
-        lowered = text.lower()
-        if any(w in lowered for w in ["find", "where", "locate", "get"]):
-            return "navigate"
-        elif any(w in lowered for w in ["recommend", "suggest", "like"]):
-            return "recommend"
-        elif any(w in lowered for w in ["buy", "add to cart", "purchase"]):
-            return "add_to_cart"
-        return "unknown"
+        found = {intent for _, _, (intent, _) in INTENT_AUTOMATON.find(text.lower())}
+        return next((intent for intent in INTENT_KEYWORDS if intent in found), "unknown")
+
+    def fuzzy_lookup(self, span_text, max_results=1):
+        """Fuzzy match input to known products: list of (key, name, score)"""
+        # The index locks itself, so lookups do not wait on each other
+        return self.entity_index.lookup(span_text, max_results=max_results, min_score=self.min_score)
 
     def fuzzy_match_entity(self, span_text):
         """Fuzzy match input to known products"""
-        matches = get_close_matches(span_text.lower(), self.known_products, n=1, cutoff=0.7)
-        return matches[0] if matches else span_text
+        matches = self.fuzzy_lookup(span_text)
+        return matches[0][1] if matches else span_text
 
     def parse(self, text):
+        result = self.analyze(text)
+        return result["intent"], result["entities"]
+
+    def parse_batch(self, texts, batch_size=64, n_process=1):
+        """
+        Parse many queries with nlp.pipe, which batches the model work.
+        Returns a list of (intent, entities) in input order.
+        """
+        return [
+            (result["intent"], result["entities"])
+            for result in self.analyze_batch(texts, batch_size, n_process)
+        ]
+
+    def analyze(self, text):
+        """
+        Like parse, but returns a dict with intent, entities (product names)
+        and products: [{"product_id", "name", "score"}]. product_id is only
+        set when the parser was built from a catalog.
+        """
+        result = self._try_fast_path(text)
+        if result is not None:
+            return result
+        start = time.perf_counter()
         doc = self.nlp(text)
-        intent = self.detect_intent(text)
+        PARSE_STAGE_SECONDS.observe(time.perf_counter() - start, ("spacy",))
+        return self._parse_doc(doc)
+
+    def analyze_batch(self, texts, batch_size=64, n_process=1):
+        results = [self._try_fast_path(text) for text in texts]
+        rest = [i for i, result in enumerate(results) if result is None]
+        if rest:
+            start = time.perf_counter()
+            docs = list(self.nlp.pipe((texts[i] for i in rest), batch_size=batch_size, n_process=n_process))
+            PARSE_STAGE_SECONDS.observe(time.perf_counter() - start, ("spacy_batch",))
+            for i, doc in zip(rest, docs):
+                results[i] = self._parse_doc(doc)
+        return results
+
+    def _try_fast_path(self, text):
+        """
+        The analyze() result from the fast path, or None if spaCy is needed.
+        """
+        if not self.fast_path:
+            PARSE_TIERS.inc(labels=("spacy", "disabled"))
+            return None
+        start = time.perf_counter()
+        result, reason = self.fast_parse(text)
+        PARSE_STAGE_SECONDS.observe(time.perf_counter() - start, ("fast",))
+        PARSE_TIERS.inc(labels=("fast" if result is not None else "spacy", reason))
+        return result
+
+    def fast_parse(self, text):
+        """
+        Tier one: intent and products from the keyword and product name
+        automata alone, in microseconds. Only answers when product names,
+        filler words and intent keywords account for every word of the
+        query, so the result is what the spaCy path would give; otherwise
+        returns None and the reason ("no_entity" or "uncovered").
+        Returns (result, "matched") on success.
+        """
+        tokens = fast_tokens(text)
+        with self._entities_lock:
+            matches = self.names.find(tokens)
+            names = {key: self.entity_index.term(key) for _, _, key in matches}
+        if not matches:
+            return None, "no_entity"
 
-        # Phrase matcher for known products
-        matches = self.matcher(doc)
-        products = set()
+        covered = [False] * len(tokens)
+        for start, end, _ in matches:
+            covered[start:end] = [True] * (end - start)
+        if any(not hit and token not in FILLER_WORDS for token, hit in zip(tokens, covered)):
+            return None, "uncovered"
 
-        for match_id, start, end in matches:
-            span = doc[start:end]
-            products.add(span.text.lower())
+        products = {}
+        for start, end, key in sorted(matches, key=lambda match: match[:2]):
+            products[key] = (names[key], 1.0)
+        return self._result(self.detect_intent(text), products), "matched"
+
+    def _parse_doc(self, doc):
+        intent = self.detect_intent(doc.text)
+
+        # Phrase matcher for known products (exact, score 1.0)
+        started = time.perf_counter()
+        products = {}
+        with self._entities_lock:
+            for match_id, start, end in self.matcher(doc):
+                key = self.nlp.vocab.strings[match_id]
+                products[key] = (self.entity_index.term(key), 1.0)
+        matched_names = {name for name, _ in products.values()}
+        matched = time.perf_counter()
+        PARSE_STAGE_SECONDS.observe(matched - started, ("matcher",))
 
         # Also try noun chunks (for fuzzy match fallback)
         for chunk in doc.noun_chunks:
-            cleaned = chunk.text.strip().lower()
-            if cleaned not in products:
-                match = self.fuzzy_match_entity(cleaned)
-                if match in self.known_products:
-                    products.add(match)
+            # Drop leading determiners etc. ("the almond milk" -> "almond milk")
+            tokens = list(chunk)
+            while tokens and tokens[0].is_stop:
+                tokens.pop(0)
+            cleaned = " ".join(t.text for t in tokens).strip().lower()
+            if not cleaned or cleaned in matched_names:
+                continue
+            for key, name, score in self.fuzzy_lookup(cleaned):
+                if key not in products:
+                    products[key] = (name, score)
+        PARSE_STAGE_SECONDS.observe(time.perf_counter() - matched, ("fuzzy",))
+        return self._result(intent, products)
 
-        return intent, list(products)
+    def _result(self, intent, products):
+        """
+        analyze() result from the intent and {key: (name, score)} products.
+        """
+        entities = list(dict.fromkeys(name for name, _ in products.values()))
+        return {
+            "intent": intent,
+            "entities": entities,
+            "products": [
+                {
+                    "product_id": key if self.catalog is not None else None,
+                    "name": name,
+                    "score": round(score, 3)
+                }
+                for key, (name, score) in products.items()
+            ]
+        }
@@ -1,4 +1,36 @@
+import threading
+import time
+from array import array
+from itertools import chain
+
 import numpy as np
+from scipy import sparse
+
+from utils.bitsets import BitsetIndex
+from utils.inventory import RECORDED, field_keys
+from utils.metrics import registry
+
+# A new purchase is paired with this many of the user's previous purchases,
+# and recommendations are scored from their last this-many purchases
+HISTORY_WINDOW = 50
+
+# Product tags that fit a diet besides the diet's own tag
+DIET_COMPATIBLE_TAGS = {
+    "vegetarian": ("vegetarian", "vegan"),
+    "pescatarian": ("pescatarian", "vegetarian", "vegan"),
+}
+
+# Diets every product fits
+UNRESTRICTED_DIETS = frozenset(["omnivore", "none", "any"])
+
+# Product fields kept as bitsets for filtering
+FILTER_FIELDS = ("category", "diet_tags", "allergens")
+
+# Time to score one recommend() call, by model ("content" or "cooccurrence")
+SCORING_SECONDS = registry.histogram(
+    "recommender_scoring_seconds", "Time spent scoring recommendations", ["model"]
+)
+
 
 class ProductFeatureEncoder:
     def __init__(self, products):
@@ -12,6 +44,12 @@ class ProductFeatureEncoder:
         self.tag_to_idx = {tag: i for i, tag in enumerate(self.diet_tags)}
         self.aisle_to_idx = {aisle: i for i, aisle in enumerate(self.aisles)}
 
+        # Column offsets of each feature block in the combined vector
+        self.tag_offset = len(self.categories)
+        self.aisle_offset = self.tag_offset + len(self.diet_tags)
+        self.price_col = self.aisle_offset + len(self.aisles)
+        self.num_features = self.price_col + 1
+
     def encode(self, product):
         # One-hot category
         category_vec = np.zeros(len(self.categories))
@@ -35,35 +73,517 @@ class ProductFeatureEncoder:
         return feature_vec
 
     def encode_all(self):
-        features = []
-        for p in self.products:
-            features.append(self.encode(p))
-        return np.array(features)
+        """
+        Encode every product in one pass as a sparse CSR matrix
+        (n_products x num_features), same columns as encode().
+        Feature columns are computed with numpy over whole-catalog code
+        arrays; only reading the product dicts loops in Python.
+        """
+        products = self.products
+        n = len(products)
+        rows = np.arange(n)
+
+        category_to_idx, tag_to_idx, aisle_to_idx = self.category_to_idx, self.tag_to_idx, self.aisle_to_idx
+        categories = np.array([category_to_idx[p['category']] for p in products], dtype=np.int64)
+        aisles = np.array([aisle_to_idx[p['aisle_id']] for p in products], dtype=np.int64) + self.aisle_offset
+        prices = (np.array([p['price'] for p in products], dtype=np.float64) / 10).astype(np.float32)
+
+        # Multi-hot tags: one (row, tag) pair per listed tag; np.unique drops
+        # repeated tags and sorts each row's tags
+        product_tags = [p['diet_tags'] for p in products]
+        counts = np.array([len(t) for t in product_tags], dtype=np.int64)
+        tags = np.array([tag_to_idx[tag] for tag in chain.from_iterable(product_tags)], dtype=np.int64)
+        width = max(len(self.diet_tags), 1)
+        pairs = np.unique(np.repeat(rows, counts) * width + tags)
+        tag_rows, tags = np.divmod(pairs, width)
+
+        # Each row is category, tags, aisle, price: ascending columns, so
+        # every value's position in the CSR arrays follows from the counts
+        indptr = np.zeros(n + 1, dtype=np.int64)
+        np.cumsum(np.bincount(tag_rows, minlength=n) + 3, out=indptr[1:])
+        start, end = indptr[:-1], indptr[1:]
+        indices = np.empty(indptr[-1], dtype=np.int32)
+        data = np.ones(indptr[-1], dtype=np.float32)
+        indices[start] = categories
+        indices[3 * tag_rows + 1 + np.arange(len(tag_rows))] = tags + self.tag_offset
+        indices[end - 2] = aisles
+        indices[end - 1] = self.price_col
+        data[end - 1] = prices
+
+        return sparse.csr_matrix((data, indices, indptr), shape=(n, self.num_features))
+
+
+def normalize_rows(features):
+    """
+    L2-normalize the rows of a dense or sparse matrix, returning float32 CSR,
+    so cosine similarity becomes a plain dot product.
+    """
+    features = sparse.csr_matrix(features, dtype=np.float32)
+    norms = np.sqrt(np.asarray(features.multiply(features).sum(axis=1)).ravel())
+    norms[norms == 0] = 1
+    return sparse.diags(1 / norms).dot(features).tocsr().astype(np.float32)
+
+
+def top_k_indices(scores, k, exclude=None):
+    """
+    Indices of the k highest scores, best first (ties by index),
+    using argpartition instead of a full sort.
+    """
+    if exclude is not None:
+        scores = scores.copy()
+        scores[exclude] = -np.inf
+    k = min(k, len(scores) - (exclude is not None))
+    if k <= 0:
+        return np.empty(0, dtype=np.int64)
+    candidates = np.argpartition(-scores, k - 1)[:k]
+    order = np.lexsort((candidates, -scores[candidates]))
+    return candidates[order]
+
 
 class ContentBasedRecommender:
     def __init__(self, product_features, product_names):
-        from sklearn.metrics.pairwise import cosine_similarity
-        self.product_features = product_features
+        self.product_features = normalize_rows(product_features)
         self.product_names = product_names
         self.product_to_index = {name: i for i, name in enumerate(product_names)}
-        self.similarity_matrix = cosine_similarity(self.product_features)
+        # Transposed copy for fast product-vs-catalog dot products
+        self._features_t = self.product_features.T.tocsr()
+
+    def scores(self, idx):
+        """
+        Cosine similarity of product idx against the whole catalog (dense, length N).
+        The N x N similarity matrix is never built.
+        """
+        row = self.product_features[idx]
+        return np.asarray((row @ self._features_t).todense()).ravel()
 
     def recommend(self, product_name, top_k=5):
         if product_name not in self.product_to_index:
             return []
 
+        start = time.perf_counter()
         idx = self.product_to_index[product_name]
-        similarity_scores = self.similarity_matrix[idx]
-        similar_indices = np.argsort(-similarity_scores)
-
-        recommendations = []
-        for i in similar_indices:
-            if i == idx:
-                continue
-            recommendations.append((self.product_names[i], similarity_scores[i]))
-            if len(recommendations) >= top_k:
+        similarity_scores = self.scores(idx)
+        similar_indices = top_k_indices(similarity_scores, top_k, exclude=idx)
+        SCORING_SECONDS.observe(time.perf_counter() - start, ("content",))
+
+        return [(self.product_names[i], similarity_scores[i]) for i in similar_indices]
+
+    def neighbours(self, k, start=0, stop=None, block_bytes=64 * 2**20):
+        """
+        Top-k neighbours (indices, scores) for products start..stop, computed
+        in row blocks sized so each dense score block stays under block_bytes.
+        Returns int32 (m, k) and float32 (m, k) arrays.
+        """
+        n = self.product_features.shape[0]
+        stop = n if stop is None else stop
+        k = min(k, n - 1)
+        block = max(1, block_bytes // (4 * n))
+
+        ids = np.empty((stop - start, max(k, 0)), dtype=np.int32)
+        sims = np.empty((stop - start, max(k, 0)), dtype=np.float32)
+        if k <= 0:
+            return ids, sims
+        for lo in range(start, stop, block):
+            hi = min(lo + block, stop)
+            scores = (self.product_features[lo:hi] @ self._features_t).toarray()
+            scores[np.arange(hi - lo), np.arange(lo, hi)] = -np.inf
+            part = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+            part_scores = np.take_along_axis(scores, part, axis=1)
+            order = np.lexsort((part, -part_scores), axis=1)
+            ids[lo - start:hi - start] = np.take_along_axis(part, order, axis=1)
+            sims[lo - start:hi - start] = np.take_along_axis(part_scores, order, axis=1)
+        return ids, sims
+
+
+def allergen_names(allergy):
+    """
+    Spellings a product's allergens may record an allergy under:
+    "nuts" -> ("nuts", "nut").
+    """
+    allergy = allergy.strip().lower()
+    singular = allergy[:-1] if allergy.endswith("s") else allergy
+    return tuple(dict.fromkeys([allergy, singular]))
+
+
+def allergy_free_tag(allergy):
+    """
+    Diet tag marking products safe for an allergy: "nuts" -> "nut-free".
+    """
+    return f"{allergen_names(allergy)[-1]}-free"
+
+
+def prune_rows(matrix, k, limit=None):
+    """
+    Cut CSR rows with more than limit (default k) entries down to their k
+    largest (ties by lower column). A limit above k leaves slack, so rows
+    are not re-sorted every time they gain an entry.
+    """
+    lengths = np.diff(matrix.indptr)
+    long_rows = np.flatnonzero(lengths > (k if limit is None else limit))
+    if not len(long_rows):
+        return matrix
+
+    # Positions of the long rows' entries, grouped by row
+    sizes = lengths[long_rows]
+    offsets = np.concatenate([[0], np.cumsum(sizes)[:-1]])
+    entries = np.repeat(matrix.indptr[long_rows] - offsets, sizes) + np.arange(sizes.sum())
+    owner = np.repeat(np.arange(len(long_rows)), sizes)
+    order = np.lexsort((matrix.indices[entries], -matrix.data[entries], owner))
+    rank = np.arange(len(order)) - np.repeat(offsets, sizes)
+
+    keep = np.ones(matrix.nnz, dtype=bool)
+    keep[entries[order][rank >= k]] = False
+    lengths = lengths.copy()
+    lengths[long_rows] = k
+    indptr = np.concatenate([[0], np.cumsum(lengths)])
+    return sparse.csr_matrix((matrix.data[keep], matrix.indices[keep], indptr), shape=matrix.shape)
+
+
+class PurchaseRecommender:
+    """
+    Item-item collaborative filtering on purchase histories.
+
+    C[i, j] counts users who bought both i and j, each purchase being paired
+    with the user's previous `window` distinct purchases. Counts live in a
+    CSR matrix plus a dict of recent increments: recording a purchase only
+    touches the dict, and once it holds compact_threshold entries a
+    background thread merges it into the matrix. A product's row is cut back
+    to its max_neighbours largest counts whenever it grows past twice that,
+    so memory and scoring cost are bounded by the catalog, not by the
+    number of users.
+
+    A user's scores are the summed rows of their recent purchases divided by
+    sqrt(popularity), so bestsellers do not crowd out everything else. Diet,
+    allergy and category filters are packed per-tag bitsets over product
+    indices.
+    """
+
+    def __init__(self, window=HISTORY_WINDOW, max_neighbours=200, compact_threshold=1000000):
+        self.window = window
+        self.max_neighbours = max_neighbours
+        self.compact_threshold = compact_threshold
+
+        self.product_ids = []
+        self.product_index = {}
+        self.bitsets = BitsetIndex()
+        # Number of users who bought each product
+        self.popularity = np.zeros(1024, dtype=np.float32)
+
+        # user_id -> product indices, in first-purchase order
+        self.histories = {}
+        # user_id -> {"diet": ..., "allergies": [...], "favorite_categories": [...]}
+        self.preferences = {}
+
+        self._base = sparse.csr_matrix((0, 0), dtype=np.float32)
+        self._delta = {}    # row -> {column: count}, not merged yet
+        self._delta_size = 0
+        self._merging = {}  # the increments being merged right now
+        self._lock = threading.Lock()
+        self._merge_lock = threading.Lock()
+
+    def _items(self, product_ids):
+        """
+        Indices of product_ids, assigning new ones. Caller holds the lock.
+        """
+        new = [p for p in dict.fromkeys(product_ids) if p not in self.product_index]
+        if new:
+            start = len(self.product_ids)
+            size = len(self.popularity)
+            while size < start + len(new):
+                size *= 2
+            if size > len(self.popularity):
+                popularity = np.zeros(size, dtype=np.float32)
+                popularity[:start] = self.popularity[:start]
+                self.popularity = popularity
+            # Sized before the products become visible to readers
+            self.bitsets.add_many(("active",), range(start, start + len(new)))
+            for i, product_id in enumerate(new, start):
+                self.product_index[product_id] = i
+            self.product_ids.extend(new)
+        return [self.product_index[p] for p in product_ids]
+
+    def add_product(self, product):
+        """
+        Index a product, or re-index a changed one, for filtering.
+        """
+        with self._lock:
+            index = self._items([product["product_id"]])[0]
+            self.bitsets.discard(index)
+            self.bitsets.add(("active",), index)
+            for field in FILTER_FIELDS:
+                for key in field_keys(product, field):
+                    self.bitsets.add((field, key), index)
+
+    def remove_product(self, product_id):
+        """
+        Stop recommending a product; its co-occurrence counts are kept.
+        """
+        with self._lock:
+            index = self.product_index.get(product_id)
+            if index is not None:
+                self.bitsets.discard(index)
+
+    def on_catalog_change(self, event, product):
+        if event == "add":
+            self.add_product(product)
+        elif event == "remove":
+            self.remove_product(product["product_id"])
+
+    def index_catalog(self, catalog):
+        """
+        Index every product of an InventoryAPI from its field indexes,
+        without loading records, and follow later catalog changes.
+        """
+        catalog.add_listener(self.on_catalog_change)
+        with self._lock:
+            self._items(list(catalog.iter_ids()))
+            for field in FILTER_FIELDS:
+                for value, product_ids in catalog.iter_postings(field):
+                    self.bitsets.add_many((field, value), self._items(product_ids))
+
+    def set_preferences(self, user_id, preferences):
+        self.preferences[user_id] = preferences
+
+    def record_purchase(self, user_id, product_ids):
+        """
+        Add purchases to a user's history and update co-occurrence counts.
+        Unknown and already bought products are skipped.
+        Returns the number of purchases recorded.
+        """
+        recorded = 0
+        with self._lock:
+            history = self.histories.get(user_id)
+            if history is None:
+                history = self.histories[user_id] = array("i")
+            for product_id in product_ids:
+                index = self.product_index.get(product_id)
+                if index is None or index in history:
+                    continue
+                for other in history[-self.window:]:
+                    self._increment(index, other)
+                    self._increment(other, index)
+                history.append(index)
+                self.popularity[index] += 1
+                recorded += 1
+            merge = self._delta_size >= self.compact_threshold
+        if merge:
+            threading.Thread(target=self.compact, kwargs={"wait": False}, daemon=True).start()
+        return recorded
+
+    def _increment(self, row, column):
+        counts = self._delta.get(row)
+        if counts is None:
+            counts = self._delta[row] = {}
+        if column in counts:
+            counts[column] += 1
+        else:
+            counts[column] = 1
+            self._delta_size += 1
+
+    def add_histories(self, histories, chunk_pairs=5000000):
+        """
+        Bulk-load (user_id, [product_ids]) histories, oldest purchase first.
+        Same counts as replaying them through record_purchase (up to row
+        pruning), but pairs are built with vectorized passes and merged into
+        the matrix every ~chunk_pairs pairs.
+        """
+        replay = []
+        flat, positions = [], []
+        pairs = 0
+        with self._merge_lock:
+            for user_id, product_ids in histories:
+                if user_id in self.histories:
+                    replay.append((user_id, product_ids))
+                    continue
+                known = [p for p in dict.fromkeys(product_ids) if p in self.product_index]
+                indices = [self.product_index[p] for p in known]
+                with self._lock:
+                    self.histories[user_id] = array("i", indices)
+                flat.extend(indices)
+                positions.extend(range(len(indices)))
+                pairs += len(indices) * min(len(indices), self.window)
+                if pairs >= chunk_pairs:
+                    self._merge_histories(flat, positions)
+                    flat, positions, pairs = [], [], 0
+            if flat:
+                self._merge_histories(flat, positions)
+        for user_id, product_ids in replay:
+            self.record_purchase(user_id, product_ids)
+
+    def _merge_histories(self, flat, positions):
+        # Caller holds _merge_lock. flat: histories back to back, positions:
+        # index of each purchase within its history
+        flat = np.asarray(flat, dtype=np.int64)
+        positions = np.asarray(positions, dtype=np.int64)
+        rows, columns = [], []
+        for distance in range(1, self.window + 1):
+            later = np.flatnonzero(positions >= distance)
+            if not len(later):
                 break
-        return recommendations
+            rows += [flat[later], flat[later - distance]]
+            columns += [flat[later - distance], flat[later]]
+        with self._lock:
+            np.add.at(self.popularity, flat, 1)
+        if rows:
+            rows, columns = np.concatenate(rows), np.concatenate(columns)
+            base = self._merge(rows, columns, np.ones(len(rows), dtype=np.float32))
+            with self._lock:
+                self._base = base
+
+    def _merge(self, rows, columns, counts):
+        """
+        The CSR matrix plus the given entries, with long rows pruned.
+        Caller holds _merge_lock.
+        """
+        n = len(self.product_ids)
+        base = self._base
+        if base.shape[0] < n:
+            padding = np.full(n - base.shape[0], base.indptr[-1], dtype=base.indptr.dtype)
+            base = sparse.csr_matrix(
+                (base.data, base.indices, np.concatenate([base.indptr, padding])), shape=(n, n)
+            )
+        added = sparse.csr_matrix((counts, (rows, columns)), shape=(n, n), dtype=np.float32)
+        return prune_rows((base + added).tocsr(), self.max_neighbours, 2 * self.max_neighbours)
+
+    def compact(self, wait=True):
+        """
+        Merge the recent increments into the CSR matrix. Recommendations keep
+        reading both while this runs. With wait=False, returns at once if
+        another merge is in progress.
+        """
+        if not self._merge_lock.acquire(blocking=wait):
+            return
+        try:
+            with self._lock:
+                delta, self._delta, self._delta_size = self._delta, {}, 0
+                self._merging = delta
+            if not delta:
+                return
+            rows = np.repeat(np.fromiter(delta, dtype=np.int64, count=len(delta)),
+                             [len(counts) for counts in delta.values()])
+            columns = np.fromiter(chain.from_iterable(delta.values()), dtype=np.int64, count=len(rows))
+            counts = np.fromiter(chain.from_iterable(c.values() for c in delta.values()),
+                                 dtype=np.float32, count=len(rows))
+            base = self._merge(rows, columns, counts)
+            with self._lock:
+                self._base = base
+                self._merging = {}
+        finally:
+            self._merge_lock.release()
+
+    def _neighbours(self, rows):
+        """
+        Concatenated (columns, counts) of the co-occurrence rows; columns
+        repeat across rows. Caller holds the lock.
+        """
+        base = self._base
+        columns, counts = [], []
+        for row in rows:
+            if row < base.shape[0]:
+                lo, hi = base.indptr[row], base.indptr[row + 1]
+                columns.append(base.indices[lo:hi])
+                counts.append(base.data[lo:hi])
+            for delta in (self._merging, self._delta):
+                row_counts = delta.get(row)
+                if row_counts:
+                    columns.append(np.fromiter(row_counts, dtype=np.int32, count=len(row_counts)))
+                    counts.append(np.fromiter(row_counts.values(), dtype=np.float32, count=len(row_counts)))
+        if not columns:
+            return np.empty(0, dtype=np.int32), np.empty(0, dtype=np.float32)
+        return np.concatenate(columns), np.concatenate(counts)
+
+    def filter_mask(self, diet=None, allergies=(), n=None):
+        """
+        Boolean mask over product indices: products in the catalog that fit
+        the diet and are known to be free of every allergy. Omnivores, and
+        diets no product is tagged for, are not filtered.
+        A product is known to be free of an allergen when its allergens
+        field does not list it, or, without an allergens field, when it is
+        tagged "<allergen>-free". Products with no allergen data are
+        excluded as soon as an allergy is given.
+        """
+        n = len(self.product_ids) if n is None else n
+        bitsets = self.bitsets
+        mask = bitsets.mask(bitsets.get(("active",)), n)
+        diet = (diet or "").strip().lower()
+        if diet and diet not in UNRESTRICTED_DIETS:
+            tags = DIET_COMPATIBLE_TAGS.get(diet, (diet,))
+            fitting = bitsets.any_of([("diet_tags", tag) for tag in tags])
+            if fitting.any():
+                mask &= bitsets.mask(fitting, n)
+        if allergies:
+            unknown = ~bitsets.get(("allergens", RECORDED))
+        for allergy in allergies:
+            listed = bitsets.any_of([("allergens", name) for name in allergen_names(allergy)])
+            unsafe = listed | (unknown & ~bitsets.get(("diet_tags", allergy_free_tag(allergy))))
+            mask &= ~bitsets.mask(unsafe, n)
+        return mask
+
+    @staticmethod
+    def _popular(mask, k, popularity):
+        candidates = np.flatnonzero(mask)
+        return candidates[top_k_indices(popularity[candidates], k)].tolist()
+
+    def recommend(self, user_id, k=5, diet=None, allergies=None, favorite_categories=None):
+        """
+        Top-k (product_id, score) for a user, best first, never including
+        products they already bought. Preferences default to the stored ones.
+        Co-occurrence picks come first; if there are fewer than k, the most
+        popular fitting products of the favourite categories, then of the
+        whole catalog, fill in with score 0.0.
+        """
+        start = time.perf_counter()
+        preferences = self.preferences.get(user_id, {})
+        if diet is None:
+            diet = preferences.get("diet")
+        if allergies is None:
+            allergies = preferences.get("allergies", ())
+        if favorite_categories is None:
+            favorite_categories = preferences.get("favorite_categories", ())
+
+        with self._lock:
+            n = len(self.product_ids)
+            history = np.array(self.histories.get(user_id, ()), dtype=np.int64)
+            columns, counts = self._neighbours(history[-self.window:].tolist())
+            popularity = self.popularity
+
+        mask = self.filter_mask(diet, allergies, n)
+        mask[history] = False
+
+        picks, scores = [], []
+        keep = mask[columns]
+        if keep.any():
+            items, inverse = np.unique(columns[keep], return_inverse=True)
+            totals = np.bincount(inverse, weights=counts[keep]) / np.sqrt(np.maximum(popularity[items], 1))
+            top = top_k_indices(totals, k)
+            picks, scores = items[top].tolist(), totals[top].tolist()
+            mask[picks] = False
+
+        fallbacks = [mask]
+        if favorite_categories:
+            categories = self.bitsets.any_of([("category", c.lower()) for c in favorite_categories])
+            fallbacks.insert(0, mask & self.bitsets.mask(categories, n))
+        for candidates in fallbacks:
+            need = k - len(picks)
+            if need <= 0:
+                break
+            for index in self._popular(candidates, need, popularity):
+                if mask[index]:
+                    picks.append(index)
+                    scores.append(0.0)
+                    mask[index] = False
+        SCORING_SECONDS.observe(time.perf_counter() - start, ("cooccurrence",))
+        return [(self.product_ids[i], float(score)) for i, score in zip(picks, scores)]
+
+    def stats(self):
+        with self._lock:
+            return {
+                "users": len(self.histories),
+                "products": len(self.product_ids),
+                "cooccurrence_entries": int(self._base.nnz),
+                "pending_entries": self._delta_size,
+            }
+
 
 if __name__ == "__main__":
     import json
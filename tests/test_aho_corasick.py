@@ -0,0 +1,69 @@
+import time
+
+from utils.aho_corasick import AhoCorasick
+
+
+def compiled(patterns):
+    automaton = AhoCorasick()
+    for key, sequence in patterns.items():
+        automaton.add(key, sequence)
+    automaton.compile()
+    return automaton
+
+
+def test_find_reports_overlapping_matches_by_end_position():
+    automaton = compiled({key: key for key in ("he", "she", "his", "hers")})
+
+    assert automaton.find("ushers") == [(1, 4, "she"), (2, 4, "he"), (2, 6, "hers")]
+    assert automaton.find("hishe") == [(0, 3, "his"), (2, 5, "she"), (3, 5, "he")]
+    assert automaton.find("xyz") == []
+
+
+def test_find_reports_the_longest_name_with_the_names_inside_it():
+    automaton = compiled({
+        "milk": ["milk"],
+        "almond milk": ["almond", "milk"],
+        "organic almond milk": ["organic", "almond", "milk"],
+    })
+
+    matches = automaton.find(["where", "is", "organic", "almond", "milk"])
+
+    assert matches == [(2, 5, "organic almond milk"), (3, 5, "almond milk"), (4, 5, "milk")]
+    assert max(matches, key=lambda m: m[1] - m[0])[2] == "organic almond milk"
+
+
+def test_token_patterns_only_match_whole_tokens():
+    tokens = compiled({"milk": ["milk"], "oat milk": ["oat", "milk"]})
+    chars = compiled({"milk": "milk"})
+
+    assert tokens.find(["buttermilk", "please"]) == []
+    assert tokens.find(["goat", "milk"]) == [(1, 2, "milk")]
+    assert chars.find("buttermilk") == [(6, 10, "milk")]
+
+
+def test_changes_show_up_after_compile_later():
+    automaton = compiled({"milk": ["milk"], "bread": ["bread"]})
+    automaton.add("tea", ["tea"])
+    automaton.add("bread", ["rye", "bread"])
+    automaton.remove("milk")
+
+    # Until recompiled: new patterns are missed, stale ones filtered out
+    assert not automaton.up_to_date
+    assert automaton.find(["tea", "milk", "bread"]) == []
+
+    automaton.compile_later()
+    deadline = time.monotonic() + 5
+    while not automaton.up_to_date and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+    assert automaton.up_to_date
+    assert automaton.find(["tea", "milk", "rye", "bread"]) == [(0, 1, "tea"), (2, 4, "bread")]
+
+
+def test_empty_pattern_removes_the_key():
+    automaton = compiled({"milk": ["milk"]})
+    automaton.add("milk", [])
+    automaton.compile()
+
+    assert "milk" not in automaton
+    assert automaton.find(["milk"]) == []
@@ -0,0 +1,153 @@
+import asyncio
+import json
+import os
+from concurrent.futures.process import BrokenProcessPool
+
+import pytest
+
+pytest.importorskip("httpx")  # used by TestClient
+pytest.importorskip("multipart")  # python-multipart, needed by the upload routes
+
+from fastapi import FastAPI  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+
+from app.catalog import inventory, load_products  # noqa: E402
+from app.config import settings  # noqa: E402
+from app.executors import overloaded_response  # noqa: E402
+from app.routers import assistant  # noqa: E402
+from app.routers.navigation import load_navigation, store  # noqa: E402
+from utils.executors import Overloaded  # noqa: E402
+from utils.inventory import InventoryAPI  # noqa: E402
+from utils.speechtotext import InvalidAudio  # noqa: E402
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "data")
+
+PARSED = {
+    "intent": "navigate",
+    "entities": ["almond milk", "cheddar cheese"],
+    "products": [
+        {"product_id": "p100", "name": "almond milk", "score": 1.0},
+        {"product_id": None, "name": "cheddar cheese", "score": 0.9},
+    ],
+}
+
+
+class FakeTranscriber:
+    def __init__(self, result):
+        self.result = result
+
+    async def transcribe(self, data):
+        if isinstance(self.result, Exception):
+            raise self.result
+        return self.result
+
+    def overloaded(self):
+        return False
+
+
+class FakeExecutor:
+    def __init__(self, result):
+        self.result = result
+
+    async def run(self, fn, *args):
+        if isinstance(self.result, Exception):
+            raise self.result
+        return self.result
+
+
+@pytest.fixture
+def voice(monkeypatch):
+    """post(text or exception, parsed or exception, start) -> list of NDJSON lines."""
+    monkeypatch.setattr(inventory, "_value", InventoryAPI(load_products(os.path.join(DATA_DIR, "product_db.json"))))
+    monkeypatch.setattr(inventory, "_loaded", True)
+    monkeypatch.setattr(settings, "STORE_MAP_PATH", os.path.join(DATA_DIR, "store_map.json"))
+    monkeypatch.setattr(store, "_value", load_navigation())
+    monkeypatch.setattr(store, "_loaded", True)
+
+    app = FastAPI()
+    app.add_exception_handler(Overloaded, overloaded_response)
+    app.include_router(assistant.router, prefix="/assistant")
+    client = TestClient(app)
+
+    def post(transcript="where is the almond milk", parsed=PARSED, start=None, data=b"RIFF"):
+        monkeypatch.setattr(assistant, "transcriber", FakeTranscriber(transcript))
+        monkeypatch.setattr(assistant, "nlp_executor", FakeExecutor(parsed))
+        params = {"start": start} if start is not None else {}
+        response = client.post("/assistant/voice", params=params, files={"file": ("q.wav", data)})
+        if response.headers["content-type"] != "application/x-ndjson":
+            return response
+        return [json.loads(line) for line in response.text.splitlines()]
+
+    return post
+
+
+def stages(lines):
+    return [line["stage"] for line in lines]
+
+
+def test_stages_stream_in_order(voice):
+    lines = voice(start="A1")
+
+    assert stages(lines) == ["transcript", "intent", "products", "route", "route", "done"]
+    assert lines[0]["text"] == "where is the almond milk"
+    assert lines[1]["intent"] == "navigate"
+    products = lines[2]["products"]
+    assert [p["product_id"] for p in products] == ["p100", "p101"]
+    assert {line["product_id"] for line in lines[3:5]} == {"p100", "p101"}
+    assert all(line["path"][0] == "A1" for line in lines[3:5])
+    assert [line["ms"] for line in lines] == sorted(line["ms"] for line in lines)
+
+
+def test_routes_are_skipped_without_a_start(voice):
+    assert stages(voice()) == ["transcript", "intent", "products", "done"]
+    assert stages(voice(transcript="  ")) == ["transcript", "done"]
+
+
+def test_failing_stages_end_the_stream_with_an_error_line(voice):
+    (error,) = voice(transcript=InvalidAudio("Could not decode audio"))
+    assert (error["stage"], error["status"]) == ("error", 400)
+
+    lines = voice(parsed=Overloaded("nlp", retry_after=3))
+    assert stages(lines) == ["transcript", "error"]
+    assert (lines[1]["status"], lines[1]["retry_after"]) == (429, 3)
+
+    (error,) = voice(transcript=BrokenProcessPool("worker died"))
+    assert (error["stage"], error["status"]) == ("error", 503)
+
+    lines = voice(parsed=RuntimeError("parser crashed"))
+    assert stages(lines) == ["transcript", "error"]
+    assert lines[1]["status"] == 500 and "parser crashed" in lines[1]["detail"]
+
+
+def test_bad_requests_fail_before_streaming(voice):
+    assert voice(data=b"").status_code == 400
+    assert voice(start="nowhere").status_code == 404
+
+
+def test_disconnect_cancels_pending_routes(voice, monkeypatch):
+    voice()  # loads the fixture's catalog and map
+    cancelled = []
+
+    async def stuck_route(start, product):
+        try:
+            await asyncio.Event().wait()
+        except asyncio.CancelledError:
+            cancelled.append(product["product_id"])
+            raise
+
+    monkeypatch.setattr(assistant, "product_route", stuck_route)
+
+    async def run():
+        stream = assistant.voice_pipeline(b"RIFF", "A1")
+        stages = [json.loads(await stream.__anext__())["stage"] for _ in range(3)]
+        # The client goes away while the routes are computed
+        pending = asyncio.ensure_future(stream.__anext__())
+        await asyncio.sleep(0.05)
+        pending.cancel()
+        await asyncio.gather(pending, return_exceptions=True)
+        await stream.aclose()
+        await asyncio.sleep(0)
+        # Checked before asyncio.run cancels whatever is left
+        return stages, sorted(cancelled)
+
+    assert asyncio.run(run()) == (["transcript", "intent", "products"], ["p100", "p101"])
@@ -0,0 +1,94 @@
+import asyncio
+import os
+import threading
+
+import numpy as np
+
+from utils.audio_cache import AudioBufferCache, TranscriptCache, audio_key
+from utils.transcription import TranscriptionService
+
+
+def test_audio_key_depends_on_content_and_rate():
+    samples = np.ones(100, dtype=np.float32)
+    assert audio_key(b"abc") == audio_key(b"abc")
+    assert audio_key(b"abc") != audio_key(b"abd")
+    assert audio_key(samples, 16000) != audio_key(samples, 8000)
+
+
+def test_transcript_cache_survives_restart(tmp_path):
+    cache = TranscriptCache(maxsize=2, directory=str(tmp_path))
+    cache.put(("h1", "small"), "hello")
+
+    reopened = TranscriptCache(maxsize=2, directory=str(tmp_path))
+    assert reopened.get_memory(("h1", "small")) is None
+    assert reopened.get(("h1", "small")) == "hello"
+    assert reopened.get_memory(("h1", "small")) == "hello"
+    assert reopened.get(("h2", "small")) is None
+    assert reopened.stats()["disk_hits"] == 1 and reopened.stats()["misses"] == 1
+
+
+def test_buffer_cache_keeps_running_totals_and_prunes_oldest(tmp_path):
+    clip = np.ones(1024, dtype=np.float32)
+    cache = AudioBufferCache(str(tmp_path), max_bytes=10**9, max_entries=4)
+    for i in range(4):
+        cache.put(f"k{i}", clip)
+        os.utime(cache._path(f"k{i}"), (i, i))
+    assert cache._entries == 4
+
+    cache.put("k4", clip)
+
+    # Pruned to 90% of max_entries, oldest first
+    assert sorted(os.listdir(tmp_path)) == ["k2.npy", "k3.npy", "k4.npy"]
+    assert cache._entries == 3
+    assert cache._bytes == sum(os.path.getsize(tmp_path / name) for name in os.listdir(tmp_path))
+
+
+def test_buffer_cache_hits_are_writable_memory_maps(tmp_path):
+    cache = AudioBufferCache(str(tmp_path))
+    cache.put("k", np.arange(10, dtype=np.float32))
+
+    audio = cache.get("k")
+
+    assert isinstance(audio, np.memmap) and audio.flags.writeable
+    assert audio.tolist() == list(range(10))
+    audio[0] = 5  # copy-on-write: the file keeps its data
+    assert cache.get("k")[0] == 0
+
+
+def test_transcribe_reads_disk_cache_off_the_event_loop(tmp_path, monkeypatch):
+    service = TranscriptionService(cache_dir=str(tmp_path))
+    submitted = []
+    disk_threads = []
+
+    async def start():
+        pass
+
+    async def submit(data, sr, audio_hash, bounded=True):
+        submitted.append(data)
+        return "hello"
+
+    get_disk = service.cache.get_disk
+
+    def recording_get_disk(key):
+        disk_threads.append(threading.current_thread())
+        return get_disk(key)
+
+    monkeypatch.setattr(service, "start", start)
+    monkeypatch.setattr(service, "_submit", submit)
+    monkeypatch.setattr(service.cache, "get_disk", recording_get_disk)
+
+    async def run():
+        first = await asyncio.gather(service.transcribe(b"clip"), service.transcribe(b"clip"))
+        await asyncio.sleep(0.1)  # the file is written in the background
+        return first
+
+    assert asyncio.run(run()) == ["hello", "hello"]
+    assert submitted == [b"clip"]
+    assert disk_threads and all(t is not threading.main_thread() for t in disk_threads)
+
+    # A new service (e.g. after a restart) finds the transcript on disk
+    restarted = TranscriptionService(cache_dir=str(tmp_path))
+    monkeypatch.setattr(restarted, "start", start)
+    monkeypatch.setattr(restarted, "_submit", submit)
+    assert asyncio.run(restarted.transcribe(b"clip")) == "hello"
+    assert submitted == [b"clip"]
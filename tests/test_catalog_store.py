@@ -0,0 +1,70 @@
+import json
+import sqlite3
+
+from utils.catalog_store import SCHEMA_VERSION, SQLiteCatalogStore
+from utils.inventory import InventoryAPI
+
+VERSION_1_SCHEMA = """
+CREATE TABLE products (
+    seq INTEGER PRIMARY KEY,
+    product_id TEXT NOT NULL UNIQUE,
+    name TEXT NOT NULL DEFAULT '',
+    category TEXT,
+    diet_tags TEXT,
+    aisle_id TEXT,
+    shelf_id TEXT,
+    stock_quantity INTEGER NOT NULL DEFAULT 0,
+    record TEXT NOT NULL
+)
+"""
+
+
+def test_version_1_database_gains_allergens(tmp_path):
+    path = str(tmp_path / "catalog.db")
+    conn = sqlite3.connect(path)
+    conn.execute(VERSION_1_SCHEMA)
+    for product in (
+        {"product_id": "a", "name": "peanut bar", "allergens": ["peanut"]},
+        {"product_id": "b", "name": "crackers"},
+    ):
+        conn.execute(
+            "INSERT INTO products (product_id, name, record) VALUES (?, ?, ?)",
+            (product["product_id"], product["name"], json.dumps(product))
+        )
+    conn.commit()
+    conn.close()
+
+    store = SQLiteCatalogStore(path)
+    try:
+        rows = {row["product_id"]: row for row in store.iter_index_rows()}
+        assert rows["a"]["allergens"] == ["peanut"]
+        assert rows["b"]["allergens"] is None
+        assert list(InventoryAPI(store=store).iter_ids(allergens="peanut")) == ["a"]
+        version = sqlite3.connect(path).execute("PRAGMA user_version").fetchone()[0]
+        assert version == SCHEMA_VERSION
+    finally:
+        store.close()
+
+
+def test_upsert_wins_over_batched_stock(tmp_path):
+    store = SQLiteCatalogStore(str(tmp_path / "catalog.db"), flush_interval_ms=60000)
+    try:
+        store.upsert({"product_id": "a", "name": "milk", "stock_quantity": 5})
+        store.set_stock("a", 4)
+        assert store.load("a")["stock_quantity"] == 4
+        store.upsert({"product_id": "a", "name": "milk", "stock_quantity": 9})
+        store.flush()
+        assert store.load("a")["stock_quantity"] == 9
+    finally:
+        store.close()
+
+
+def test_load_sees_stock_written_by_flush(tmp_path):
+    store = SQLiteCatalogStore(str(tmp_path / "catalog.db"), flush_interval_ms=60000)
+    try:
+        store.upsert({"product_id": "a", "name": "milk", "stock_quantity": 5})
+        store.set_stock("a", 2)
+        assert store.flush() == 1
+        assert store.load("a")["stock_quantity"] == 2
+    finally:
+        store.close()
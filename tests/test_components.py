@@ -0,0 +1,96 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from app import components as registry
+from app.components import LazyComponent, readiness, register, warm_up
+from app.executors import ensure_loaded
+
+
+class Factory:
+    """Counts calls; fails the first `failures` of them."""
+
+    def __init__(self, value="loaded", failures=0, delay=0.0):
+        self.value = value
+        self.failures = failures
+        self.delay = delay
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def __call__(self):
+        with self._lock:
+            self.calls += 1
+            calls = self.calls
+        time.sleep(self.delay)
+        if calls <= self.failures:
+            raise RuntimeError("model file missing")
+        return self.value
+
+
+@pytest.fixture
+def fresh_registry(monkeypatch):
+    monkeypatch.setattr(registry, "components", {})
+    return registry.components
+
+
+def test_ready_answers_503_until_every_component_loads(monkeypatch):
+    pytest.importorskip("httpx")  # used by TestClient
+    from fastapi.testclient import TestClient
+
+    # Imported first: the routers register the app's own components
+    from app.main import app
+
+    monkeypatch.setattr(registry, "components", {})
+    catalog = register("catalog", Factory())
+    model = register("model", Factory())
+    client = TestClient(app)
+
+    response = client.get("/ready")
+    assert response.status_code == 503
+    assert response.json()["components"]["catalog"] == {"ready": False, "load_seconds": None, "error": None}
+
+    catalog.get()
+    assert client.get("/ready").status_code == 503
+
+    model.get()
+    response = client.get("/ready")
+    assert response.status_code == 200
+    assert response.json()["ready"] is True
+
+
+def test_load_failures_are_reported_not_raised(fresh_registry):
+    factory = Factory(failures=1)
+    # Registering never loads, so a broken model cannot fail the import
+    component = register("model", factory)
+    assert factory.calls == 0
+
+    warm_up().join(timeout=5)
+
+    status = readiness()
+    assert status["ready"] is False
+    assert "model file missing" in status["components"]["model"]["error"]
+
+    # The next use retries the load
+    assert component.get() == "loaded"
+    assert readiness()["components"]["model"]["error"] is None
+    assert factory.calls == 2
+
+
+def test_concurrent_callers_share_one_load():
+    factory = Factory(delay=0.05)
+    component = LazyComponent("model", factory)
+
+    async def run():
+        await asyncio.gather(*(ensure_loaded(component) for _ in range(8)))
+
+    asyncio.run(run())
+    threads = [threading.Thread(target=component.get) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert factory.calls == 1
+    assert component.ready and component.upper() == "LOADED"
@@ -0,0 +1,118 @@
+import os
+
+import numpy as np
+import pytest
+
+pytest.importorskip("ultralytics")
+pytest.importorskip("cv2")
+
+import models.detetor as detetor  # noqa: E402
+from models.detetor import export_model, results_to_detections  # noqa: E402
+
+
+class Tensor:
+    """Stands in for a torch tensor: .cpu().numpy() returns the array."""
+
+    def __init__(self, values):
+        self.values = np.asarray(values)
+
+    def cpu(self):
+        return self
+
+    def numpy(self):
+        return self.values
+
+
+class Result:
+    def __init__(self, xyxy, conf, cls):
+        self.boxes = type("Boxes", (), {"xyxy": Tensor(xyxy), "conf": Tensor(conf), "cls": Tensor(cls)})()
+
+
+NAMES = {0: "bottle", 1: "can"}
+
+
+def test_results_to_detections_filters_by_confidence():
+    result = Result([[0, 0, 10, 10], [5, 5, 20, 20], [1, 1, 2, 2]], [0.9, 0.2, 0.5], [0.0, 1.0, 1.0])
+
+    detections = results_to_detections(result, NAMES, conf_threshold=0.5)
+
+    assert [(d["class_id"], d["class_name"]) for d in detections] == [(0, "bottle"), (1, "can")]
+    assert [d["confidence"] for d in detections] == pytest.approx([0.9, 0.5])
+    assert np.allclose(detections[1]["bbox"], [1, 1, 2, 2])
+    assert results_to_detections(result, NAMES, conf_threshold=0.95) == []
+
+
+def test_results_to_detections_scales_boxes_back():
+    result = Result([[10, 20, 30, 40]], [0.8], [1.0])
+
+    (detection,) = results_to_detections(result, NAMES, scale=2.0)
+
+    assert np.allclose(detection["bbox"], [20, 40, 60, 80])
+    assert isinstance(detection["class_id"], int)
+
+
+class FakeYOLO:
+    """Writes a dummy export next to the weights, like ultralytics does."""
+
+    exports = []
+
+    def __init__(self, model_path):
+        self.stem = os.path.splitext(model_path)[0]
+
+    def export(self, format, imgsz, **options):
+        FakeYOLO.exports.append((format, imgsz))
+        if format == "onnx":
+            path = f"{self.stem}.onnx"
+            with open(path, "w") as f:
+                f.write(f"onnx {imgsz}")
+        else:
+            path = f"{self.stem}_openvino_model"
+            os.makedirs(path, exist_ok=True)
+        return path
+
+
+@pytest.fixture
+def weights(tmp_path, monkeypatch):
+    monkeypatch.setattr(detetor, "YOLO", FakeYOLO)
+    FakeYOLO.exports = []
+    path = tmp_path / "yolov8n.pt"
+    path.write_text("weights")
+    return str(path)
+
+
+def test_export_is_reused_until_its_options_change(weights):
+    path = export_model(weights, "onnx", imgsz=320)
+
+    assert path.endswith("yolov8n.320.onnx") and os.path.exists(f"{path}.export.json")
+    assert export_model(weights, "onnx", imgsz=320) == path
+    assert FakeYOLO.exports == [("onnx", 320)]
+
+    assert export_model(weights, "onnx", imgsz=640).endswith("yolov8n.640.onnx")
+    assert FakeYOLO.exports == [("onnx", 320), ("onnx", 640)]
+    with open(path) as f:
+        assert f.read() == "onnx 320"
+
+
+def test_replaced_weights_or_missing_sidecar_export_again(weights):
+    path = export_model(weights, "onnx", imgsz=320)
+
+    stat = os.stat(weights)
+    os.utime(weights, (stat.st_atime, stat.st_mtime + 10))
+    export_model(weights, "onnx", imgsz=320)
+    os.remove(f"{path}.export.json")
+    export_model(weights, "onnx", imgsz=320)
+
+    assert FakeYOLO.exports == [("onnx", 320)] * 3
+
+
+def test_openvino_exports_are_kept_per_quantization(weights):
+    fp32 = export_model(weights, "openvino", imgsz=320)
+    int8 = export_model(weights, "openvino", int8=True, imgsz=320, calibration_data="coco8.yaml")
+
+    assert fp32 != int8 and os.path.isdir(fp32) and os.path.isdir(int8)
+    assert export_model(weights, "openvino", imgsz=320) == fp32
+    assert export_model(weights, "openvino", int8=True, imgsz=320, calibration_data="coco8.yaml") == int8
+    assert FakeYOLO.exports == [("openvino", 320), ("openvino", 320)]
+
+    with pytest.raises(ValueError):
+        export_model(weights, "torch")
@@ -0,0 +1,73 @@
+import threading
+import time
+
+import pytest
+
+from utils.executors import BoundedExecutor, Overloaded
+
+
+def test_jobs_beyond_workers_and_queue_are_rejected():
+    executor = BoundedExecutor("test", workers=1, max_queue=1)
+    release = threading.Event()
+    try:
+        running = executor.submit(release.wait)
+        queued = executor.submit(lambda: "queued")
+        with pytest.raises(Overloaded) as raised:
+            executor.submit(lambda: "rejected")
+
+        assert raised.value.name == "test" and raised.value.retry_after >= 1
+        assert executor.stats()["rejected"] == 1 and executor.stats()["in_progress"] == 2
+
+        release.set()
+        assert running.result(timeout=5) is True and queued.result(timeout=5) == "queued"
+        # Slots come back once jobs finish
+        assert executor.submit(lambda: "again").result(timeout=5) == "again"
+    finally:
+        release.set()
+        executor.shutdown()
+
+
+def test_retry_after_follows_job_latency():
+    executor = BoundedExecutor("test")
+
+    assert executor.retry_after() == 1
+    executor._avg_seconds = 2.5
+    assert executor.retry_after() == 3
+
+
+def test_overloaded_route_answers_429_with_retry_after():
+    pytest.importorskip("httpx")  # used by TestClient
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+
+    from app.executors import overloaded_response
+
+    executor = BoundedExecutor("slow", workers=1, max_queue=0)
+    release = threading.Event()
+    app = FastAPI()
+    app.add_exception_handler(Overloaded, overloaded_response)
+
+    @app.get("/work")
+    async def work():
+        return {"result": await executor.run(lambda: "done")}
+
+    client = TestClient(app)
+    try:
+        executor.start()
+        executor._avg_seconds = 4.2
+        executor.submit(release.wait)
+        response = client.get("/work")
+
+        assert response.status_code == 429
+        assert response.headers["retry-after"] == "5"
+        assert "slow is overloaded" in response.json()["detail"]
+
+        release.set()
+        for _ in range(100):
+            if executor.stats()["in_progress"] == 0:
+                break
+            time.sleep(0.01)
+        assert client.get("/work").json() == {"result": "done"}
+    finally:
+        release.set()
+        executor.shutdown()
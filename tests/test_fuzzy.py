@@ -0,0 +1,110 @@
+import threading
+
+from utils.fuzzy import FuzzyNameIndex, SymSpellIndex, bounded_edit_distance
+
+
+def test_lookup_finds_misspelt_names():
+    index = FuzzyNameIndex()
+    index.add("p1", "Organic Almond Milk")
+    index.add("p2", "Oat Milk")
+    index.add("p3", "Almond Butter")
+
+    assert index.lookup("organc almond mlk") == [("p1", "organic almond milk", 1 - 2 / 19)]
+    assert [key for key, _, _ in index.lookup("oat milk", max_results=3)] == ["p2"]
+    assert index.lookup("cheddar") == []
+
+    index.remove("p2")
+    assert index.lookup("oat milk") == []
+
+
+def test_lookup_handles_glued_and_filler_words():
+    index = FuzzyNameIndex()
+    for key, name in (("p1", "Almond Milk"), ("p2", "Oat Milk"), ("p3", "Orange Juice")):
+        index.add(key, name)
+
+    assert index.lookup("almondmilk", min_score=0.7) == [("p1", "almond milk", 1 - 1 / 11)]
+    assert index.lookup("almond milk please", min_score=0.7) == [("p1", "almond milk", 2 * 11 / 29)]
+    assert [key for key, _, _ in index.lookup("the orange juice", min_score=0.7)] == ["p3"]
+    assert index.lookup("milk please", min_score=0.7) == []
+    assert index.lookup("please", min_score=0.7) == []
+
+
+def test_loose_pass_only_runs_when_the_word_filter_finds_nothing(monkeypatch):
+    index = FuzzyNameIndex()
+    for key, name in (("p1", "Almond Milk"), ("p2", "Oat Milk")):
+        index.add(key, name)
+    loose = []
+    loose_lookup = index._loose_lookup
+
+    def recording_loose_lookup(query, *args):
+        loose.append(query)
+        return loose_lookup(query, *args)
+
+    monkeypatch.setattr(index, "_loose_lookup", recording_loose_lookup)
+
+    assert [key for key, _, _ in index.lookup("almond mlk")] == ["p1"]
+    assert [key for key, _, _ in index.lookup("oat milk", max_results=2)] == ["p2"]
+    assert loose == []
+
+    assert [key for key, _, _ in index.lookup("oatmilk please")] == ["p2"]
+    assert loose == ["oatmilk please"]
+
+
+def test_loose_pass_verifies_a_bounded_number_of_names(monkeypatch):
+    monkeypatch.setattr("utils.fuzzy.LOOSE_CANDIDATES", 5)
+    index = FuzzyNameIndex()
+    for i in range(50):
+        index.add(f"p{i}", f"milk {i}")
+    verified = []
+    verify = index._verify
+
+    def counting_verify(query, term_keys, min_score):
+        verified.append(len(term_keys))
+        return verify(query, term_keys, min_score)
+
+    monkeypatch.setattr(index, "_verify", counting_verify)
+
+    assert index.lookup("please milk 7", min_score=0.5)[0][:2] == ("p7", "milk 7")
+    assert verified and max(verified) <= 5
+
+
+def test_bounded_edit_distance_counts_transpositions_and_stops_early():
+    assert bounded_edit_distance("milk", "mlik", 2) == 1
+    assert bounded_edit_distance("milk", "silk", 2) == 1
+    assert bounded_edit_distance("milk", "cheese", 2) == 3
+
+
+def test_lookups_survive_concurrent_changes():
+    names = FuzzyNameIndex()
+    words = SymSpellIndex()
+    stop = threading.Event()
+    errors = []
+
+    def churn():
+        i = 0
+        while not stop.is_set():
+            names.add(i, f"almond milk {i % 50}")
+            words.add(i, f"milk{i % 50}")
+            names.remove(i - 20)
+            words.remove(i - 20)
+            i += 1
+
+    def read():
+        try:
+            for i in range(2000):
+                names.lookup(f"almond mlk {i % 50}", max_results=None)
+                words.lookup(f"mlk{i % 50}", max_results=None)
+        except Exception as exc:
+            errors.append(exc)
+
+    writer = threading.Thread(target=churn)
+    readers = [threading.Thread(target=read) for _ in range(3)]
+    writer.start()
+    for reader in readers:
+        reader.start()
+    for reader in readers:
+        reader.join()
+    stop.set()
+    writer.join()
+
+    assert errors == []
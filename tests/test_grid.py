@@ -0,0 +1,99 @@
+import heapq
+import math
+import random
+
+import numpy as np
+import pytest
+
+from utils.grid import OccupancyGrid, grid_route, jump_point_search
+
+
+def grid_dijkstra(walkable, start, goal):
+    """Plain 8-connected Dijkstra; diagonals need both side cells free."""
+    rows, cols = walkable.shape
+    best = {start: 0.0}
+    queue = [(0.0, start)]
+    while queue:
+        cost, (r, c) = heapq.heappop(queue)
+        if (r, c) == goal:
+            return cost
+        if cost > best[r, c]:
+            continue
+        for dr in (-1, 0, 1):
+            for dc in (-1, 0, 1):
+                nr, nc = r + dr, c + dc
+                if (dr or dc) and 0 <= nr < rows and 0 <= nc < cols and walkable[nr, nc]:
+                    if dr and dc and not (walkable[r, nc] and walkable[nr, c]):
+                        continue
+                    new_cost = cost + (math.sqrt(2) if dr and dc else 1.0)
+                    if new_cost < best.get((nr, nc), math.inf):
+                        best[nr, nc] = new_cost
+                        heapq.heappush(queue, (new_cost, (nr, nc)))
+    return math.inf
+
+
+def steps(a, b):
+    """Cells from a to b along a straight or diagonal segment, b included."""
+    dr = (b[0] > a[0]) - (b[0] < a[0])
+    dc = (b[1] > a[1]) - (b[1] < a[1])
+    assert a[0] + dr * max(abs(b[0] - a[0]), abs(b[1] - a[1])) == b[0]
+    cell = a
+    while cell != b:
+        yield cell, (cell[0] + dr, cell[1] + dc)
+        cell = (cell[0] + dr, cell[1] + dc)
+
+
+def assert_walkable_path(walkable, path):
+    for a, b in zip(path, path[1:]):
+        for (r, c), (nr, nc) in steps(a, b):
+            assert walkable[nr, nc]
+            if r != nr and c != nc:
+                assert walkable[r, nc] and walkable[nr, c], f"corner cut at {(r, c)}"
+
+
+@pytest.mark.parametrize("seed", range(25))
+def test_jump_point_search_matches_grid_dijkstra(seed):
+    rng = np.random.default_rng(seed)
+    walkable = rng.random((15, 20)) > 0.3
+    free = [tuple(int(v) for v in cell) for cell in np.argwhere(walkable)]
+    start, goal = random.Random(seed).sample(free, 2)
+
+    path, cost = jump_point_search(OccupancyGrid(walkable), start, goal)
+    expected = grid_dijkstra(walkable, start, goal)
+
+    assert cost == pytest.approx(expected)
+    if path is not None:
+        assert path[0] == start and path[-1] == goal
+        assert_walkable_path(walkable, path)
+
+
+def test_jump_point_search_does_not_cut_corners():
+    walkable = np.array([
+        [1, 0, 1],
+        [1, 1, 1],
+        [0, 1, 1],
+    ], dtype=bool)
+    # The only way from (0, 0) to (1, 1) squeezes between two blocked cells
+    blocked = np.array([
+        [1, 0],
+        [0, 1],
+    ], dtype=bool)
+
+    assert jump_point_search(OccupancyGrid(blocked), (0, 0), (1, 1)) == (None, math.inf)
+    path, cost = jump_point_search(OccupancyGrid(walkable), (2, 1), (0, 0))
+    assert cost == pytest.approx(grid_dijkstra(walkable, (2, 1), (0, 0)))
+    assert_walkable_path(walkable, path)
+
+
+def test_grid_route_walks_around_an_obstacle():
+    grid = OccupancyGrid.from_floorplan({
+        "width": 10, "height": 10, "resolution": 1.0,
+        "obstacles": [{"x": 4, "y": 0, "width": 2, "height": 8}],
+    })
+
+    waypoints, length = grid_route(grid, (1.5, 1.5), (8.5, 1.5))
+
+    assert waypoints[0] == (1.5, 1.5) and waypoints[-1] == (8.5, 1.5)
+    # Straight across is 7; the way round the obstacle's end is over twice that
+    assert length > 14
+    assert all(grid.is_walkable(grid.to_cell(point)) for point in waypoints)
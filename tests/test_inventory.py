@@ -0,0 +1,203 @@
+import threading
+
+import pytest
+
+from utils.catalog_store import SQLiteCatalogStore
+from utils.inventory import InventoryAPI, ReservationError
+
+
+def product(i, category="Snacks"):
+    return {
+        "product_id": f"p{i}", "name": f"snack {i}", "category": category,
+        "diet_tags": ["vegan"], "aisle_id": "A1", "shelf_id": "A1-1", "price": 1.0,
+        "stock_quantity": 10,
+    }
+
+
+def test_iter_ids_survives_concurrent_catalog_changes():
+    inventory = InventoryAPI([product(i) for i in range(2000)])
+    stop = threading.Event()
+    errors = []
+
+    def churn():
+        i = 2000
+        while not stop.is_set():
+            inventory.add_product(product(i))
+            inventory.remove_product(f"p{i - 1000}")
+            i += 1
+
+    def read(**filters):
+        try:
+            for _ in range(200):
+                for product_id in inventory.iter_ids(**filters):
+                    product_id.upper()
+        except Exception as exc:
+            errors.append(exc)
+
+    writer = threading.Thread(target=churn)
+    readers = [
+        threading.Thread(target=read, kwargs=filters)
+        for filters in ({"category": "snacks"}, {"category": "snacks", "diet_tags": "vegan"}, {})
+    ]
+    writer.start()
+    for reader in readers:
+        reader.start()
+    for reader in readers:
+        reader.join()
+    stop.set()
+    writer.join()
+
+    assert errors == []
+
+
+def test_iter_ids_matches_every_filter():
+    inventory = InventoryAPI([product(1), product(2, "Dairy"), {**product(3), "diet_tags": []}])
+
+    assert list(inventory.iter_ids(category="Snacks", diet_tags="vegan")) == ["p1"]
+    assert list(inventory.iter_ids(category="dairy")) == ["p2"]
+    assert list(inventory.iter_ids(category="Bakery")) == []
+    assert list(inventory.iter_ids()) == ["p1", "p2", "p3"]
+
+
+def test_iter_ids_reuses_postings_until_a_write():
+    inventory = InventoryAPI([product(i) for i in range(1000)])
+
+    assert inventory.find_products(category="snacks", limit=5)[-1]["product_id"] == "p4"
+    snapshot = inventory._snapshots[("category", "snacks")]
+    inventory.find_products(category="snacks", limit=5)
+    assert inventory._snapshots[("category", "snacks")] is snapshot
+
+    started = inventory.iter_ids(category="snacks")
+    assert next(started) == "p0"
+    inventory.add_product(product(1000))
+    inventory.remove_product("p1")
+
+    assert len(list(started)) == 999
+    assert list(inventory.iter_ids(category="snacks"))[-1] == "p1000"
+    assert "p1" not in inventory._snapshots[("category", "snacks")]
+
+
+def test_limited_search_ranks_like_a_full_search():
+    adjectives = ["almond", "whole", "greek", "milky", "oat"]
+    nouns = ["milk", "buttermilk", "bread", "milk chocolate"]
+    inventory = InventoryAPI(
+        {"product_id": f"p{i}", "name": f"{adjectives[i % 5]} {nouns[i % 4]} {i}", "stock_quantity": 1}
+        for i in range(3000)
+    )
+    inventory.add_product({"product_id": "m", "name": "Milk", "stock_quantity": 1})
+
+    def ids(query, limit=None):
+        return [product["product_id"] for product in inventory.search_products(query, limit=limit)]
+
+    for query in ("milk", "MILK 1", "ilk", "oat bread", "zz"):
+        for limit in (1, 5, 40):
+            assert ids(query, limit) == ids(query)[:limit]
+
+    inventory.remove_product("m")
+    inventory.add_product({"product_id": "n", "name": "milk", "stock_quantity": 1})
+    assert ids("milk", 3)[0] == "n"
+    assert ids("milk", 3) == ids("milk")[:3]
+    assert ids("milk", 0) == []
+
+
+def test_loaded_records_are_evicted_least_recently_used_first(tmp_path):
+    store = SQLiteCatalogStore(str(tmp_path / "catalog.db"))
+    try:
+        inventory = InventoryAPI(store=store, cache_size=2)
+        for i in range(3):
+            inventory.add_product(product(i))
+        assert list(inventory.products) == ["p1", "p2"]
+
+        inventory.get_product("p1")
+        inventory.get_product("p0")
+        assert list(inventory.products) == ["p1", "p0"]
+
+        inventory.update_stock("p1", -1)
+        assert inventory.get_stock("p2") == 10
+        assert list(inventory.products) == ["p1", "p2"]
+        assert inventory.get_stock("p0") == 10
+    finally:
+        store.close()
+
+
+def test_search_skips_products_removed_mid_search():
+    inventory = InventoryAPI(
+        {"product_id": f"p{i}", "name": f"milk {i}", "stock_quantity": 1} for i in range(1500)
+    )
+    load = inventory._product
+
+    def load_after_removal(product_id):
+        # The product disappears between ranking and loading
+        if product_id == "p0":
+            inventory.remove_product(product_id)
+        return load(product_id)
+
+    inventory._product = load_after_removal
+    for query in ("milk", "milk 1", "m"):
+        for limit in (None, 3):
+            results = inventory.search_products(query, limit=limit)
+            assert None not in results
+            if limit is not None:
+                assert len(results) == limit
+        inventory.add_product({"product_id": "p0", "name": "milk 0", "stock_quantity": 1})
+
+
+def test_id_snapshot_is_shared_until_a_write():
+    inventory = InventoryAPI([product(i) for i in range(10)])
+
+    snapshot = inventory.id_snapshot()
+    assert snapshot == tuple(inventory.iter_ids())
+    assert inventory.id_snapshot() is snapshot
+
+    inventory.remove_product("p3")
+    assert "p3" in snapshot
+    assert "p3" not in inventory.id_snapshot()
+
+
+def test_reserve_takes_nothing_when_one_item_is_short():
+    inventory = InventoryAPI([product(i) for i in range(3)])
+
+    with pytest.raises(ReservationError) as error:
+        inventory.reserve({"p0": 2, "p1": 11, "missing": 1})
+
+    assert error.value.shortages == {"p1": 10, "missing": None}
+    assert [inventory.get_stock(f"p{i}") for i in range(3)] == [10, 10, 10]
+
+
+def test_concurrent_reserves_never_oversell():
+    inventory = InventoryAPI([product(i) for i in range(3)])
+    sold = []
+
+    def checkout():
+        for _ in range(20):
+            try:
+                inventory.reserve([("p0", 1), ("p1", 2)])
+            except ReservationError:
+                continue
+            sold.append(1)
+
+    threads = [threading.Thread(target=checkout) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(sold) == 5
+    assert (inventory.get_stock("p0"), inventory.get_stock("p1")) == (5, 0)
+    assert inventory.get_product("p1")["stock_quantity"] == 0
+
+
+def test_release_restores_reserved_stock(tmp_path):
+    store = SQLiteCatalogStore(str(tmp_path / "catalog.db"))
+    try:
+        inventory = InventoryAPI([product(i) for i in range(2)], store=store, cache_size=1)
+        before = inventory.get_product("p0")
+
+        assert inventory.reserve({"p0": 3, "p1": 4}) == {"p0": 7, "p1": 6}
+        assert before["stock_quantity"] == 10
+        assert inventory.release({"p0": 3, "p1": 4, "missing": 1}) == {"p0": 10, "p1": 10}
+
+        assert (inventory.get_stock("p0"), inventory.get_stock("p1")) == (10, 10)
+        assert store.load("p1")["stock_quantity"] == 10
+    finally:
+        store.close()
@@ -0,0 +1,48 @@
+import pytest
+
+pytest.importorskip("httpx")  # used by TestClient
+
+from fastapi import APIRouter, FastAPI
+from fastapi.testclient import TestClient
+
+from app.metrics import REQUEST_SECONDS, MetricsMiddleware
+from utils.metrics import registry
+
+
+def make_app():
+    navigation, stt = APIRouter(), APIRouter()
+
+    @navigation.get("/stats")
+    def navigation_stats():
+        return {}
+
+    @stt.get("/stats")
+    def stt_stats():
+        return {}
+
+    @stt.get("/clips/{clip_id}")
+    def clip(clip_id: int):
+        return {}
+
+    app = FastAPI()
+    app.add_middleware(MetricsMiddleware)
+    app.include_router(navigation, prefix="/navigate")
+    app.include_router(stt, prefix="/stt")
+    return app
+
+
+def routes_seen():
+    return {labels[1] for labels in REQUEST_SECONDS._series}
+
+
+def test_route_labels_keep_router_prefixes(monkeypatch):
+    monkeypatch.setattr(registry, "enabled", True)
+    monkeypatch.setattr(REQUEST_SECONDS, "_series", {})
+    client = TestClient(make_app())
+
+    for path in ("/navigate/stats", "/stt/stats", "/stt/clips/1", "/stt/clips/2", "/nowhere"):
+        client.get(path)
+
+    assert routes_seen() == {"/navigate/stats", "/stt/stats", "/stt/clips/{clip_id}", "unmatched"}
+    assert ("GET", "/stt/clips/{clip_id}", "200") in REQUEST_SECONDS._series
+    assert ("GET", "unmatched", "404") in REQUEST_SECONDS._series
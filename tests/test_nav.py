@@ -0,0 +1,119 @@
+import random
+
+import pytest
+
+from utils.nav import CSRGraph, Graph, RouteCache, RoutePlanner, RouteTable, astar, astar_csr, dijkstra
+
+
+def random_map(seed, nodes=30, edges=70, euclidean=True):
+    """
+    Random undirected map. With euclidean=True edge costs are straight-line
+    distances, which the Manhattan heuristic overestimates.
+    """
+    rng = random.Random(seed)
+    graph = Graph()
+    positions = {}
+    for i in range(nodes):
+        graph.add_node(f"n{i}")
+        positions[f"n{i}"] = (rng.randint(0, 20), rng.randint(0, 20))
+    for _ in range(edges):
+        a, b = rng.sample(range(nodes), 2)
+        (ax, ay), (bx, by) = positions[f"n{a}"], positions[f"n{b}"]
+        if euclidean:
+            cost = ((ax - bx) ** 2 + (ay - by) ** 2) ** 0.5
+        else:
+            cost = abs(ax - bx) + abs(ay - by) + rng.randint(0, 5)
+        graph.add_edge(f"n{a}", f"n{b}", cost)
+    return graph, positions
+
+
+def path_cost(graph, path):
+    cheapest = {}
+    for node, edges in graph.edges.items():
+        for neighbor, cost in edges:
+            cheapest[node, neighbor] = min(cost, cheapest.get((node, neighbor), float("inf")))
+    return sum(cheapest[edge] for edge in zip(path, path[1:]))
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_astar_csr_matches_dict_astar(seed):
+    # Edge costs at least the Manhattan distance: the heuristic is admissible
+    graph, positions = random_map(seed, euclidean=False)
+    csr = CSRGraph.from_graph(graph, positions)
+
+    for goal in ("n1", "n2", "n3"):
+        path, cost = astar_csr(csr, csr.index["n0"], csr.index[goal])
+        expected_path, expected_cost = astar(graph, "n0", goal, positions)
+        assert cost == pytest.approx(expected_cost)
+        assert cost == pytest.approx(dijkstra(graph, "n0", goal)[1])
+        if path is None:
+            assert expected_path is None
+        else:
+            assert path[0] == "n0" and path[-1] == goal
+            assert path_cost(graph, path) == pytest.approx(cost)
+
+
+@pytest.mark.parametrize("seed", [1106, 2241])
+def test_astar_csr_path_matches_its_cost_with_overestimating_heuristic(seed):
+    # These maps used to rewrite the parent of an already expanded node
+    graph, positions = random_map(seed)
+    csr = CSRGraph.from_graph(graph, positions)
+
+    path, cost = astar(csr, "n0", "n1", positions)
+
+    assert path[0] == "n0" and path[-1] == "n1"
+    assert path_cost(graph, path) == pytest.approx(cost)
+
+
+def test_astar_csr_unreachable_goal():
+    graph = Graph()
+    graph.add_edge("a", "b", 1)
+    graph.add_node("c")
+    csr = CSRGraph.from_graph(graph, {"a": (0, 0), "b": (1, 0), "c": (5, 5)})
+
+    assert astar_csr(csr, csr.index["a"], csr.index["c"]) == (None, float("inf"))
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_route_table_matches_dict_astar(seed):
+    graph, positions = random_map(seed, euclidean=False)
+    csr = CSRGraph.from_graph(graph, positions)
+    table = RouteTable(csr)
+
+    for start in ("n0", "n4"):
+        for goal in ("n1", "n2", "n3"):
+            path, cost = table.route(csr.index[start], csr.index[goal])
+            expected_path, expected_cost = astar(graph, start, goal, positions)
+            assert cost == pytest.approx(expected_cost)
+            if path is None:
+                assert expected_path is None
+            else:
+                assert path[0] == start and path[-1] == goal
+                assert path_cost(graph, path) == pytest.approx(cost)
+
+
+def test_cached_planner_matches_table_planner():
+    graph, positions = random_map(7, euclidean=False)
+    csr = CSRGraph.from_graph(graph, positions)
+    table = RoutePlanner(csr)
+    cached = RoutePlanner(csr, precompute=False, cache_size=4)
+    assert (table.mode, cached.mode) == ("table", "cache")
+
+    for _ in range(2):
+        for goal in ("n1", "n2", "n3"):
+            assert cached.route("n0", goal)[1] == pytest.approx(table.route("n0", goal)[1])
+
+    stats = cached.stats()["cache"]
+    assert (stats["hits"], stats["misses"], stats["size"]) == (3, 3, 3)
+
+
+def test_route_cache_evicts_least_recently_used():
+    cache = RouteCache(maxsize=2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1
+    cache.put("c", 3)
+
+    assert cache.get("b") is None
+    assert (cache.get("a"), cache.get("c")) == (1, 3)
+    assert cache.stats()["hit_rate"] == pytest.approx(3 / 4)
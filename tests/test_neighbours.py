@@ -0,0 +1,69 @@
+import random
+
+import numpy as np
+import pytest
+
+from models.neighbours import build_table
+from models.recommender import ContentBasedRecommender, ProductFeatureEncoder
+from utils.neighbour_table import NeighbourTable
+
+CATEGORIES = ["Dairy", "Bakery", "Snacks", "Produce", "Drinks"]
+TAGS = ["vegan", "gluten-free", "organic", "low-sugar", "keto"]
+
+
+def make_products(n, seed=0):
+    rng = random.Random(seed)
+    return [
+        {
+            "product_id": f"p{i}", "name": f"product {i}", "category": rng.choice(CATEGORIES),
+            "aisle_id": f"A{rng.randint(1, 4)}", "shelf_id": f"S{rng.randint(1, 8)}",
+            "price": round(rng.uniform(1, 20), 2), "diet_tags": rng.sample(TAGS, rng.randint(0, 3)),
+            "stock_quantity": rng.randint(0, 50),
+        }
+        for i in range(n)
+    ]
+
+
+@pytest.mark.parametrize("chunk_rows", [7, 4096])
+def test_table_lookup_matches_recommender_top_k(tmp_path, chunk_rows):
+    products = make_products(60)
+    path = str(tmp_path / "neighbours.bin")
+
+    assert build_table(products, path, k=5, workers=1, chunk_rows=chunk_rows) == 60
+
+    table = NeighbourTable(path)
+    ids = [p["product_id"] for p in products]
+    recommender = ContentBasedRecommender(ProductFeatureEncoder(products).encode_all(), ids)
+    assert len(table) == 60 and table.k == 5
+    for product_id in ids:
+        neighbours = table.lookup(product_id)
+        expected = recommender.recommend(product_id, top_k=5)
+        scores = recommender.scores(ids.index(product_id))
+
+        assert product_id not in [neighbour for neighbour, _ in neighbours]
+        # Tied scores at the k-th place may pick different products
+        assert [score for _, score in neighbours] == pytest.approx([score for _, score in expected], abs=1e-5)
+        for neighbour, score in neighbours:
+            assert score == pytest.approx(scores[ids.index(neighbour)], abs=1e-5)
+
+
+def test_lookup_of_unknown_products_and_small_catalogs(tmp_path):
+    path = str(tmp_path / "neighbours.bin")
+    build_table(make_products(3), path, k=50, workers=1)
+
+    table = NeighbourTable(path)
+
+    assert table.k == 2
+    assert "p1" in table and "p9" not in table
+    assert table.lookup("p9") == []
+    assert sorted(neighbour for neighbour, _ in table.lookup("p0")) == ["p1", "p2"]
+    assert np.all(table.neighbours >= 0)
+
+
+def test_duplicate_ids_are_rejected(tmp_path):
+    products = make_products(3)
+    products[2]["product_id"] = "p0"
+
+    with pytest.raises(ValueError, match="Duplicate"):
+        build_table(products, str(tmp_path / "neighbours.bin"), workers=1)
+    assert not (tmp_path / "neighbours.bin.tmp").exists()
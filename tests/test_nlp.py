@@ -0,0 +1,101 @@
+import threading
+
+import pytest
+
+pytest.importorskip("spacy")
+
+from models.nlp import IntentParser
+from utils.inventory import InventoryAPI
+
+
+def product(i):
+    return {"product_id": f"p{i}", "name": f"organic almond milk {i}", "stock_quantity": 1}
+
+
+def test_catalog_changes_do_not_break_concurrent_lookups():
+    inventory = InventoryAPI([product(i) for i in range(200)])
+    parser = IntentParser(model_name="blank:en", catalog=inventory)
+    stop = threading.Event()
+    errors = []
+
+    def churn():
+        i = 200
+        while not stop.is_set():
+            inventory.add_product(product(i))
+            inventory.remove_product(f"p{i - 150}")
+            i += 1
+
+    def read():
+        try:
+            for i in range(300):
+                for key, name, _ in parser.fuzzy_lookup(f"organc almond milk {i}", max_results=3):
+                    assert name.startswith("organic almond milk")
+                result, _ = parser.fast_parse(f"where is organic almond milk {i}")
+                if result is not None:
+                    assert None not in result["entities"]
+        except Exception as exc:
+            errors.append(exc)
+
+    writer = threading.Thread(target=churn)
+    readers = [threading.Thread(target=read) for _ in range(3)]
+    writer.start()
+    for reader in readers:
+        reader.start()
+    for reader in readers:
+        reader.join()
+    stop.set()
+    writer.join()
+
+    assert errors == []
+
+
+def test_catalog_changes_reach_the_parser():
+    inventory = InventoryAPI([product(1)])
+    parser = IntentParser(model_name="blank:en", catalog=inventory)
+
+    inventory.add_product({"product_id": "p2", "name": "Oat Milk", "stock_quantity": 1})
+    inventory.remove_product("p1")
+
+    assert [key for key, _, _ in parser.fuzzy_lookup("oat mlk")] == ["p2"]
+    assert parser.fuzzy_lookup("organic almond milk 1") == []
+
+
+# Queries over the default product names, with the parse they should get
+EXAMPLE_QUERIES = {
+    "find almond milk": ("navigate", ["almond milk"]),
+    "Where is the cheddar cheese?": ("navigate", ["cheddar cheese"]),
+    "buy orange juice and potato chips": ("add_to_cart", ["orange juice", "potato chips"]),
+    "can you suggest a blueberry muffin": ("recommend", ["blueberry muffin"]),
+    "add to cart whole wheat bread please": ("add_to_cart", ["whole wheat bread"]),
+    "i want some organic apples": ("unknown", ["organic apples"]),
+}
+
+
+def test_fast_parse_answers_example_queries():
+    # The fast path needs no trained pipeline
+    parser = IntentParser(model_name="blank:en")
+
+    for query, expected in EXAMPLE_QUERIES.items():
+        result, reason = parser.fast_parse(query)
+        assert reason == "matched"
+        assert (result["intent"], result["entities"]) == expected
+
+
+def test_fast_parse_leaves_other_queries_to_spacy():
+    parser = IntentParser(model_name="blank:en")
+
+    assert parser.fast_parse("where is the almnd milk") == (None, "no_entity")
+    assert parser.fast_parse("find almond milk and eggs") == (None, "uncovered")
+    assert parser.fast_parse("hello") == (None, "no_entity")
+
+
+def test_fast_parse_matches_the_full_parse():
+    try:
+        full = IntentParser(fast_path=False)
+    except OSError:
+        pytest.skip("en_core_web_sm is not installed")
+    fast = IntentParser(model_name="blank:en")
+
+    for query in EXAMPLE_QUERIES:
+        result, _ = fast.fast_parse(query)
+        assert (result["intent"], result["entities"]) == full.parse(query)
@@ -0,0 +1,83 @@
+import threading
+
+import pytest
+
+pytest.importorskip("httpx")  # used by TestClient
+
+from fastapi import FastAPI  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+
+from app.config import settings  # noqa: E402
+from app.executors import overloaded_response  # noqa: E402
+from app.routers import nlp_handler  # noqa: E402
+from utils.executors import BoundedExecutor, Overloaded  # noqa: E402
+
+
+class FakeParser:
+    """Answers each query with the query itself as its entity."""
+
+    def __init__(self):
+        self.calls = []
+
+    def analyze_batch(self, texts, batch_size=64, n_process=1):
+        self.calls.append((list(texts), batch_size, n_process))
+        return [{"intent": "navigate", "entities": [text], "products": []} for text in texts]
+
+
+@pytest.fixture
+def batch(monkeypatch):
+    """(client, parser, executor) for /nlp/parse_batch with a fake parser."""
+    parser = FakeParser()
+    monkeypatch.setattr(nlp_handler.parser, "_value", parser)
+    monkeypatch.setattr(nlp_handler.parser, "_loaded", True)
+    executor = BoundedExecutor("nlp", workers=1, max_queue=0)
+    monkeypatch.setattr(nlp_handler, "nlp_executor", executor)
+
+    app = FastAPI()
+    app.add_exception_handler(Overloaded, overloaded_response)
+    app.include_router(nlp_handler.router, prefix="/nlp")
+    try:
+        yield TestClient(app), parser, executor
+    finally:
+        executor.shutdown()
+
+
+def test_results_follow_query_order(batch):
+    client, parser, _ = batch
+    queries = [f" find item {i} " for i in range(20)]
+
+    response = client.post("/nlp/parse_batch", json={"queries": queries, "batch_size": 8})
+
+    assert response.status_code == 200
+    results = response.json()["results"]
+    assert [r["query"] for r in results] == [q.strip() for q in queries]
+    assert all(r["entities"] == [r["query"]] for r in results)
+    assert parser.calls == [([q.strip() for q in queries], 8, settings.NLP_N_PROCESS)]
+
+
+def test_empty_and_oversized_batches_are_rejected(batch, monkeypatch):
+    client, parser, _ = batch
+    monkeypatch.setattr(settings, "NLP_MAX_BATCH_QUERIES", 3)
+
+    assert client.post("/nlp/parse_batch", json={"queries": []}).status_code == 400
+    assert client.post("/nlp/parse_batch", json={"queries": ["a"] * 4}).status_code == 413
+    assert client.post("/nlp/parse_batch", json={"queries": ["a"], "batch_size": 0}).status_code == 422
+    assert client.post("/nlp/parse_batch", json={"queries": ["a"] * 3}).status_code == 200
+    assert len(parser.calls) == 1
+
+
+def test_full_executor_answers_429(batch):
+    client, parser, executor = batch
+    release = threading.Event()
+    try:
+        executor.start()
+        executor._avg_seconds = 1.5
+        executor.submit(release.wait)
+
+        response = client.post("/nlp/parse_batch", json={"queries": ["find milk"]})
+
+        assert response.status_code == 429
+        assert response.headers["retry-after"] == "2"
+        assert parser.calls == []
+    finally:
+        release.set()
@@ -0,0 +1,153 @@
+import json
+import os
+
+import numpy as np
+import pytest
+
+from models.recommender import (
+    DIET_COMPATIBLE_TAGS, UNRESTRICTED_DIETS, ProductFeatureEncoder, PurchaseRecommender, allergen_names,
+    allergy_free_tag
+)
+from utils.catalog_store import SQLiteCatalogStore, convert_json
+from utils.inventory import InventoryAPI
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "data")
+
+
+def load(name, key):
+    with open(os.path.join(DATA_DIR, name)) as f:
+        return json.load(f)[key]
+
+
+USERS = load("user.json", "users")
+
+PEANUT_CATALOG = [
+    {"product_id": "a", "name": "peanut bar", "category": "Snacks", "allergens": ["Peanut"]},
+    {"product_id": "b", "name": "rice cake", "category": "Snacks", "allergens": []},
+    {"product_id": "c", "name": "trail mix", "category": "Snacks", "allergens": ["nuts"]},
+    # Listed allergens win over a contradicting tag
+    {"product_id": "d", "name": "seed bar", "category": "Snacks", "allergens": ["peanut"],
+     "diet_tags": ["peanut-free"]},
+    # No allergen data: unknown, unless tagged free of the allergen
+    {"product_id": "e", "name": "crackers", "category": "Snacks"},
+    {"product_id": "f", "name": "oat bar", "category": "Snacks", "diet_tags": ["peanut-free", "nut-free"]},
+]
+
+
+def json_inventory(products):
+    return InventoryAPI(products)
+
+
+def sqlite_inventory(products, tmp_path):
+    json_path = tmp_path / "products.json"
+    json_path.write_text(json.dumps({"products": products}))
+    db_path = str(tmp_path / "catalog.db")
+    convert_json(str(json_path), db_path)
+    return InventoryAPI(store=SQLiteCatalogStore(db_path))
+
+
+@pytest.fixture(params=["json", "sqlite"])
+def make_inventory(request, tmp_path):
+    if request.param == "json":
+        return json_inventory
+    return lambda products: sqlite_inventory(products, tmp_path)
+
+
+def personalizer(inventory, users=()):
+    recommender = PurchaseRecommender()
+    recommender.index_catalog(inventory)
+    for user in users:
+        recommender.set_preferences(user["user_id"], user["preferences"])
+    recommender.add_histories(
+        (user["user_id"], [p["product_id"] for p in user["past_purchases"]]) for user in users
+    )
+    return recommender
+
+
+def fits(product, preferences):
+    diet = preferences.get("diet", "").lower()
+    tags = {tag.lower() for tag in product.get("diet_tags", [])}
+    if diet and diet not in UNRESTRICTED_DIETS and not tags & set(DIET_COMPATIBLE_TAGS.get(diet, (diet,))):
+        return False
+    for allergy in preferences.get("allergies", []):
+        if "allergens" not in product:
+            if allergy_free_tag(allergy) not in tags:
+                return False
+        elif {a.lower() for a in product["allergens"]} & set(allergen_names(allergy)):
+            return False
+    return True
+
+
+def test_bundled_catalog_records_allergens():
+    assert all(isinstance(p.get("allergens"), list) for p in load("product_db.json", "products"))
+
+
+@pytest.mark.parametrize("user", USERS, ids=[user["user_id"] for user in USERS])
+def test_bundled_users_get_fitting_recommendations(user, make_inventory):
+    products = {p["product_id"]: p for p in load("product_db.json", "products")}
+    recommender = personalizer(make_inventory(list(products.values())), USERS)
+
+    picks = recommender.recommend(user["user_id"], k=5)
+
+    assert picks
+    bought = {p["product_id"] for p in user["past_purchases"]}
+    for product_id, _ in picks:
+        assert product_id not in bought
+        assert fits(products[product_id], user["preferences"])
+
+
+def test_bundled_allergy_excludes_listed_products(make_inventory):
+    recommender = personalizer(make_inventory(load("product_db.json", "products")))
+
+    picks = {product_id for product_id, _ in recommender.recommend("new-user", k=10, allergies=["dairy"])}
+
+    # Cheddar cheese and the muffin list dairy
+    assert picks and not picks & {"p101", "p110"}
+
+
+def test_for_user_peanut_allergy(make_inventory):
+    recommender = personalizer(make_inventory(PEANUT_CATALOG))
+
+    picks = recommender.recommend("new-user", k=10, diet="omnivore", allergies=["peanut"])
+
+    assert sorted(product_id for product_id, _ in picks) == ["b", "c", "f"]
+
+
+def test_allergies_combine(make_inventory):
+    recommender = personalizer(make_inventory(PEANUT_CATALOG))
+
+    picks = recommender.recommend("new-user", k=10, allergies=["peanuts", "nuts"])
+
+    assert sorted(product_id for product_id, _ in picks) == ["b", "f"]
+
+
+def test_catalog_changes_update_allergen_filter():
+    inventory = json_inventory(PEANUT_CATALOG)
+    recommender = personalizer(inventory)
+    inventory.add_product({**PEANUT_CATALOG[1], "allergens": ["peanut"]})
+
+    picks = recommender.recommend("new-user", k=10, allergies=["peanut"])
+
+    assert sorted(product_id for product_id, _ in picks) == ["c", "f"]
+
+
+def test_unknown_diet_is_not_a_filter():
+    products = load("product_db.json", "products")
+    recommender = personalizer(json_inventory(products))
+
+    assert len(recommender.recommend("new-user", k=len(products), diet="keto")) == len(products)
+    assert len(recommender.recommend("new-user", k=len(products), diet="vegan")) == sum(
+        "vegan" in p["diet_tags"] for p in products
+    )
+
+
+def test_encode_all_matches_encode():
+    products = load("product_db.json", "products")
+    products[0] = {**products[0], "diet_tags": products[0]["diet_tags"] * 2}
+    products[1] = {**products[1], "diet_tags": []}
+    encoder = ProductFeatureEncoder(products)
+
+    features = encoder.encode_all()
+
+    assert features.has_sorted_indices
+    np.testing.assert_allclose(features.toarray(), [encoder.encode(p) for p in products], rtol=1e-6)
@@ -0,0 +1,124 @@
+import pytest
+
+from utils.inventory import InventoryAPI
+from utils.response_cache import ResponseCache, etag_matches, make_etag
+
+
+def test_etag_matches_lists_weak_tags_and_star():
+    etag = make_etag(b"body")
+
+    assert etag_matches(etag, etag)
+    assert etag_matches(f'"other", W/{etag}', etag)
+    assert etag_matches("*", etag)
+    assert not etag_matches('"other"', etag)
+    assert not etag_matches(None, etag)
+
+
+def test_response_cache_misses_on_a_new_version():
+    cache = ResponseCache()
+    etag = cache.put("key", 1, b"old")
+
+    assert cache.get("key", 1) == (b"old", etag)
+    assert cache.get("key", 2) is None
+    cache.put("key", 2, b"new")
+    assert cache.get("key", 1) is None
+    assert cache.stats()["entries"] == 1 and cache.stats()["bytes"] == 3
+
+
+def test_response_cache_evicts_by_bytes_least_recently_used_first():
+    cache = ResponseCache(max_bytes=10)
+    cache.put("a", 1, b"aaaa")
+    cache.put("b", 1, b"bbbb")
+    cache.get("a", 1)
+    cache.put("c", 1, b"cccc")
+
+    assert cache.get("b", 1) is None
+    assert cache.get("a", 1) is not None and cache.get("c", 1) is not None
+    cache.put("huge", 1, b"x" * 11)
+    assert cache.get("huge", 1) is None
+
+
+def test_product_stock_version_follows_one_product():
+    inventory = InventoryAPI([
+        {"product_id": "a", "name": "milk", "stock_quantity": 1},
+        {"product_id": "b", "name": "bread", "stock_quantity": 1},
+    ])
+
+    before = inventory.product_stock_version("a"), inventory.product_stock_version("b")
+    inventory.update_stock("b", 1)
+
+    assert inventory.product_stock_version("a") == before[0]
+    assert inventory.product_stock_version("b") != before[1]
+    assert inventory.stock_version == inventory.product_stock_version("b")
+
+
+@pytest.fixture
+def served(monkeypatch):
+    """A small catalog served by the product routes; returns (client, catalog)."""
+    pytest.importorskip("httpx")  # used by TestClient
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+
+    from app import caching
+    from app.catalog import inventory
+    from app.routers import product_lookup
+
+    products = InventoryAPI([
+        {"product_id": "a", "name": "milk", "aisle_id": "A1", "shelf_id": "A1-1", "stock_quantity": 5},
+        {"product_id": "b", "name": "bread", "aisle_id": "B1", "shelf_id": "B1-1", "stock_quantity": 5},
+    ])
+    monkeypatch.setattr(inventory, "_value", products)
+    monkeypatch.setattr(inventory, "_loaded", True)
+    monkeypatch.setattr(caching, "response_cache", ResponseCache())
+    app = FastAPI()
+    app.include_router(product_lookup.router, prefix="/product")
+    return TestClient(app), products
+
+
+def test_revalidation_answers_304_until_the_data_changes(served):
+    client, catalog = served
+    first = client.get("/product/info", params={"product_id": "a"})
+    etag = first.headers["etag"]
+    assert first.status_code == 200 and first.json()["stock_quantity"] == 5
+
+    again = client.get("/product/info", params={"product_id": "a"}, headers={"If-None-Match": etag})
+    assert again.status_code == 304 and again.headers["etag"] == etag
+
+    catalog.update_stock("a", -2)
+    changed = client.get("/product/info", params={"product_id": "a"}, headers={"If-None-Match": etag})
+    assert changed.status_code == 200 and changed.json()["stock_quantity"] == 3
+    assert changed.headers["etag"] != etag
+
+
+def test_stock_changes_keep_other_products_and_locations_cached(served):
+    client, catalog = served
+    info = client.get("/product/info", params={"product_id": "a"}).headers["etag"]
+    location = client.get("/product/location", params={"product_id": "a"}).headers["etag"]
+
+    catalog.update_stock("b", -1)
+    catalog.update_stock("a", -1)
+
+    assert client.get(
+        "/product/location", params={"product_id": "a"}, headers={"If-None-Match": location}
+    ).status_code == 304
+    assert client.get(
+        "/product/info", params={"product_id": "a"}, headers={"If-None-Match": info}
+    ).status_code == 200
+
+    info_b = client.get("/product/info", params={"product_id": "b"}).headers["etag"]
+    catalog.update_stock("a", -1)
+    assert client.get(
+        "/product/info", params={"product_id": "b"}, headers={"If-None-Match": info_b}
+    ).status_code == 304
+
+
+def test_catalog_changes_invalidate_and_404s_pass_through(served):
+    client, catalog = served
+    etag = client.get("/product/location", params={"product_id": "a"}).headers["etag"]
+    catalog.add_product(
+        {"product_id": "a", "name": "milk", "aisle_id": "A2", "shelf_id": "A2-1", "stock_quantity": 5}
+    )
+
+    moved = client.get("/product/location", params={"product_id": "a"}, headers={"If-None-Match": etag})
+    assert moved.status_code == 200 and moved.json()["aisle"] == "A2"
+    assert client.get("/product/info", params={"product_id": "zzz"}).status_code == 404
@@ -0,0 +1,97 @@
+import numpy as np
+import pytest
+
+pytest.importorskip("multipart")  # python-multipart, needed by the upload routes
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.routers import stt
+from utils.speechtotext import InvalidAudio
+
+RATE = 16000
+
+
+def tone(seconds):
+    t = np.arange(int(RATE * seconds))
+    return (np.sin(t / 5) * 10000).astype("<i2").tobytes()
+
+
+def silence(seconds):
+    return np.zeros(int(RATE * seconds), dtype="<i2").tobytes()
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(stt.transcriber, "overloaded", lambda: False)
+    app = FastAPI()
+    app.include_router(stt.router, prefix="/stt")
+    return TestClient(app)
+
+
+def stream(client, chunks, chunk_bytes=1001):
+    messages = []
+    with client.websocket_connect(f"/stt/stream?sample_rate={RATE}") as ws:
+        data = b"".join(chunks)
+        for start in range(0, len(data), chunk_bytes):
+            ws.send_bytes(data[start:start + chunk_bytes])
+        ws.send_text("end")
+        while True:
+            message = ws.receive_json()
+            messages.append(message)
+            if message["type"] == "end":
+                return messages
+
+
+def test_failed_final_sends_error_and_keeps_stream_open(client, monkeypatch):
+    finals = []
+
+    async def transcribe(audio, sr=None, cache=True, bounded=True):
+        if bounded:
+            return ""
+        finals.append(len(audio))
+        if len(finals) == 1:
+            raise InvalidAudio("Audio has no samples")
+        return " hello "
+
+    monkeypatch.setattr(stt.transcriber, "transcribe", transcribe)
+
+    messages = stream(client, [silence(0.5), tone(1.2), silence(1), tone(1.2), silence(1)])
+
+    assert messages == [
+        {"type": "error", "segment": 0, "status": 400, "detail": "Audio has no samples"},
+        {"type": "final", "segment": 1, "text": "hello"},
+        {"type": "end"},
+    ]
+
+
+def test_failed_partial_does_not_end_stream(client, monkeypatch):
+    async def transcribe(audio, sr=None, cache=True, bounded=True):
+        if bounded:
+            raise RuntimeError("worker crashed")
+        return "hello"
+
+    monkeypatch.setattr(stt.transcriber, "transcribe", transcribe)
+
+    messages = stream(client, [silence(0.5), tone(2), silence(1)])
+
+    errors = [m for m in messages if m["type"] == "error"]
+    assert errors and all(m["status"] == 500 and m["segment"] == 0 for m in errors)
+    assert messages[-2:] == [{"type": "final", "segment": 0, "text": "hello"}, {"type": "end"}]
+
+
+def test_odd_sized_messages_decode_whole_samples(client, monkeypatch):
+    lengths = []
+
+    async def transcribe(audio, sr=None, cache=True, bounded=True):
+        if bounded:
+            return ""
+        lengths.append((len(audio), sr))
+        return "hi"
+
+    monkeypatch.setattr(stt.transcriber, "transcribe", transcribe)
+
+    messages = stream(client, [silence(0.5), tone(1), silence(1)], chunk_bytes=333)
+
+    assert [m["type"] for m in messages] == ["final", "end"]
+    assert lengths[0][1] == RATE and lengths[0][0] >= RATE
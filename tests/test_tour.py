@@ -0,0 +1,93 @@
+import itertools
+import random
+
+import pytest
+
+from utils.nav import CSRGraph, Graph, RouteTable
+from utils.tour import nearest_neighbour_order, plan_tour, two_opt
+
+
+def grid_map(width=6, height=6):
+    graph = Graph()
+    for x in range(width):
+        for y in range(height):
+            if x + 1 < width:
+                graph.add_edge((x, y), (x + 1, y), 1)
+            if y + 1 < height:
+                graph.add_edge((x, y), (x, y + 1), 1)
+    return CSRGraph.from_graph(graph)
+
+
+def manhattan(a, b):
+    return abs(a[0] - b[0]) + abs(a[1] - b[1])
+
+
+def best_cost(start, stops, end):
+    return min(
+        sum(manhattan(a, b) for a, b in zip(route, route[1:]))
+        for route in ([start, *order, end] for order in itertools.permutations(stops))
+    )
+
+
+def path_length(order, dist):
+    return sum(dist[a][b] for a, b in zip(order, order[1:]))
+
+
+def test_two_opt_fixes_greedy_order_on_a_line():
+    positions = [0, 1, -2, 4]
+    dist = [[abs(a - b) for b in positions] for a in positions]
+
+    greedy = nearest_neighbour_order(dist, 0, [1, 2, 3])
+    improved = two_opt(greedy, dist)
+
+    assert (greedy, path_length(greedy, dist)) == ([0, 1, 2, 3], 10)
+    assert (improved, path_length(improved, dist)) == ([0, 2, 1, 3], 8)
+
+
+def test_two_opt_keeps_both_ends_when_fixed():
+    rng = random.Random(3)
+    points = [(rng.random(), rng.random()) for _ in range(8)]
+    dist = [[((a[0] - b[0]) ** 2 + (a[1] - b[1]) ** 2) ** 0.5 for b in points] for a in points]
+    order = list(range(8))
+
+    improved = two_opt(order, dist, fixed_end=True)
+
+    assert improved[0] == 0 and improved[-1] == 7
+    assert sorted(improved) == order
+    assert path_length(improved, dist) <= path_length(order, dist)
+
+
+@pytest.mark.parametrize("seed", range(30))
+def test_plan_tour_is_optimal_for_two_stops(seed):
+    graph = grid_map()
+    start, end, *stops = random.Random(seed).sample(sorted(graph.names), 4)
+
+    order, path, cost = plan_tour(graph, stops, start=start, end=end)
+
+    assert cost == best_cost(start, stops, end)
+    assert order[0] == start and order[-1] == end and sorted(order[1:-1]) == sorted(stops)
+
+
+@pytest.mark.parametrize("seed", range(10))
+def test_plan_tour_path_walks_every_stop(seed):
+    graph = grid_map()
+    table = RouteTable(graph)
+    start, *stops = random.Random(seed).sample(sorted(graph.names), 6)
+
+    order, path, cost = plan_tour(graph, stops, start=start, table=table)
+
+    assert (order, path, cost) == plan_tour(graph, stops, start=start)
+    assert path[0] == start and path[-1] == order[-1]
+    assert all(manhattan(a, b) == 1 for a, b in zip(path, path[1:]))
+    assert cost == len(path) - 1
+    assert set(stops) <= set(path)
+    assert cost >= min(best_cost(start, rest, last) for last in stops
+                       for rest in [[s for s in stops if s != last]])
+
+
+def test_plan_tour_reports_unreachable_stops():
+    graph = Graph()
+    graph.add_edge("a", "b", 1)
+    graph.add_node("island")
+
+    assert plan_tour(CSRGraph.from_graph(graph), ["a", "b", "island"]) == (None, None, float("inf"))
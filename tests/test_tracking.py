@@ -0,0 +1,72 @@
+import numpy as np
+
+from utils.tracking import IoUTracker, iou_matrix
+
+
+def detection(box, class_id=0, confidence=0.9):
+    return {"bbox": np.array(box, dtype=np.float32), "confidence": confidence,
+            "class_id": class_id, "class_name": f"class{class_id}"}
+
+
+def ids_by_class(tracks):
+    return {track["class_id"]: track["track_id"] for track in tracks}
+
+
+def test_iou_matrix():
+    iou = iou_matrix([[0, 0, 2, 2]], [[0, 0, 2, 2], [1, 0, 3, 2], [5, 5, 6, 6]])
+
+    assert np.allclose(iou, [[1.0, 1 / 3, 0.0]])
+    assert iou_matrix(np.zeros((0, 4)), [[0, 0, 1, 1]]).shape == (0, 1)
+
+
+def test_tracks_keep_their_ids_while_moving():
+    tracker = IoUTracker()
+    first = tracker.update([detection([0, 0, 10, 10]), detection([50, 50, 60, 60], class_id=1)])
+    ids = ids_by_class(first)
+
+    for step in range(1, 6):
+        tracks = tracker.update([
+            detection([50 + step, 50, 60 + step, 60], class_id=1), detection([step, 0, 10 + step, 10]),
+        ])
+        assert ids_by_class(tracks) == ids
+
+    assert sorted(ids.values()) == [0, 1]
+
+
+def test_other_class_or_no_overlap_starts_a_new_track():
+    tracker = IoUTracker()
+    (first,) = tracker.update([detection([0, 0, 10, 10])])
+
+    (other_class,) = tracker.update([detection([0, 0, 10, 10], class_id=2)])
+    (far,) = tracker.update([detection([100, 100, 110, 110])])
+
+    assert len({first["track_id"], other_class["track_id"], far["track_id"]}) == 3
+
+
+def test_missed_tracks_survive_max_age_then_drop():
+    tracker = IoUTracker(max_age=2)
+    (track,) = tracker.update([detection([0, 0, 10, 10])])
+
+    assert tracker.update([]) == [] and tracker.update([]) == []
+    assert len(tracker) == 1
+    (again,) = tracker.update([detection([0, 0, 10, 10])])
+    assert again["track_id"] == track["track_id"]
+
+    for _ in range(3):
+        tracker.update([])
+    assert len(tracker) == 0
+
+
+def test_predict_moves_tracks_between_detector_runs():
+    tracker = IoUTracker()
+    tracker.update([detection([0, 0, 10, 10])])
+    tracker.update([detection([2, 0, 12, 10])])
+
+    (predicted,) = tracker.predict()
+    assert np.allclose(predicted["bbox"], [4, 0, 14, 10])
+
+    # Two frames later the detector runs again; the skipped frame counts
+    # towards the velocity
+    (track,) = tracker.update([detection([6, 0, 16, 10])])
+    assert track["track_id"] == predicted["track_id"]
+    assert np.allclose(tracker.velocity[0], [2, 0, 2, 0])
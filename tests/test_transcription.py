@@ -0,0 +1,175 @@
+import asyncio
+from concurrent.futures import Executor, Future
+from concurrent.futures.process import BrokenProcessPool
+
+import numpy as np
+import pytest
+
+import utils.transcription as transcription
+from utils.speechtotext import InvalidAudio
+from utils.transcription import TranscriptionService
+
+
+class InlinePool(Executor):
+    """Runs jobs on the calling thread; broken pools refuse them."""
+
+    def __init__(self, broken=False):
+        self.broken = broken
+        self.jobs = 0
+
+    def submit(self, fn, *args):
+        if self.broken:
+            raise BrokenProcessPool("a worker died")
+        self.jobs += 1
+        future = Future()
+        future.set_result(fn(*args))
+        return future
+
+    def shutdown(self, wait=True, cancel_futures=False):
+        pass
+
+
+def fake_run_batch(clips):
+    results = [
+        InvalidAudio("corrupt") if data == b"bad" else f"text of {data!r}"
+        for data, _, _ in clips
+    ]
+    return results, {"decode": 0.0, "resample": 0.0, "inference": 0.0}
+
+
+@pytest.fixture
+def service(monkeypatch):
+    monkeypatch.setattr(transcription, "_run_batch", fake_run_batch)
+    service = TranscriptionService(workers=1, max_batch=8, batch_window_ms=5)
+    pools = []
+
+    def new_pool():
+        pools.append(InlinePool())
+        return pools[-1]
+
+    monkeypatch.setattr(service, "_new_pool", new_pool)
+    service.pools = pools
+    return service
+
+
+def test_concurrent_first_requests_start_one_dispatcher(service, monkeypatch):
+    loads, dispatchers = [], []
+    load, dispatch = service.load, service._dispatch
+
+    def counting_load():
+        loads.append(None)
+        load()
+
+    def counting_dispatch():
+        dispatchers.append(None)
+        return dispatch()
+
+    monkeypatch.setattr(service, "load", counting_load)
+    monkeypatch.setattr(service, "_dispatch", counting_dispatch)
+
+    async def run():
+        texts = await asyncio.gather(*(service.transcribe(f"clip{i}".encode()) for i in range(5)))
+        dispatcher = service._dispatcher
+        await service.stop()
+        return texts, dispatcher
+
+    texts, dispatcher = asyncio.run(run())
+
+    assert texts == [f"text of {f'clip{i}'.encode()!r}" for i in range(5)]
+    assert len(service.pools) == 1
+    assert len(loads) == 1 and len(dispatchers) == 1
+    assert dispatcher.cancelled() or dispatcher.done()
+
+
+def test_bad_clip_fails_alone(service):
+    async def run():
+        results = await asyncio.gather(
+            service.transcribe(b"good"), service.transcribe(b"bad"), return_exceptions=True
+        )
+        await service.stop()
+        return results
+
+    good, bad = asyncio.run(run())
+
+    assert good == "text of b'good'"
+    assert isinstance(bad, InvalidAudio)
+
+
+def test_broken_pool_is_replaced_once(service):
+    async def run():
+        await service.start()
+        service._pool.broken = True
+        first = await asyncio.gather(
+            service.transcribe(b"a", cache=False), service.transcribe(b"b", cache=False),
+            return_exceptions=True
+        )
+        after = await service.transcribe(b"c", cache=False)
+        await service.stop()
+        return first, after
+
+    first, after = asyncio.run(run())
+
+    assert all(isinstance(result, BrokenProcessPool) for result in first)
+    assert after == "text of b'c'"
+    assert len(service.pools) == 2
+
+
+def test_retry_after_grows_with_backlog():
+    service = TranscriptionService(workers=2)
+    service._clips = 10
+    service._stage_totals["inference"] = 10.0
+    service._in_flight = 8
+
+    assert service.retry_after() == 4
+    assert service.overloaded() is False
+    service._in_flight = service.max_queue
+    assert service.overloaded() is True
+
+
+def test_run_batch_isolates_invalid_clips(monkeypatch):
+    class FakeWhisper:
+        def transcribe_batch(self, audios):
+            return [f"{len(audio)} samples" for audio in audios]
+
+    monkeypatch.setattr(transcription, "_stt", FakeWhisper())
+    clips = [
+        (np.ones(1600), 16000, None),
+        (np.zeros(0), 16000, None),
+        (np.array([np.nan, 1.0]), 16000, None),
+        (np.ones(800), 16000, None),
+    ]
+
+    results, timings = transcription._run_batch(clips)
+
+    assert results[0] == "1600 samples" and results[3] == "800 samples"
+    assert isinstance(results[1], InvalidAudio) and isinstance(results[2], InvalidAudio)
+    assert set(timings) == {"decode", "resample", "inference"}
+
+
+def test_failed_restart_is_retried_by_the_next_batch(service, monkeypatch):
+    new_pool = service._new_pool
+    failures = []
+
+    def failing_once():
+        if not failures:
+            failures.append(None)
+            raise MemoryError("model did not fit")
+        return new_pool()
+
+    async def run():
+        await service.start()
+        service._pool.broken = True
+        monkeypatch.setattr(service, "_new_pool", failing_once)
+        first = await asyncio.gather(service.transcribe(b"a", cache=False), return_exceptions=True)
+        async with service._lifecycle_lock():  # wait out the failed restart
+            ready = service.ready
+        after = await service.transcribe(b"b", cache=False)
+        await service.stop()
+        return first, ready, after
+
+    first, ready, after = asyncio.run(run())
+
+    assert isinstance(first[0], BrokenProcessPool)
+    assert ready is False
+    assert after == "text of b'b'"
+    assert len(failures) == 1 and len(service.pools) == 2
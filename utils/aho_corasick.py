@@ -0,0 +1,188 @@
+import threading
+from collections import deque
+
+
+class _Automaton:
+    """
+    Compiled Aho-Corasick automaton. Symbols are numbered, and the goto
+    function is one dict keyed by node * stride + symbol, which is far
+    smaller than a dict per node for large pattern sets.
+    """
+
+    __slots__ = ("version", "symbols", "stride", "goto", "fail", "link", "outputs", "depth")
+
+    def __init__(self, version, patterns):
+        self.version = version
+        self.symbols = symbols = {}
+        for sequence in patterns.values():
+            for item in sequence:
+                if item not in symbols:
+                    symbols[item] = len(symbols)
+        self.stride = stride = len(symbols) + 1
+
+        # Trie of all patterns; node 0 is the root
+        goto = {}
+        depth = [0]
+        outputs = [None]
+        children = [[]]
+        for key, sequence in patterns.items():
+            node = 0
+            for item in sequence:
+                symbol = symbols[item]
+                child = goto.get(node * stride + symbol)
+                if child is None:
+                    child = len(depth)
+                    goto[node * stride + symbol] = child
+                    depth.append(depth[node] + 1)
+                    outputs.append(None)
+                    children.append([])
+                    children[node].append((symbol, child))
+                node = child
+            outputs[node] = (outputs[node] or ()) + (key,)
+
+        # Failure links (longest proper suffix in the trie) and dictionary
+        # links (nearest suffix that ends a pattern), breadth first
+        fail = [0] * len(depth)
+        link = [0] * len(depth)
+        queue = deque(child for _, child in children[0])
+        while queue:
+            node = queue.popleft()
+            for symbol, child in children[node]:
+                state = fail[node]
+                while state and state * stride + symbol not in goto:
+                    state = fail[state]
+                target = goto.get(state * stride + symbol, 0)
+                fail[child] = target
+                link[child] = target if outputs[target] else link[target]
+                queue.append(child)
+
+        self.goto = goto
+        self.fail = fail
+        self.link = link
+        self.outputs = outputs
+        self.depth = depth
+
+    def find(self, sequence):
+        symbols, stride, goto, fail = self.symbols, self.stride, self.goto, self.fail
+        link, outputs, depth = self.link, self.outputs, self.depth
+        matches = []
+        node = 0
+        for end, item in enumerate(sequence, 1):
+            symbol = symbols.get(item)
+            if symbol is None:
+                # No pattern contains this symbol
+                node = 0
+                continue
+            while True:
+                child = goto.get(node * stride + symbol)
+                if child is not None:
+                    node = child
+                    break
+                if not node:
+                    break
+                node = fail[node]
+            state = node if outputs[node] else link[node]
+            while state:
+                for key in outputs[state]:
+                    matches.append((end - depth[state], end, key))
+                state = link[state]
+        return matches
+
+
+class AhoCorasick:
+    """
+    Multi-pattern matcher: every occurrence of any pattern in a sequence in
+    one pass, whatever the number of patterns. Patterns and queries are
+    sequences of hashable symbols: strings match by character, token lists
+    by whole tokens.
+
+    Patterns are added and removed one at a time; matching uses the last
+    compiled automaton. compile() rebuilds it now, compile_later() on a
+    background thread. Until then, matches of removed or changed patterns
+    are filtered out, and new patterns are not found yet.
+    """
+
+    def __init__(self):
+        self._patterns = {}  # key -> tuple of symbols
+        self._version = 0
+        self._automaton = None
+        self._compile_lock = threading.Lock()
+        self._state_lock = threading.Lock()
+        self._compiling = False
+        self._stale = False
+
+    def __len__(self):
+        return len(self._patterns)
+
+    def __contains__(self, key):
+        return key in self._patterns
+
+    def add(self, key, sequence):
+        """
+        Add or replace the pattern for key. Empty patterns are ignored.
+        """
+        sequence = tuple(sequence)
+        if not sequence:
+            self.remove(key)
+            return
+        if self._patterns.get(key) != sequence:
+            self._patterns[key] = sequence
+            self._version += 1
+
+    def remove(self, key):
+        if self._patterns.pop(key, None) is not None:
+            self._version += 1
+
+    @property
+    def up_to_date(self):
+        automaton = self._automaton
+        return automaton is not None and automaton.version == self._version
+
+    def compile(self):
+        with self._compile_lock:
+            version = self._version
+            self._automaton = _Automaton(version, dict(self._patterns))
+
+    def compile_later(self):
+        """
+        Recompile on a background thread; changes made meanwhile trigger
+        one more pass when it finishes.
+        """
+        with self._state_lock:
+            if self._compiling:
+                self._stale = True
+                return
+            self._compiling = True
+            self._stale = False
+        threading.Thread(target=self._compile_loop, name="aho-corasick", daemon=True).start()
+
+    def _compile_loop(self):
+        while True:
+            try:
+                self.compile()
+            except Exception:
+                with self._state_lock:
+                    self._compiling = False
+                raise
+            with self._state_lock:
+                if not self._stale:
+                    self._compiling = False
+                    return
+                self._stale = False
+
+    def find(self, sequence):
+        """
+        [(start, end, key)] for every pattern occurrence in sequence,
+        ordered by end position; sequence[start:end] is the match.
+        """
+        automaton = self._automaton
+        if automaton is None:
+            return []
+        matches = automaton.find(sequence)
+        if automaton.version != self._version:
+            patterns = self._patterns
+            matches = [
+                (start, end, key) for start, end, key in matches
+                if patterns.get(key) == tuple(sequence[start:end])
+            ]
+        return matches
@@ -0,0 +1,240 @@
+import hashlib
+import json
+import os
+import threading
+import uuid
+from collections import OrderedDict
+
+import numpy as np
+
+# AudioBufferCache prunes down to this fraction of its limits, so the next
+# scan is not due on the very next write
+PRUNE_TARGET = 0.9
+
+
+def audio_key(data, sr=None):
+    """
+    Content hash of an audio clip: the encoded file bytes, or the raw
+    samples plus their sample rate.
+    """
+    digest = hashlib.sha256()
+    if isinstance(data, (bytes, bytearray, memoryview)):
+        digest.update(data)
+    else:
+        samples = np.ascontiguousarray(data)
+        digest.update(f"{samples.dtype.str}:{samples.shape}:{sr}:".encode())
+        digest.update(samples.data)
+    return digest.hexdigest()
+
+
+def _atomic_write(path, write):
+    # Write to a private temp file, then rename, so concurrent readers
+    # (and other worker processes) never see a partial file
+    tmp = f"{path}.{uuid.uuid4().hex}.tmp"
+    try:
+        write(tmp)
+        os.replace(tmp, path)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+
+
+class TranscriptCache:
+    """
+    Transcripts keyed by (audio hash, model size).
+    A thread-safe in-memory LRU of `maxsize` entries, backed by JSON files
+    under `directory` when one is given so results survive restarts.
+    """
+
+    def __init__(self, maxsize=1024, directory=None):
+        self.maxsize = maxsize
+        self.directory = directory
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self._texts = OrderedDict()
+        self._lock = threading.Lock()
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key):
+        audio_hash, model_size = key
+        return os.path.join(self.directory, f"{audio_hash}.{model_size}.json")
+
+    def get(self, key):
+        """
+        Cached transcript or None, from memory, then from disk. Blocking;
+        async code should call get_memory() and run get_disk() off the loop.
+        """
+        text = self.get_memory(key)
+        return text if text is not None else self.get_disk(key)
+
+    def get_memory(self, key):
+        """
+        Transcript from the in-memory LRU only; a miss is not counted.
+        """
+        with self._lock:
+            text = self._texts.get(key)
+            if text is not None:
+                self._texts.move_to_end(key)
+                self.hits += 1
+            return text
+
+    def get_disk(self, key):
+        """
+        Transcript from its JSON file (kept in memory from then on), or None.
+        """
+        text = None
+        if self.directory:
+            try:
+                with open(self._path(key)) as f:
+                    text = json.load(f)["text"]
+            except (OSError, ValueError, KeyError):
+                text = None
+        if text is None:
+            with self._lock:
+                self.misses += 1
+            return None
+        with self._lock:
+            self.disk_hits += 1
+        self.remember(key, text)
+        return text
+
+    def put(self, key, text):
+        """
+        Remember a transcript and write its file. Blocking; async code
+        should call remember() and run save() off the loop.
+        """
+        self.remember(key, text)
+        self.save(key, text)
+
+    def save(self, key, text):
+        if self.directory:
+            def write(tmp):
+                with open(tmp, "w") as f:
+                    json.dump({"text": text}, f)
+            _atomic_write(self._path(key), write)
+
+    def remember(self, key, text):
+        with self._lock:
+            self._texts[key] = text
+            self._texts.move_to_end(key)
+            while len(self._texts) > self.maxsize:
+                self._texts.popitem(last=False)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.disk_hits + self.misses
+            return {
+                "size": len(self._texts),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": (self.hits + self.disk_hits) / lookups if lookups else 0.0,
+            }
+
+
+class AudioBufferCache:
+    """
+    Decoded and resampled 16 kHz float32 clips stored as .npy files under
+    `directory`, keyed by the hash of the original audio. Hits are opened
+    with np.load(mmap_mode="c"), so a repeated clip skips soundfile and
+    resampy, and its pages are shared between worker processes until
+    someone writes to them.
+    Least recently used files are deleted once the directory holds more
+    than max_bytes or max_entries clips. The size and count are kept as
+    running totals; the directory is only scanned at startup and when a
+    limit is exceeded. Files written by other processes are counted at
+    the next scan.
+    """
+
+    def __init__(self, directory, max_bytes=512 * 1024 * 1024, max_entries=None):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._bytes = 0
+        self._entries = 0
+        self.prune()
+
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key}.npy")
+
+    def _over_limit(self):
+        return self._bytes > self.max_bytes or (
+            self.max_entries is not None and self._entries > self.max_entries
+        )
+
+    def get(self, key):
+        path = self._path(key)
+        try:
+            # Copy-on-write: writable for torch without copying the file
+            audio = np.load(path, mmap_mode="c")
+        except (OSError, ValueError):
+            return None
+        # Mark as recently used for pruning
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return audio
+
+    def put(self, key, audio):
+        audio = np.ascontiguousarray(audio, dtype=np.float32)
+        path = self._path(key)
+        try:
+            replaced = os.path.getsize(path)
+        except OSError:
+            replaced = None
+
+        def write(tmp):
+            with open(tmp, "wb") as f:
+                np.save(f, audio)
+        _atomic_write(path, write)
+
+        size = os.path.getsize(path)
+        with self._lock:
+            if replaced is None:
+                self._entries += 1
+                self._bytes += size
+            else:
+                self._bytes += size - replaced
+            over = self._over_limit()
+        if over:
+            self.prune()
+
+    def prune(self):
+        """
+        Rescan the directory, delete least recently used clips until it is
+        within PRUNE_TARGET of the limits, and reset the running totals.
+        """
+        entries = []
+        total = 0
+        with os.scandir(self.directory) as it:
+            for entry in it:
+                if not entry.name.endswith(".npy"):
+                    continue
+                try:
+                    stat = entry.stat()
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+                total += stat.st_size
+        count = len(entries)
+        max_bytes = self.max_bytes * PRUNE_TARGET
+        max_entries = None if self.max_entries is None else int(self.max_entries * PRUNE_TARGET)
+        entries.sort()
+        for _, size, path in entries:
+            if total <= max_bytes and (max_entries is None or count <= max_entries):
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+            count -= 1
+        with self._lock:
+            self._bytes = total
+            self._entries = count
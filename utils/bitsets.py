@@ -0,0 +1,85 @@
+import numpy as np
+
+
+class BitsetIndex:
+    """
+    Sets of item indices per key (e.g. ("diet_tags", "vegan")), stored as
+    packed bit arrays. Combining filters is a few vectorized AND/ORs over
+    n/8 bytes, however many items each set holds.
+
+    Writers must be serialized by the caller; readers may run concurrently
+    (growing swaps in new arrays, it never resizes one in place).
+    """
+
+    def __init__(self, capacity=1024):
+        self.capacity = max(8, -(-capacity // 8) * 8)
+        self._bits = {}
+
+    def _grow(self, index):
+        if index < self.capacity:
+            return
+        capacity = self.capacity
+        while capacity <= index:
+            capacity *= 2
+        for key, bits in self._bits.items():
+            grown = np.zeros(capacity // 8, dtype=np.uint8)
+            grown[:len(bits)] = bits
+            self._bits[key] = grown
+        self.capacity = capacity
+
+    def _array(self, key):
+        bits = self._bits.get(key)
+        if bits is None:
+            bits = self._bits[key] = np.zeros(self.capacity // 8, dtype=np.uint8)
+        return bits
+
+    def add(self, key, index):
+        self._grow(index)
+        self._array(key)[index >> 3] |= 1 << (index & 7)
+
+    def add_many(self, key, indices):
+        indices = np.asarray(indices, dtype=np.int64)
+        if not len(indices):
+            return
+        self._grow(int(indices.max()))
+        bits = self._array(key)
+        np.bitwise_or.at(bits, indices >> 3, (1 << (indices & 7)).astype(np.uint8))
+
+    def discard(self, index):
+        """
+        Remove index from every set.
+        """
+        if index >= self.capacity:
+            return
+        clear = np.uint8(~(1 << (index & 7)) & 0xFF)
+        for bits in self._bits.values():
+            bits[index >> 3] &= clear
+
+    def keys(self):
+        return list(self._bits)
+
+    def get(self, key):
+        """
+        Packed bits of key's set (a copy; all zeros for unknown keys).
+        """
+        bits = self._bits.get(key)
+        return np.zeros(self.capacity // 8, dtype=np.uint8) if bits is None else bits.copy()
+
+    def any_of(self, keys):
+        """
+        Packed union of the sets of keys.
+        """
+        result = np.zeros(self.capacity // 8, dtype=np.uint8)
+        for key in keys:
+            bits = self._bits.get(key)
+            if bits is not None:
+                size = min(len(result), len(bits))
+                result[:size] |= bits[:size]
+        return result
+
+    @staticmethod
+    def mask(bits, n):
+        """
+        Boolean array of length n from packed bits.
+        """
+        return np.unpackbits(bits, count=n, bitorder="little").view(bool)
@@ -0,0 +1,271 @@
+"""
+SQLite storage for the product catalog.
+
+Convert a product_db.json once:
+
+    python -m utils.catalog_store data/product_db.json data/catalog.db
+"""
+import json
+import os
+import sqlite3
+import sys
+import threading
+
+# Columns InventoryAPI needs to build its search and field indexes; the
+# full record is only read when a product is looked up
+INDEX_COLUMNS = ("product_id", "name", "category", "diet_tags", "allergens", "aisle_id", "shelf_id")
+
+# List columns, stored as JSON; NULL when the product does not have the field
+JSON_COLUMNS = ("diet_tags", "allergens")
+
+# PRAGMA user_version of the current schema; older databases are migrated on open
+SCHEMA_VERSION = 2
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS products (
+    seq INTEGER PRIMARY KEY,
+    product_id TEXT NOT NULL UNIQUE,
+    name TEXT NOT NULL DEFAULT '',
+    category TEXT,
+    diet_tags TEXT,
+    allergens TEXT,
+    aisle_id TEXT,
+    shelf_id TEXT,
+    stock_quantity INTEGER NOT NULL DEFAULT 0,
+    record TEXT NOT NULL
+)
+"""
+
+
+def _json_list(value):
+    return json.dumps(list(value)) if value is not None else None
+
+
+def _row_values(product):
+    record = dict(product)
+    record.pop("stock_quantity", None)
+    return (
+        product["product_id"],
+        product.get("name", ""),
+        product.get("category"),
+        _json_list(product.get("diet_tags")),
+        _json_list(product.get("allergens")),
+        product.get("aisle_id"),
+        product.get("shelf_id"),
+        product.get("stock_quantity", 0),
+        json.dumps(record),
+    )
+
+
+def _migrate(conn):
+    """
+    Bring a database created by an older version up to SCHEMA_VERSION.
+    """
+    version = conn.execute("PRAGMA user_version").fetchone()[0]
+    if version >= SCHEMA_VERSION:
+        return
+    columns = {row[1] for row in conn.execute("PRAGMA table_info(products)")}
+    if "allergens" not in columns:
+        # Version 1: allergens were only kept in the full record
+        conn.execute("ALTER TABLE products ADD COLUMN allergens TEXT")
+        rows = conn.execute("SELECT product_id, record FROM products").fetchall()
+        conn.executemany(
+            "UPDATE products SET allergens = ? WHERE product_id = ?",
+            [(_json_list(json.loads(record).get("allergens")), product_id) for product_id, record in rows]
+        )
+    conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+    conn.commit()
+
+
+class SQLiteCatalogStore:
+    """
+    Catalog in a SQLite database (WAL mode), read on demand.
+
+    Records stay on disk until load() asks for them, so opening the store
+    costs nothing and memory follows what is actually used. Stock levels
+    written with set_stock() are kept in memory and written by a background
+    thread in one transaction per batch, every flush_interval_ms or once
+    max_batch products changed; load() overlays the pending values, so
+    readers never see older stock than was set.
+    """
+
+    def __init__(self, path, flush_interval_ms=200, max_batch=1000):
+        self.path = path
+        self.flush_interval = flush_interval_ms / 1000
+        self.max_batch = max_batch
+        self._local = threading.local()
+
+        conn = self._conn()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(SCHEMA)
+        conn.commit()
+        _migrate(conn)
+
+        self._pending = {}   # product_id -> stock not yet written
+        self._flushing = {}  # the batch being written right now
+        self._pending_lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._closed = threading.Event()
+        self._writer = threading.Thread(target=self._write_loop, name="stock-writer", daemon=True)
+        self._writer.start()
+
+    def _conn(self):
+        # sqlite3 connections are per thread
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def __len__(self):
+        return self._conn().execute("SELECT COUNT(*) FROM products").fetchone()[0]
+
+    def iter_index_rows(self):
+        """
+        Yield dicts with the INDEX_COLUMNS of every product, in catalog order.
+        """
+        cursor = self._conn().execute(f"SELECT {', '.join(INDEX_COLUMNS)} FROM products ORDER BY seq")
+        for row in cursor:
+            product = dict(zip(INDEX_COLUMNS, row))
+            for column in JSON_COLUMNS:
+                if product[column] is not None:
+                    product[column] = json.loads(product[column])
+            yield product
+
+    def load(self, product_id):
+        """
+        Full product dict with its current stock, or None.
+        """
+        # Read the overlay before the row: a flush that commits in between
+        # then shows up in the row instead of being missed in both places
+        with self._pending_lock:
+            stock = self._pending.get(product_id)
+            if stock is None:
+                stock = self._flushing.get(product_id)
+        row = self._conn().execute(
+            "SELECT record, stock_quantity FROM products WHERE product_id = ?", (product_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        product = json.loads(row[0])
+        product["stock_quantity"] = row[1] if stock is None else stock
+        return product
+
+    def upsert(self, product):
+        # Under _flush_lock so a batch already being written cannot commit
+        # an older stock level over this one
+        with self._flush_lock:
+            with self._pending_lock:
+                self._pending.pop(product["product_id"], None)
+            self._write_row(product)
+
+    def _write_row(self, product):
+        conn = self._conn()
+        conn.execute(
+            "INSERT INTO products (product_id, name, category, diet_tags, allergens, aisle_id, shelf_id,"
+            " stock_quantity, record) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)"
+            " ON CONFLICT(product_id) DO UPDATE SET name = excluded.name,"
+            " category = excluded.category, diet_tags = excluded.diet_tags,"
+            " allergens = excluded.allergens, aisle_id = excluded.aisle_id, shelf_id = excluded.shelf_id,"
+            " stock_quantity = excluded.stock_quantity, record = excluded.record",
+            _row_values(product)
+        )
+        conn.commit()
+
+    def delete(self, product_id):
+        with self._flush_lock:
+            with self._pending_lock:
+                self._pending.pop(product_id, None)
+            conn = self._conn()
+            conn.execute("DELETE FROM products WHERE product_id = ?", (product_id,))
+            conn.commit()
+
+    def set_stock(self, product_id, stock):
+        """
+        Record a product's new stock level; written in the next batch.
+        """
+        with self._pending_lock:
+            self._pending[product_id] = stock
+            full = len(self._pending) >= self.max_batch
+        if full:
+            self._wake.set()
+
+    def flush(self):
+        """
+        Write all pending stock levels now, in one transaction.
+        """
+        with self._flush_lock:
+            with self._pending_lock:
+                pending, self._pending = self._pending, {}
+                self._flushing = pending
+            if not pending:
+                return 0
+            conn = self._conn()
+            try:
+                conn.executemany(
+                    "UPDATE products SET stock_quantity = ? WHERE product_id = ?",
+                    [(stock, product_id) for product_id, stock in pending.items()]
+                )
+                conn.commit()
+            except sqlite3.Error:
+                # Keep the values for the next attempt, unless newer ones arrived
+                conn.rollback()
+                with self._pending_lock:
+                    for product_id, stock in pending.items():
+                        self._pending.setdefault(product_id, stock)
+                raise
+            finally:
+                with self._pending_lock:
+                    self._flushing = {}
+            return len(pending)
+
+    def _write_loop(self):
+        while not self._closed.is_set():
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            try:
+                self.flush()
+            except sqlite3.Error:
+                pass
+
+    def close(self):
+        self._closed.set()
+        self._wake.set()
+        self._writer.join()
+        self.flush()
+
+
+def convert_json(json_path, db_path, batch_size=10000):
+    """
+    One-shot conversion of a product_db.json file into a SQLite catalog.
+    Returns the number of products written.
+    """
+    with open(json_path, "r") as f:
+        products = json.load(f)["products"]
+
+    for path in (db_path, f"{db_path}-wal", f"{db_path}-shm"):
+        if os.path.exists(path):
+            os.remove(path)
+    conn = sqlite3.connect(db_path)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute(SCHEMA)
+    conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+    for start in range(0, len(products), batch_size):
+        conn.executemany(
+            "INSERT OR REPLACE INTO products (product_id, name, category, diet_tags, allergens,"
+            " aisle_id, shelf_id, stock_quantity, record) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            [_row_values(p) for p in products[start:start + batch_size]]
+        )
+    conn.commit()
+    conn.close()
+    return len(products)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 3:
+        print("Usage: python -m utils.catalog_store <product_db.json> <catalog.db>")
+        sys.exit(1)
+    count = convert_json(sys.argv[1], sys.argv[2])
+    print(f"Wrote {count} products to {sys.argv[2]}")
@@ -0,0 +1,154 @@
+import asyncio
+import math
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+
+
+class Overloaded(Exception):
+    """
+    Work was refused because a bounded queue is full.
+    retry_after is a suggested wait in whole seconds.
+    """
+
+    def __init__(self, name, retry_after=1):
+        super().__init__(f"{name} is overloaded, retry in {retry_after}s")
+        self.name = name
+        self.retry_after = retry_after
+
+
+def _ping():
+    return os.getpid()
+
+
+class BoundedExecutor:
+    """
+    Thread or process pool that admits at most workers + max_queue jobs.
+
+    run() rejects work beyond that at once with Overloaded instead of
+    queueing it, so a burst on one kind of work fails fast rather than
+    growing latency for everyone. Retry-After hints come from a moving
+    average of job latency.
+
+    Process pools use spawn workers; jobs and their arguments must be
+    picklable (module-level functions). initializer runs once per worker.
+    """
+
+    def __init__(self, name, workers=2, max_queue=32, processes=False, initializer=None, initargs=()):
+        self.name = name
+        self.workers = workers
+        self.max_queue = max_queue
+        self.processes = processes
+        self.initializer = initializer
+        self.initargs = initargs
+
+        self._pool = None
+        self._start_lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(workers + max_queue)
+        self._stats_lock = threading.Lock()
+        self._admitted = 0
+        self._completed = 0
+        self._rejected = 0
+        self._avg_seconds = None
+
+    def start(self):
+        """
+        Create the pool; process workers are started (and initialized) now
+        rather than on the first jobs. Blocking and idempotent.
+        """
+        with self._start_lock:
+            if self._pool is not None:
+                return
+            if not self.processes:
+                self._pool = ThreadPoolExecutor(
+                    max_workers=self.workers, thread_name_prefix=self.name,
+                    initializer=self.initializer, initargs=self.initargs
+                )
+                return
+            pool = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=self.initializer,
+                initargs=self.initargs,
+            )
+            try:
+                for future in [pool.submit(_ping) for _ in range(self.workers)]:
+                    future.result()
+            except Exception:
+                pool.shutdown(wait=False, cancel_futures=True)
+                raise
+            self._pool = pool
+
+    @property
+    def ready(self):
+        return self._pool is not None
+
+    def retry_after(self):
+        """
+        Seconds until a slot is likely free: about one average job
+        latency (queueing included) when full, at least 1.
+        """
+        return max(1, math.ceil(self._avg_seconds or 0.0))
+
+    def submit(self, fn, *args, **kwargs):
+        """
+        Admit a job and return its concurrent.futures.Future.
+        Raises Overloaded if workers and queue are all taken.
+        """
+        if not self._slots.acquire(blocking=False):
+            with self._stats_lock:
+                self._rejected += 1
+            raise Overloaded(self.name, self.retry_after())
+        try:
+            if self._pool is None:
+                self.start()
+            started = time.perf_counter()
+            future = self._pool.submit(partial(fn, *args, **kwargs))
+        except BaseException:
+            self._slots.release()
+            raise
+        with self._stats_lock:
+            self._admitted += 1
+        # The slot is held until the job finishes, even if its caller gave up
+        future.add_done_callback(lambda _: self._finished(started))
+        return future
+
+    def _finished(self, started):
+        seconds = time.perf_counter() - started
+        with self._stats_lock:
+            self._completed += 1
+            if self._avg_seconds is None:
+                self._avg_seconds = seconds
+            else:
+                self._avg_seconds += 0.1 * (seconds - self._avg_seconds)
+        self._slots.release()
+
+    async def run(self, fn, *args, **kwargs):
+        """
+        Run fn(*args, **kwargs) on the pool and await its result.
+        Raises Overloaded at once if the executor is full.
+        """
+        if self._pool is None:
+            # Starting process workers blocks; keep it off the event loop
+            await asyncio.get_running_loop().run_in_executor(None, self.start)
+        return await asyncio.wrap_future(self.submit(fn, *args, **kwargs))
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    def stats(self):
+        with self._stats_lock:
+            return {
+                "kind": "process" if self.processes else "thread",
+                "workers": self.workers,
+                "max_queue": self.max_queue,
+                "in_progress": self._admitted - self._completed,
+                "completed": self._completed,
+                "rejected": self._rejected,
+                "avg_ms": (self._avg_seconds or 0.0) * 1000,
+            }
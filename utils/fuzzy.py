@@ -0,0 +1,390 @@
+import heapq
+import threading
+
+# Most names the loose pass of FuzzyNameIndex.lookup verifies per query
+LOOSE_CANDIDATES = 200
+
+
+def bounded_edit_distance(a, b, max_distance):
+    """
+    Damerau-Levenshtein (optimal string alignment) distance between a and b,
+    or max_distance + 1 as soon as it is known to exceed max_distance.
+    Only the diagonal band of width max_distance is filled in.
+    """
+    len_a, len_b = len(a), len(b)
+    if abs(len_a - len_b) > max_distance:
+        return max_distance + 1
+    if a == b:
+        return 0
+
+    big = max_distance + 1
+    prev_prev = None
+    prev = [j if j <= max_distance else big for j in range(len_b + 1)]
+    for i in range(1, len_a + 1):
+        lo, hi = max(1, i - max_distance), min(len_b, i + max_distance)
+        row = [big] * (len_b + 1)
+        if i <= max_distance:
+            row[0] = i
+        ca = a[i - 1]
+        for j in range(lo, hi + 1):
+            cb = b[j - 1]
+            value = prev[j - 1] + (ca != cb)
+            if prev[j] + 1 < value:
+                value = prev[j] + 1
+            if row[j - 1] + 1 < value:
+                value = row[j - 1] + 1
+            if i > 1 and j > 1 and ca == b[j - 2] and a[i - 2] == cb and prev_prev[j - 2] + 1 < value:
+                value = prev_prev[j - 2] + 1
+            row[j] = value
+        if min(row[lo - 1:hi + 1]) > max_distance:
+            return big
+        prev_prev, prev = prev, row
+    return min(prev[len_b], big)
+
+
+class SymSpellIndex:
+    """
+    Fuzzy string lookup with a SymSpell-style deletion index.
+
+    Every indexed term stores the strings reachable by deleting up to
+    max_distance characters from its first prefix_length characters. A query
+    generates the same deletes, so candidates come from a handful of dict
+    lookups instead of a scan; each candidate is then verified with a
+    bounded edit distance. Terms can be added and removed one at a time,
+    also while other threads look up.
+    """
+
+    def __init__(self, max_distance=2, prefix_length=7):
+        self.max_distance = max_distance
+        self.prefix_length = prefix_length
+        self._deletes = {}   # delete string -> set of terms
+        self._terms = {}     # term -> set of keys
+        self._key_term = {}  # key -> term
+        # Guards the three dicts; lookups only hold it to collect candidates
+        self._lock = threading.RLock()
+
+    def __len__(self):
+        return len(self._key_term)
+
+    def __contains__(self, key):
+        return key in self._key_term
+
+    def term(self, key):
+        """Normalized text indexed under key, or None."""
+        return self._key_term.get(key)
+
+    @staticmethod
+    def normalize(text):
+        return " ".join(text.lower().split())
+
+    def _edits(self, word, distance):
+        edits = {word}
+        frontier = {word}
+        for _ in range(distance):
+            frontier = {w[:i] + w[i + 1:] for w in frontier for i in range(len(w))}
+            edits |= frontier
+        return edits
+
+    def add(self, key, text):
+        """
+        Index text under key (e.g. a product_id), replacing any previous text for key.
+        """
+        term = self.normalize(text)
+        with self._lock:
+            if key in self._key_term:
+                self.remove(key)
+            self._key_term[key] = term
+            keys = self._terms.get(term)
+            if keys is not None:
+                keys.add(key)
+                return
+            self._terms[term] = {key}
+            for edit in self._edits(term[:self.prefix_length], self.max_distance):
+                self._deletes.setdefault(edit, set()).add(term)
+
+    def remove(self, key):
+        with self._lock:
+            term = self._key_term.pop(key, None)
+            if term is None:
+                return
+            keys = self._terms[term]
+            keys.discard(key)
+            if keys:
+                return
+            del self._terms[term]
+            for edit in self._edits(term[:self.prefix_length], self.max_distance):
+                terms = self._deletes.get(edit)
+                if terms is None:
+                    continue
+                terms.discard(term)
+                if not terms:
+                    del self._deletes[edit]
+
+    def lookup(self, text, max_results=1, min_score=0.0, max_distance=None):
+        """
+        Closest indexed terms to text within max_distance edits (at most the
+        index's own bound). Returns a list of (key, term, score) best first,
+        where score = 1 - distance / max(len(query), len(term)).
+        max_results=None returns every match.
+        """
+        query = self.normalize(text)
+        if not query:
+            return []
+        if max_distance is None or max_distance > self.max_distance:
+            max_distance = self.max_distance
+
+        edits = self._edits(query[:self.prefix_length], max_distance)
+        with self._lock:
+            candidates = set()
+            for edit in edits:
+                terms = self._deletes.get(edit)
+                if terms:
+                    candidates |= terms
+            # Keys as of now, so removals during verification cannot break it
+            term_keys = {term: tuple(self._terms.get(term, ())) for term in candidates}
+
+        results = []
+        for term, keys in term_keys.items():
+            distance = bounded_edit_distance(query, term, max_distance)
+            if distance > max_distance:
+                continue
+            score = 1 - distance / max(len(query), len(term))
+            if score < min_score:
+                continue
+            for key in keys:
+                results.append((key, term, score))
+
+        results.sort(key=lambda r: (-r[2], r[1], str(r[0])))
+        return results if max_results is None else results[:max_results]
+
+
+def word_edit_budget(word, max_distance):
+    """
+    Edits allowed inside one word: none for single characters, one up to
+    five letters, then max_distance. The full-name check still applies.
+    """
+    if len(word) <= 1:
+        return 0
+    if len(word) <= 5:
+        return min(1, max_distance)
+    return max_distance
+
+
+class FuzzyNameIndex:
+    """
+    Fuzzy lookup of multi-word names (e.g. product names) by key.
+
+    Whole names are too long for a deletion index, and their shared
+    prefixes ("organic ...") make prefix deletes unselective. Instead each
+    distinct word goes into a SymSpellIndex, and each word lists the names
+    containing it. A query keeps only names where every query word matches
+    one of their words within a small per-word budget, then verifies the
+    survivors with a bounded edit distance over the full name. Queries
+    that fit no name this way get a looser second pass for glued and
+    filler words (see _loose_lookup). Safe to change while other threads
+    look up.
+    """
+
+    def __init__(self, max_distance=2):
+        self.max_distance = max_distance
+        self.words = SymSpellIndex(max_distance=max_distance)
+        self._word_terms = {}  # word -> set of terms containing it
+        self._terms = {}       # term -> set of keys
+        self._key_term = {}    # key -> term
+        # Guards the three dicts (taken before self.words' own lock)
+        self._lock = threading.RLock()
+
+    def __len__(self):
+        return len(self._key_term)
+
+    def __contains__(self, key):
+        return key in self._key_term
+
+    def term(self, key):
+        """Normalized name indexed under key, or None."""
+        return self._key_term.get(key)
+
+    normalize = staticmethod(SymSpellIndex.normalize)
+
+    def add(self, key, text):
+        """
+        Index name text under key, replacing any previous name for key.
+        """
+        term = self.normalize(text)
+        with self._lock:
+            if key in self._key_term:
+                self.remove(key)
+            self._key_term[key] = term
+            keys = self._terms.get(term)
+            if keys is not None:
+                keys.add(key)
+                return
+            self._terms[term] = {key}
+            for word in set(term.split()):
+                terms = self._word_terms.get(word)
+                if terms is None:
+                    terms = self._word_terms[word] = set()
+                    self.words.add(word, word)
+                terms.add(term)
+
+    def remove(self, key):
+        with self._lock:
+            term = self._key_term.pop(key, None)
+            if term is None:
+                return
+            keys = self._terms[term]
+            keys.discard(key)
+            if keys:
+                return
+            del self._terms[term]
+            for word in set(term.split()):
+                terms = self._word_terms.get(word)
+                if terms is None:
+                    continue
+                terms.discard(term)
+                if not terms:
+                    del self._word_terms[word]
+                    self.words.remove(word)
+
+    def lookup(self, text, max_results=1, min_score=0.0):
+        """
+        Closest names to text within max_distance edits.
+        Returns a list of (key, term, score) best first, where
+        score = 1 - distance / max(len(query), len(term)).
+        When no name passes the per-word filter, falls back to
+        _loose_lookup (glued words, filler words).
+        """
+        query = self.normalize(text)
+        if not query:
+            return []
+
+        # For each query word (in query order), its close matches
+        word_matches = {}
+        for word in dict.fromkeys(query.split()):
+            budget = word_edit_budget(word, self.max_distance)
+            matched = self.words.lookup(word, max_results=None, max_distance=budget)
+            word_matches[word] = [w for w, _, _ in matched]
+
+        if all(word_matches.values()):
+            with self._lock:
+                # Words removed since they matched have no names left
+                term_keys = self._candidates(
+                    [[self._word_terms.get(w, frozenset()) for w in words] for words in word_matches.values()]
+                )
+            results = self._verify(query, term_keys, min_score)
+            if results:
+                return results[:max_results]
+        return self._loose_lookup(query, word_matches, min_score, max_results)[:max_results]
+
+    def _loose_lookup(self, query, word_matches, min_score, max_results=None):
+        """
+        Fallback for queries the word filter cannot place, as the difflib
+        matcher this index replaced could: a word matching no indexed word
+        may be two glued together ("almondmilk"), so it selects the names
+        holding one of its prefixes (and the rest of it, if that is a word
+        too); if it has none it is filler ("please")
+        and is left out of the filter. Candidates are verified against the
+        whole query, then against the query without the filler words,
+        scored like difflib's ratio: 2 * matched / (len(query) + len(term)).
+        Only names within max_distance characters of the length being
+        verified are tried, at most LOOSE_CANDIDATES of them, closest
+        length first.
+        """
+        with self._lock:
+            word_postings = []
+            kept = []
+            for word, words in word_matches.items():
+                if not words:
+                    # Glued words: names with a word the query word starts with,
+                    # and with the rest too when that is a word ("almond" + "milk")
+                    words = [word[:i] for i in range(len(word) - 1, 1, -1) if word[:i] in self._word_terms]
+                    rest = next((word[len(w):] for w in words if word[len(w):] in self._word_terms), None)
+                    if rest is not None:
+                        word_postings.append([self._word_terms[rest]])
+                if words:
+                    word_postings.append([self._word_terms.get(w, frozenset()) for w in words])
+                    kept.append(word)
+            if not word_postings:
+                return []
+            core = " ".join(kept)
+            terms = self._candidate_terms(word_postings)
+            whole = self._nearest_length(terms, len(query))
+            filtered = [] if core == query else self._nearest_length(terms, len(core))
+            # Keys as of now, so removals during verification cannot break it
+            term_keys = {term: tuple(self._terms.get(term, ())) for term in whole + filtered}
+
+        results = self._verify(query, {term: term_keys[term] for term in whole}, min_score)
+        if results or not filtered:
+            return results
+        exact = term_keys.get(core, ())
+        score = 2 * len(core) / (len(query) + len(core))
+        if max_results is not None and len(exact) >= max_results and score >= min_score:
+            # Nothing else can score higher than the core itself
+            return sorted((key, core, score) for key in exact)
+        for term in filtered:
+            distance = bounded_edit_distance(core, term, self.max_distance)
+            if distance > self.max_distance:
+                continue
+            score = 2 * (len(term) - distance) / (len(query) + len(term))
+            if score < min_score:
+                continue
+            for key in term_keys[term]:
+                results.append((key, term, score))
+        results.sort(key=lambda r: (-r[2], r[1], str(r[0])))
+        return results
+
+    def _nearest_length(self, terms, length):
+        """
+        Terms within max_distance characters of length, at most
+        LOOSE_CANDIDATES, closest length first.
+        """
+        near = [t for t in terms if abs(len(t) - length) <= self.max_distance]
+        if len(near) > LOOSE_CANDIDATES:
+            near = heapq.nsmallest(LOOSE_CANDIDATES, near, key=lambda t: (abs(len(t) - length), t))
+        return near
+
+    def _candidate_terms(self, word_postings):
+        """
+        Names in at least one posting set of every query word.
+        word_postings holds, per query word, the name sets of its matching
+        words. Caller holds self._lock.
+        """
+        # Start from the most selective word, then filter by the others
+        # with membership tests instead of building large unions
+        word_postings.sort(key=lambda sets: sum(len(terms) for terms in sets))
+        candidates = set().union(*word_postings[0])
+        for sets in word_postings[1:]:
+            if len(sets) == 1:
+                candidates &= sets[0]
+            else:
+                candidates = {t for t in candidates if any(t in terms for terms in sets)}
+            if not candidates:
+                break
+        return candidates
+
+    def _candidates(self, word_postings):
+        """
+        {term: keys} of the names in _candidate_terms(word_postings).
+        Caller holds self._lock.
+        """
+        # Keys as of now, so removals during verification cannot break it
+        return {term: tuple(self._terms.get(term, ())) for term in self._candidate_terms(word_postings)}
+
+    def _verify(self, query, term_keys, min_score):
+        """
+        (key, term, score) for every candidate within max_distance edits of
+        the whole query, best first.
+        """
+        results = []
+        for term, keys in term_keys.items():
+            distance = bounded_edit_distance(query, term, self.max_distance)
+            if distance > self.max_distance:
+                continue
+            score = 1 - distance / max(len(query), len(term))
+            if score < min_score:
+                continue
+            for key in keys:
+                results.append((key, term, score))
+
+        results.sort(key=lambda r: (-r[2], r[1], str(r[0])))
+        return results
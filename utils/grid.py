@@ -0,0 +1,291 @@
+import heapq
+import math
+from collections import deque
+
+import numpy as np
+
+SQRT2 = math.sqrt(2)
+
+
+class OccupancyGrid:
+    """
+    Rasterized store floorplan. walkable[row, col] is True where a shopper
+    can stand; rows follow y and columns follow x.
+    """
+
+    def __init__(self, walkable, resolution=1.0, origin=(0.0, 0.0)):
+        self.walkable = np.asarray(walkable, dtype=bool)
+        self.resolution = resolution
+        self.origin = origin
+        self.height, self.width = self.walkable.shape
+
+        # Flat byte copy padded with one blocked cell on every side, so the
+        # search loops never need bounds checks. Cell (row, col) lives at
+        # (row + 1) * stride + col + 1.
+        padded = np.zeros((self.height + 2, self.width + 2), dtype=np.uint8)
+        padded[1:-1, 1:-1] = self.walkable
+        self.stride = self.width + 2
+        self.cells = padded.tobytes()
+
+    @classmethod
+    def from_floorplan(cls, floorplan):
+        """
+        Build from the "floorplan" section of store_map.json: width and
+        height in map units, a resolution (units per cell) and a list of
+        rectangular obstacles {"x", "y", "width", "height"}.
+        """
+        resolution = floorplan.get("resolution", 1.0)
+        cols = int(math.ceil(floorplan["width"] / resolution))
+        rows = int(math.ceil(floorplan["height"] / resolution))
+        walkable = np.ones((rows, cols), dtype=bool)
+
+        for obstacle in floorplan.get("obstacles", []):
+            c0 = max(int(math.floor(obstacle["x"] / resolution)), 0)
+            r0 = max(int(math.floor(obstacle["y"] / resolution)), 0)
+            c1 = int(math.ceil((obstacle["x"] + obstacle["width"]) / resolution))
+            r1 = int(math.ceil((obstacle["y"] + obstacle["height"]) / resolution))
+            walkable[r0:r1, c0:c1] = False
+        return cls(walkable, resolution)
+
+    def to_cell(self, point):
+        """
+        (x, y) map position -> (row, col), clamped to the grid.
+        """
+        col = int((point[0] - self.origin[0]) / self.resolution)
+        row = int((point[1] - self.origin[1]) / self.resolution)
+        return min(max(row, 0), self.height - 1), min(max(col, 0), self.width - 1)
+
+    def to_point(self, cell):
+        """
+        (row, col) -> (x, y) map position of the cell centre.
+        """
+        row, col = cell
+        return (
+            self.origin[0] + (col + 0.5) * self.resolution,
+            self.origin[1] + (row + 0.5) * self.resolution,
+        )
+
+    def flat(self, cell):
+        return (int(cell[0]) + 1) * self.stride + int(cell[1]) + 1
+
+    def unflat(self, i):
+        row, col = divmod(i, self.stride)
+        return row - 1, col - 1
+
+    def is_walkable(self, cell):
+        row, col = cell
+        return 0 <= row < self.height and 0 <= col < self.width and bool(self.walkable[row, col])
+
+    def nearest_walkable(self, cell):
+        """
+        Closest walkable cell by breadth-first search (None if there is none).
+        Locations such as shelves may sit inside an obstacle on the map.
+        """
+        if self.is_walkable(cell):
+            return cell
+        cells, stride = self.cells, self.stride
+        start = self.flat(cell)
+        seen = {start}
+        queue = deque([start])
+        while queue:
+            i = queue.popleft()
+            for j in (i + 1, i - 1, i + stride, i - stride):
+                if j in seen or not (0 <= j < len(cells)):
+                    continue
+                row, col = self.unflat(j)
+                if not (0 <= row < self.height and 0 <= col < self.width):
+                    continue
+                if cells[j]:
+                    return row, col
+                seen.add(j)
+                queue.append(j)
+        return None
+
+    def line_of_sight(self, a, b):
+        """
+        True if every cell touched by the segment between the centres of
+        cells a and b is walkable. Passing exactly through a corner needs
+        both side cells free, matching the no-corner-cutting search.
+        """
+        cells, stride = self.cells, self.stride
+        (r0, c0), (r1, c1) = a, b
+        n_r, n_c = abs(r1 - r0), abs(c1 - c0)
+        step_r = stride if r1 > r0 else -stride
+        step_c = 1 if c1 > c0 else -1
+
+        i = self.flat(a)
+        ir = ic = 0
+        while ir < n_r or ic < n_c:
+            decision = (1 + 2 * ic) * n_r - (1 + 2 * ir) * n_c
+            if decision == 0:
+                if not (cells[i + step_r] and cells[i + step_c]):
+                    return False
+                i += step_r + step_c
+                ir += 1
+                ic += 1
+            elif decision < 0:
+                i += step_c
+                ic += 1
+            else:
+                i += step_r
+                ir += 1
+            if not cells[i]:
+                return False
+        return True
+
+
+def jump_point_search(grid, start, goal):
+    """
+    Jump point search on an 8-connected OccupancyGrid (no corner cutting).
+    Only jump points are pushed on the heap, so open areas are crossed in
+    a few expansions instead of one per cell.
+    Args:
+        grid: OccupancyGrid
+        start, goal: (row, col) cells
+    Returns:
+        list of jump point cells from start to goal and cost in cells,
+        or (None, inf) if unreachable
+    """
+    cells, stride = grid.cells, grid.stride
+    s, g = grid.flat(start), grid.flat(goal)
+    if not cells[s] or not cells[g]:
+        return None, float('inf')
+
+    def octile(i, j):
+        ri, ci = divmod(i, stride)
+        rj, cj = divmod(j, stride)
+        dr, dc = abs(ri - rj), abs(ci - cj)
+        return dr + dc + (SQRT2 - 2) * min(dr, dc)
+
+    def jump_straight(i, d, p):
+        # d: step along the line, p: perpendicular step
+        while True:
+            if not cells[i]:
+                return -1
+            if i == g:
+                return i
+            if (cells[i + p] and not cells[i + p - d]) or (cells[i - p] and not cells[i - p - d]):
+                return i
+            i += d
+
+    def jump_diagonal(i, dc, dr):
+        # dc: +-1 column step, dr: +-stride row step
+        while True:
+            if not cells[i]:
+                return -1
+            if i == g:
+                return i
+            if jump_straight(i + dc, dc, stride) >= 0 or jump_straight(i + dr, dr, 1) >= 0:
+                return i
+            if not (cells[i + dc] and cells[i + dr]):
+                return -1
+            i += dc + dr
+
+    def directions(i, parent):
+        if parent < 0:
+            dirs = [(dc, dr) for dc in (-1, 0, 1) for dr in (-stride, 0, stride) if dc or dr]
+            return [
+                (dc, dr) for dc, dr in dirs
+                if cells[i + dc + dr] and (not (dc and dr) or (cells[i + dc] and cells[i + dr]))
+            ]
+
+        pr, pc = divmod(parent, stride)
+        r, c = divmod(i, stride)
+        dc = (c > pc) - (c < pc)
+        dr = ((r > pr) - (r < pr)) * stride
+        dirs = []
+        if dc and dr:
+            if cells[i + dr]:
+                dirs.append((0, dr))
+            if cells[i + dc]:
+                dirs.append((dc, 0))
+            if cells[i + dr] and cells[i + dc]:
+                dirs.append((dc, dr))
+        else:
+            # Straight move: keep going ahead, and turn only towards forced
+            # neighbours (side cell open while the one behind it is blocked)
+            d = dc or dr
+            p = stride if dc else 1
+            ahead = cells[i + d]
+            if ahead:
+                dirs.append((dc, dr))
+            for side in (p, -p):
+                if cells[i + side] and not cells[i + side - d]:
+                    dirs.append((side, 0) if p == 1 else (0, side))
+                    if ahead:
+                        dirs.append((dc + side, dr) if p == 1 else (dc, dr + side))
+        return dirs
+
+    inf = float('inf')
+    best = {s: 0.0}
+    parent = {s: -1}
+    closed = set()
+    queue = [(octile(s, g), 0.0, s)]
+
+    while queue:
+        (est_total_cost, cost_so_far, node) = heapq.heappop(queue)
+        if node in closed:
+            continue
+        closed.add(node)
+
+        if node == g:
+            path = [node]
+            while parent[node] >= 0:
+                node = parent[node]
+                path.append(node)
+            path.reverse()
+            return [grid.unflat(i) for i in path], cost_so_far
+
+        for dc, dr in directions(node, parent[node]):
+            if dc and dr:
+                jp = jump_diagonal(node + dc + dr, dc, dr)
+            elif dc:
+                jp = jump_straight(node + dc, dc, stride)
+            else:
+                jp = jump_straight(node + dr, dr, 1)
+            if jp < 0 or jp in closed:
+                continue
+            new_cost = cost_so_far + octile(node, jp)
+            if new_cost < best.get(jp, inf):
+                best[jp] = new_cost
+                parent[jp] = node
+                heapq.heappush(queue, (new_cost + octile(jp, g), new_cost, jp))
+
+    return None, inf
+
+
+def smooth_path(grid, path):
+    """
+    Drop intermediate cells that are in line of sight of an earlier kept
+    cell (string pulling), leaving only the turning waypoints.
+    """
+    if len(path) <= 2:
+        return list(path)
+    smoothed = [path[0]]
+    anchor = path[0]
+    for prev, cell in zip(path[1:-1], path[2:]):
+        if not grid.line_of_sight(anchor, cell):
+            smoothed.append(prev)
+            anchor = prev
+    smoothed.append(path[-1])
+    return smoothed
+
+
+def grid_route(grid, start_point, goal_point):
+    """
+    Walking route between two map positions.
+    Returns (waypoints as (x, y) map positions, length in map units),
+    or (None, inf) if the goal cannot be reached.
+    """
+    start = grid.nearest_walkable(grid.to_cell(start_point))
+    goal = grid.nearest_walkable(grid.to_cell(goal_point))
+    if start is None or goal is None:
+        return None, float('inf')
+
+    path, _ = jump_point_search(grid, start, goal)
+    if path is None:
+        return None, float('inf')
+
+    waypoints = [grid.to_point(cell) for cell in smooth_path(grid, path)]
+    length = sum(math.dist(a, b) for a, b in zip(waypoints[:-1], waypoints[1:]))
+    return waypoints, length
@@ -1,63 +1,709 @@
+from collections import OrderedDict
+import heapq
+from itertools import count, islice
 import threading
 import time
+from types import MappingProxyType
+
+from utils.metrics import registry
+
+# Name n-gram sizes kept in the search index. Bigrams cover the shortest
+# queries the API accepts, trigrams keep posting lists selective.
+NGRAM_SIZES = (2, 3)
+
+# Prefixed to names before taking n-grams, so names starting with a query
+# have their own (short) posting lists. Queries never contain it.
+NAME_START = "\0"
+
+# Limited searches whose rarest query n-gram has fewer products than this
+# score every candidate; broader ones walk ranked postings (_top_matches)
+RANKED_SEARCH_MIN = 1000
+
+# Product fields with a secondary index (list fields index every element)
+INDEXED_FIELDS = ("category", "diet_tags", "allergens", "aisle_id", "shelf_id")
+
+# Fields where a missing value means "unknown" rather than "none": products
+# that record them, even as an empty list, are also indexed under RECORDED
+RECORDED_FIELDS = ("allergens",)
+RECORDED = ""
+
+# Key of the every-product snapshot in InventoryAPI._snapshots
+ALL_IDS = None
+
+# Stock updates lock one of these stripes (chosen by product_id hash), so
+# writes to different products rarely wait on each other
+LOCK_STRIPES = 64
+
+# Time spent waiting for stripe locks, by operation ("update", "reserve", "release")
+STOCK_LOCK_WAIT_SECONDS = registry.histogram(
+    "stock_lock_wait_seconds", "Time spent waiting for stock stripe locks (sampled)", ["op"]
+)
+
+# Stripe lock waits are timed for one stock operation in this many; timing
+# and recording every one cost more than an uncontended wait
+LOCK_WAIT_SAMPLE = 64
+
+
+class ReservationError(ValueError):
+    """
+    A reservation could not be made; nothing was reserved.
+    shortages maps each failing product_id to its available stock
+    (None for unknown products).
+    """
+
+    def __init__(self, shortages):
+        super().__init__(f"Cannot reserve: {shortages}")
+        self.shortages = shortages
+
+
+def _ngrams(text, n):
+    return {text[i:i + n] for i in range(len(text) - n + 1)}
+
+
+def _name_grams(lowered):
+    """
+    Index n-grams of a lowered name, including those anchored at its start.
+    """
+    anchored = NAME_START + lowered
+    return {gram for n in NGRAM_SIZES for gram in _ngrams(anchored, n)}
+
+
+def _snapshot(product):
+    """
+    Read-only view of a product; list values become tuples. Snapshots are
+    never modified: a stock change swaps in a new one.
+    """
+    return MappingProxyType({
+        key: tuple(value) if isinstance(value, list) else value
+        for key, value in product.items()
+    })
+
+
+def _merge_quantities(items):
+    """
+    {product_id: quantity} or (product_id, quantity) pairs -> dict summing
+    repeated ids. Quantities must be positive integers.
+    """
+    pairs = items.items() if hasattr(items, "items") else items
+    merged = {}
+    for product_id, quantity in pairs:
+        if not isinstance(quantity, int) or quantity <= 0:
+            raise ValueError(f"Invalid quantity for {product_id}: {quantity!r}")
+        merged[product_id] = merged.get(product_id, 0) + quantity
+    return merged
+
+
+def field_keys(product, field):
+    """
+    Lowercased index keys of a product's field. Fields in RECORDED_FIELDS
+    also get RECORDED when the product has the field at all, even empty.
+    """
+    value = product.get(field)
+    if value is None:
+        return []
+    values = value if isinstance(value, (list, tuple, set)) else [value]
+    keys = [str(v).lower() for v in values]
+    if field in RECORDED_FIELDS:
+        keys.append(RECORDED)
+    return keys
+
 
 class InventoryAPI:
-    def __init__(self, initial_products):
+    def __init__(self, initial_products=(), store=None, cache_size=None):
         """
         initial_products: List of dicts representing products with stock_quantity
+        store: optional persistent backend (e.g. SQLiteCatalogStore). Only the
+            indexed fields are read up front; full records are loaded on
+            first access and stock changes are written back to it.
+        cache_size: with a store, keep at most this many loaded records,
+            evicting the least recently used
         """
-        # Using dict keyed by product_id for quick access
-        self.products = {p['product_id']: p.copy() for p in initial_products}
+        self.store = store
+        self.cache_size = cache_size if store is not None else None
+
+        # Using dict keyed by product_id for quick access. Values are
+        # immutable snapshots, safe to hand out and read without locks.
+        # With a store this only holds the records loaded so far, least
+        # recently used first.
+        self.products = OrderedDict()
+        # Guards the LRU order of self.products
+        self._cache_lock = threading.Lock()
+        # Guards the catalog structure and indexes (add/remove)
         self.lock = threading.Lock()
+        # Guard stock changes, per stripe of products
+        self._stripes = [threading.Lock() for _ in range(LOCK_STRIPES)]
+        self._lock_ops = count()
+        # Current stock of every product whose stock changed since it was
+        # added: a stock change writes one int here instead of copying the
+        # record, and readers refresh a stale snapshot (see _product)
+        self._stock = {}
+
+        # Inverted index: name n-gram -> set of product_ids
+        self._name_index = {}
+        self._lowered_names = {}
+        # Copy-on-write: n-gram -> tuple of its product_ids in rank order
+        # (shorter names first), built on first search, dropped on writes
+        self._ranked_postings = {}
+
+        # Secondary indexes: field -> lowercased value -> {product_id: None}.
+        # Dicts keep catalog order, which the recommenders rely on.
+        self._field_index = {field: {} for field in INDEXED_FIELDS}
+        # Copy-on-write snapshots handed to readers: (field, value) -> tuple
+        # of product_ids, ALL_IDS -> every product_id. A write drops the
+        # entries it touches; the next reader builds a fresh tuple.
+        self._snapshots = {}
+
+        # Callbacks fn(event, product) run after a product is added or removed
+        self._listeners = []
+
+        # Change counters for caches: catalog_version moves when products are
+        # added, replaced or removed, stock_version on every stock change.
+        # _product_stock_versions keeps the stock_version of each product's
+        # latest change (see product_stock_version).
+        self._catalog_versions = count(1)
+        self._stock_versions = count(1)
+        self.catalog_version = 0
+        self.stock_version = 0
+        self._product_stock_versions = {}
+
+        for p in initial_products:
+            self.add_product(p)
+        if store is not None:
+            for row in store.iter_index_rows():
+                self._index_product(row)
+
+    def _index_product(self, product):
+        product_id = product['product_id']
+        lowered = product.get('name', '').lower()
+        self._lowered_names[product_id] = lowered
+        self._snapshots.pop(ALL_IDS, None)
+        for gram in _name_grams(lowered):
+            self._name_index.setdefault(gram, set()).add(product_id)
+            self._ranked_postings.pop(gram, None)
+
+        for field, index in self._field_index.items():
+            for key in field_keys(product, field):
+                index.setdefault(key, {})[product_id] = None
+                self._snapshots.pop((field, key), None)
+
+    def _unindex_product(self, product):
+        product_id = product['product_id']
+        lowered = self._lowered_names.pop(product_id, '')
+        self._snapshots.pop(ALL_IDS, None)
+        for gram in _name_grams(lowered):
+            postings = self._name_index.get(gram)
+            if postings is None:
+                continue
+            postings.discard(product_id)
+            self._ranked_postings.pop(gram, None)
+            if not postings:
+                del self._name_index[gram]
+
+        for field, index in self._field_index.items():
+            for key in field_keys(product, field):
+                postings = index.get(key)
+                if postings is None:
+                    continue
+                postings.pop(product_id, None)
+                self._snapshots.pop((field, key), None)
+                if not postings:
+                    del index[key]
+
+    def _stripe(self, product_id):
+        return self._stripes[hash(product_id) % LOCK_STRIPES]
+
+    def _cache(self, product_id, product):
+        self.products[product_id] = product
+        if self.cache_size is not None:
+            # Drop the least recently used records; the store has their
+            # current stock
+            with self._cache_lock:
+                self._touch(product_id)
+                while len(self.products) > self.cache_size:
+                    self.products.popitem(last=False)
+
+    def _touch(self, product_id):
+        # Mark a loaded record as just used. Caller holds self._cache_lock.
+        try:
+            self.products.move_to_end(product_id)
+        except KeyError:
+            # Evicted or removed meanwhile
+            pass
+
+    def _cached(self, product_id):
+        """
+        Loaded snapshot of a product, or None; a hit counts as a use.
+        """
+        product = self.products.get(product_id)
+        if product is not None and self.cache_size is not None:
+            with self._cache_lock:
+                self._touch(product_id)
+        return product
+
+    def _load(self, product_id):
+        """
+        Snapshot of a product, reading it from the store if needed.
+        Caller holds the product's stripe lock.
+        """
+        product = self._cached(product_id)
+        if product is None and self.store is not None:
+            record = self.store.load(product_id)
+            if record is not None:
+                product = _snapshot(record)
+                self._cache(product_id, product)
+        return product
+
+    def _with_stock(self, product_id, product):
+        """
+        product, swapped for a snapshot with its current stock if that
+        changed since it was taken. Caller holds the product's stripe lock.
+        """
+        stock = self._stock.get(product_id)
+        if product is None or stock is None or product.get('stock_quantity') == stock:
+            return product
+        product = MappingProxyType({**product, 'stock_quantity': stock})
+        self._cache(product_id, product)
+        return product
+
+    def _product(self, product_id):
+        product = self._cached(product_id)
+        if product is None:
+            if self.store is None or product_id not in self._lowered_names:
+                return None
+        else:
+            stock = self._stock.get(product_id)
+            if stock is None or product.get('stock_quantity') == stock:
+                return product
+        # Not loaded, or first read since a stock change
+        with self._stripe(product_id):
+            return self._with_stock(product_id, self._load(product_id))
+
+    def add_product(self, product):
+        """
+        Add a product, or replace the one with the same product_id.
+        Keeps the search and secondary indexes (and the store) in sync.
+        """
+        product = _snapshot(product)
+        product_id = product['product_id']
+        with self.lock, self._stripe(product_id):
+            old = self._load(product_id)
+            if old is not None:
+                self._unindex_product(old)
+            if self.store is not None:
+                self.store.upsert(product)
+            self._stock.pop(product_id, None)
+            self._cache(product_id, product)
+            self._index_product(product)
+            self.catalog_version = next(self._catalog_versions)
+        self._notify("add", product)
+
+    def remove_product(self, product_id):
+        """
+        Remove a product. Returns the removed product snapshot or None.
+        """
+        with self.lock, self._stripe(product_id):
+            product = self._with_stock(product_id, self._load(product_id))
+            if product is not None:
+                self.products.pop(product_id, None)
+                if self.store is not None:
+                    self.store.delete(product_id)
+                self._unindex_product(product)
+                self._stock.pop(product_id, None)
+                self._product_stock_versions.pop(product_id, None)
+                self.catalog_version = next(self._catalog_versions)
+        if product is not None:
+            self._notify("remove", product)
+        return product
+
+    def add_listener(self, callback):
+        """
+        Register callback(event, product), called with event "add" or
+        "remove" whenever the catalog changes. Lets derived indexes
+        (e.g. the NLP entity index) update incrementally.
+        """
+        self._listeners.append(callback)
+
+    def _notify(self, event, product):
+        for callback in self._listeners:
+            callback(event, product)
 
     def get_product(self, product_id):
         """
-        Return product info dict by product_id, or None if not found.
+        Return a read-only snapshot of the product by product_id, or None if
+        not found. Later stock changes do not alter a returned snapshot.
         """
-        return self.products.get(product_id)
+        return self._product(product_id)
 
     def get_stock(self, product_id):
         """
         Return current stock quantity of product.
         """
-        product = self.products.get(product_id)
+        product = self._product(product_id)
         if product:
             return product.get('stock_quantity', 0)
         return 0
 
+    def _current_stock(self, product_id):
+        """
+        Stock of a product, or None if it is not in the catalog.
+        Caller holds the product's stripe lock.
+        """
+        if product_id not in self._lowered_names:
+            return None
+        stock = self._stock.get(product_id)
+        if stock is None:
+            product = self._load(product_id)
+            if product is None:
+                return None
+            stock = product.get('stock_quantity', 0)
+        return stock
+
+    def _set_stock(self, product_id, stock):
+        # Caller holds the product's stripe lock
+        if self.store is not None:
+            self.store.set_stock(product_id, stock)
+        self._stock[product_id] = stock
+        self.stock_version = self._product_stock_versions[product_id] = next(self._stock_versions)
+
+    def product_stock_version(self, product_id):
+        """
+        Version of one product's stock level: changes whenever that product's
+        stock does, unlike stock_version which follows every product.
+        """
+        return self._product_stock_versions.get(product_id, 0)
+
+    def _acquire(self, stripes, op):
+        # Only a sample of the waits is timed (see LOCK_WAIT_SAMPLE)
+        if next(self._lock_ops) % LOCK_WAIT_SAMPLE:
+            for i in stripes:
+                self._stripes[i].acquire()
+            return
+        start = time.perf_counter()
+        for i in stripes:
+            self._stripes[i].acquire()
+        STOCK_LOCK_WAIT_SECONDS.observe(time.perf_counter() - start, (op,))
+
     def update_stock(self, product_id, delta):
         """
         Increase or decrease stock by delta (negative to reduce).
         Returns updated stock quantity or None if product_id invalid.
-        Thread-safe.
+        Thread-safe; only locks the product's stripe.
         """
-        with self.lock:
-            product = self.products.get(product_id)
-            if not product:
+        stripes = self._lock_stripes((product_id,), "update")
+        try:
+            stock = self._current_stock(product_id)
+            if stock is None:
                 return None
-            new_stock = product['stock_quantity'] + delta
-            if new_stock < 0:
-                new_stock = 0
-            product['stock_quantity'] = new_stock
+            new_stock = max(stock + delta, 0)
+            self._set_stock(product_id, new_stock)
             return new_stock
+        finally:
+            self._unlock_stripes(stripes)
+
+    def _lock_stripes(self, product_ids, op):
+        # Always in index order, so concurrent reservations cannot deadlock.
+        # Records are loaded first (see _preload), so the locks are only
+        # held for the check and the update.
+        stripes = sorted({hash(product_id) % LOCK_STRIPES for product_id in product_ids})
+        self._acquire(stripes, op)
+        return stripes
+
+    def _unlock_stripes(self, stripes):
+        for i in reversed(stripes):
+            self._stripes[i].release()
+
+    def _preload(self, product_ids):
+        # Read records missing from the cache before taking stripe locks, so
+        # store reads do not happen while other writers wait
+        if self.store is not None:
+            for product_id in product_ids:
+                if product_id not in self._stock:
+                    self._product(product_id)
+
+    def reserve(self, items):
+        """
+        Atomically take stock for several products, e.g. a checkout basket.
+        Args:
+            items: {product_id: quantity} or (product_id, quantity) pairs
+        Returns:
+            {product_id: remaining stock}
+        Raises:
+            ReservationError if any product is unknown or short on stock;
+            then no stock is taken at all.
+        """
+        quantities = _merge_quantities(items)
+        self._preload(quantities)
+        stripes = self._lock_stripes(quantities, "reserve")
+        try:
+            shortages = {}
+            remaining = {}
+            for product_id, quantity in quantities.items():
+                stock = self._current_stock(product_id)
+                if stock is None or stock < quantity:
+                    shortages[product_id] = stock
+                else:
+                    remaining[product_id] = stock - quantity
+            if shortages:
+                raise ReservationError(shortages)
+
+            for product_id, stock in remaining.items():
+                self._set_stock(product_id, stock)
+            return remaining
+        finally:
+            self._unlock_stripes(stripes)
+
+    def release(self, items):
+        """
+        Return reserved stock (e.g. an abandoned checkout), atomically.
+        Unknown products are skipped. Returns {product_id: stock}.
+        """
+        quantities = _merge_quantities(items)
+        self._preload(quantities)
+        stripes = self._lock_stripes(quantities, "release")
+        try:
+            restored = {}
+            for product_id, quantity in quantities.items():
+                stock = self._current_stock(product_id)
+                if stock is not None:
+                    restored[product_id] = stock + quantity
+                    self._set_stock(product_id, restored[product_id])
+            return restored
+        finally:
+            self._unlock_stripes(stripes)
+
+    def _candidates(self, q):
+        """
+        Product ids whose names contain every n-gram of q.
+        Returns None when q is too short to use the index.
+        """
+        sizes = [size for size in NGRAM_SIZES if size <= len(q)]
+        if not sizes:
+            return None
+        n = sizes[-1]
+
+        postings = []
+        for gram in _ngrams(q, n):
+            ids = self._name_index.get(gram)
+            if not ids:
+                return set()
+            postings.append(ids)
+
+        # Intersect smallest posting lists first
+        postings.sort(key=len)
+        candidates = set(postings[0])
+        for ids in postings[1:]:
+            candidates &= ids
+            if not candidates:
+                break
+        return candidates
+
+    @staticmethod
+    def _rank(q, name):
+        """
+        Sort key for a name known to contain q: whole-name prefix first,
+        then word prefix, then any substring; shorter names win ties.
+        """
+        if name.startswith(q):
+            tier = 0
+        elif (' ' + q) in name:
+            tier = 1
+        else:
+            tier = 2
+        return (tier, len(name), name)
+
+    def _ranked(self, gram):
+        """
+        Product ids under an n-gram, shortest names first (ties by name,
+        then id). Caller holds self.lock.
+        """
+        ranked = self._ranked_postings.get(gram)
+        if ranked is None:
+            names = self._lowered_names
+            ranked = self._ranked_postings[gram] = tuple(sorted(
+                self._name_index.get(gram, ()),
+                key=lambda product_id: (len(names[product_id]), names[product_id], product_id)
+            ))
+        return ranked
+
+    def _rarest_gram(self, text):
+        """
+        The n-gram of text with the shortest posting list, or None when
+        one of them has none (so no name contains text).
+        Caller holds self.lock.
+        """
+        n = max(size for size in NGRAM_SIZES if size <= len(text))
+        sizes = {gram: len(self._name_index.get(gram, ())) for gram in _ngrams(text, n)}
+        rarest = min(sizes, key=sizes.get)
+        return rarest if sizes[rarest] else None
+
+    def _top_matches(self, q):
+        """
+        Yield matching product ids in search order, without scoring every
+        candidate. Walks, each in rank order: names starting with q, names
+        with a word starting with q, then any other name containing q. Each
+        walk takes the shortest posting list among the n-grams its matches
+        must contain, and only runs if the caller wants more ids.
+        Needs len(q) >= min(NGRAM_SIZES).
+        """
+        for tier, text in enumerate((NAME_START + q, ' ' + q, q)):
+            with self.lock:
+                gram = self._rarest_gram(text)
+                product_ids = () if gram is None else self._ranked(gram)
+            for product_id in product_ids:
+                name = self._lowered_names.get(product_id)
+                if name is not None and q in name and self._rank(q, name)[0] == tier:
+                    yield product_id
+
+    def _loaded(self, product_ids, limit=None):
+        """
+        Snapshots of product_ids in order, at most `limit`, skipping
+        products removed since their ids were read.
+        """
+        products = (self._product(product_id) for product_id in product_ids)
+        return list(islice((p for p in products if p is not None), limit))
 
-    def search_products(self, query):
+    def search_products(self, query, limit=None):
         """
         Search products by name substring (case insensitive).
-        Returns list of matching product dicts.
+        Uses the n-gram index to find candidates, then verifies the
+        substring and ranks matches (prefix matches first).
+        Returns list of matching product dicts, at most `limit` if given;
+        with a limit, stops after that many matches (see _top_matches).
+        Products removed while the search runs are left out.
         """
         q = query.lower()
-        results = []
-        for p in self.products.values():
-            if q in p['name'].lower():
-                results.append(p)
-        return results
+        if not q:
+            results = self.list_all_products()
+            return results if limit is None else results[:limit]
+        if limit is not None and len(q) >= NGRAM_SIZES[0]:
+            if limit < 1:
+                return []
+            with self.lock:
+                gram = self._rarest_gram(q)
+                broad = gram is not None and len(self._name_index[gram]) >= RANKED_SEARCH_MIN
+            if broad:
+                return self._loaded(self._top_matches(q), limit)
+
+        candidates = self._candidates(q)
+        if candidates is None:
+            # Single-character query: nothing to look up, fall back to a scan
+            with self.lock:
+                candidates = list(self._lowered_names)
+
+        scored = []
+        for product_id in candidates:
+            name = self._lowered_names.get(product_id)
+            if name is not None and q in name:
+                scored.append((self._rank(q, name), product_id))
+
+        if limit is None:
+            scored.sort()
+            return self._loaded(product_id for _, product_id in scored)
+        # Pop in rank order only until `limit` products are still there
+        heapq.heapify(scored)
+        return self._loaded((heapq.heappop(scored)[1] for _ in range(len(scored))), limit)
+
+    def _snapshot_ids(self, key):
+        """
+        Tuple of the product_ids under key (see _snapshots), or None.
+        Caller holds self.lock. Reused until a write touches the key, so
+        repeated reads cost nothing.
+        """
+        snapshot = self._snapshots.get(key)
+        if snapshot is None:
+            if key is ALL_IDS:
+                ids = self._lowered_names
+            else:
+                field, value = key
+                ids = self._field_index[field].get(value)
+                if not ids:
+                    return None
+            snapshot = self._snapshots[key] = tuple(ids)
+        return snapshot
+
+    def iter_ids(self, **filters):
+        """
+        Yield product_ids matching every filter, in catalog order.
+        Filters are indexed fields, matched case-insensitively, e.g.
+        iter_ids(category="Dairy", diet_tags="vegan").
+        Walks a snapshot taken when iteration starts, so products added or
+        removed meanwhile may or may not be seen, but never break it.
+        Taking the snapshot does not copy the postings, so stopping after
+        a few ids (e.g. find_products(limit=5)) costs only those ids.
+        """
+        for field in filters:
+            if field not in self._field_index:
+                raise ValueError(f"Field '{field}' is not indexed")
+        with self.lock:
+            postings = []
+            for field, value in filters.items():
+                key = (field, str(value).lower())
+                ids = self._snapshot_ids(key)
+                if ids is None:
+                    return
+                postings.append((ids, self._field_index[field][key[1]]))
+            if not postings:
+                first, rest = self._snapshot_ids(ALL_IDS), []
+            else:
+                # Walk the smallest snapshot, probe the other live postings
+                # (a membership test needs no copy)
+                postings.sort(key=lambda posting: len(posting[0]))
+                first, rest = postings[0][0], [live for _, live in postings[1:]]
+        for product_id in first:
+            if all(product_id in ids for ids in rest):
+                yield product_id
+
+    def id_snapshot(self):
+        """
+        Tuple of every product_id in catalog order. This is the snapshot
+        iter_ids() walks, shared until the catalog changes, so taking it
+        copies nothing; callers must not rely on it following later writes.
+        """
+        with self.lock:
+            return self._snapshot_ids(ALL_IDS)
+
+    def find_products(self, limit=None, **filters):
+        """
+        Return product dicts matching the filters (see iter_ids),
+        at most `limit` if given.
+        """
+        ids = islice(self.iter_ids(**filters), limit)
+        return [self._product(product_id) for product_id in ids]
+
+    def iter_postings(self, field):
+        """
+        Yield (lowercased value, (product_ids...)) for every value of an
+        indexed field, e.g. each category with its products, without loading
+        records.
+        """
+        if field not in self._field_index:
+            raise ValueError(f"Field '{field}' is not indexed")
+        with self.lock:
+            postings = [(value, self._snapshot_ids((field, value))) for value in self._field_index[field]]
+        yield from postings
+
+    def iter_names(self):
+        """
+        Yield (product_id, lowercased name) in catalog order, without
+        loading full records.
+        """
+        with self.lock:
+            names = list(self._lowered_names.items())
+        yield from names
 
     def list_all_products(self):
         """
-        Return list of all product dicts.
+        Return list of all product snapshots (loads every record from a store).
+        """
+        products = (self._product(product_id) for product_id in list(self._lowered_names))
+        return [p for p in products if p is not None]
+
+    def close(self):
+        """
+        Write pending stock changes to the store and close it.
         """
-        return list(self.products.values())
+        if self.store is not None:
+            self.store.close()
 
 
 # Demo usage
@@ -1,4 +1,23 @@
 import heapq
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from utils.metrics import registry
+
+# Search effort per A* call, by graph representation ("dict" or "csr")
+ASTAR_SEARCHES = registry.counter("astar_searches_total", "A* searches run", ["graph"])
+ASTAR_EXPANDED = registry.counter("astar_nodes_expanded_total", "Nodes expanded by A*", ["graph"])
+ASTAR_PUSHES = registry.counter("astar_heap_pushes_total", "Open-set heap pushes by A*", ["graph"])
+
+
+def _count_search(graph_kind, expanded, pushes):
+    labels = (graph_kind,)
+    ASTAR_SEARCHES.inc(labels=labels)
+    ASTAR_EXPANDED.inc(expanded, labels)
+    ASTAR_PUSHES.inc(pushes, labels)
+
 
 class Graph:
     def __init__(self):
@@ -18,28 +37,144 @@ class Graph:
         self.edges[to_node].append((from_node, cost))
 
 
+class CSRGraph:
+    """
+    Read-only graph in compressed sparse row form.
+    Nodes are integers 0..n-1; the edges of node i are
+    targets[offsets[i]:offsets[i+1]] with matching weights.
+    """
+
+    def __init__(self, names, offsets, targets, weights, coords=None):
+        self.names = list(names)
+        self.index = {name: i for i, name in enumerate(self.names)}
+        self.offsets = np.asarray(offsets, dtype=np.int64)
+        self.targets = np.asarray(targets, dtype=np.int32)
+        self.weights = np.asarray(weights, dtype=np.float64)
+        # (n, 2) array of x, y used by the A* heuristic
+        self.coords = None if coords is None else np.asarray(coords, dtype=np.float64)
+        self._tables = None
+        self._sparse = None
+
+    @classmethod
+    def from_graph(cls, graph, positions=None):
+        """
+        Build from a Graph; positions maps node -> (x, y).
+        """
+        names = sorted(graph.nodes, key=str)
+        index = {name: i for i, name in enumerate(names)}
+
+        offsets = np.zeros(len(names) + 1, dtype=np.int64)
+        targets = []
+        weights = []
+        for i, name in enumerate(names):
+            edges = graph.edges.get(name, [])
+            offsets[i + 1] = offsets[i] + len(edges)
+            for neighbor, cost in edges:
+                targets.append(index[neighbor])
+                weights.append(cost)
+
+        coords = None
+        if positions is not None:
+            coords = [positions[name] for name in names]
+        return cls(names, offsets, targets, weights, coords)
+
+    @classmethod
+    def from_edges(cls, names, sources, targets, weights, coords=None):
+        """
+        Build from parallel edge arrays of integer node ids (directed edges).
+        """
+        sources = np.asarray(sources, dtype=np.int64)
+        order = np.argsort(sources, kind="stable")
+        counts = np.bincount(sources, minlength=len(names))
+        offsets = np.concatenate([[0], np.cumsum(counts)])
+        return cls(names, offsets, np.asarray(targets)[order], np.asarray(weights)[order], coords)
+
+    @property
+    def num_nodes(self):
+        return len(self.names)
+
+    def neighbors(self, node):
+        """
+        Return (targets, weights) arrays for an integer node id.
+        """
+        lo, hi = self.offsets[node], self.offsets[node + 1]
+        return self.targets[lo:hi], self.weights[lo:hi]
+
+    def to_sparse(self):
+        """
+        scipy CSR matrix of the graph. Parallel edges would be summed by
+        scipy, so only the cheapest of each is kept. Built once and cached.
+        """
+        if self._sparse is not None:
+            return self._sparse
+        from scipy.sparse import csr_matrix
+
+        n = self.num_nodes
+        sources = np.repeat(np.arange(n), np.diff(self.offsets))
+        order = np.lexsort((self.weights, self.targets, sources))
+        sources, targets, weights = sources[order], self.targets[order], self.weights[order]
+        first = np.ones(len(order), dtype=bool)
+        first[1:] = (sources[1:] != sources[:-1]) | (targets[1:] != targets[:-1])
+        self._sparse = csr_matrix((weights[first], (sources[first], targets[first])), shape=(n, n))
+        return self._sparse
+
+    def search_tables(self):
+        """
+        Per-node (targets, weights) lists plus x and y coordinate lists,
+        built once and cached. Indexing plain lists is much cheaper than
+        NumPy scalars inside the search loop.
+        """
+        if self._tables is None:
+            targets = self.targets.tolist()
+            weights = self.weights.tolist()
+            bounds = self.offsets.tolist()
+            adjacency = [
+                (targets[lo:hi], weights[lo:hi])
+                for lo, hi in zip(bounds[:-1], bounds[1:])
+            ]
+            xs = ys = None
+            if self.coords is not None:
+                xs = self.coords[:, 0].tolist()
+                ys = self.coords[:, 1].tolist()
+            self._tables = (adjacency, xs, ys)
+        return self._tables
+
+
+def _reconstruct(parent, start, goal):
+    path = [goal]
+    node = goal
+    while node != start:
+        node = parent[node]
+        path.append(node)
+    path.reverse()
+    return path
+
+
 def dijkstra(graph, start, goal):
     """
     Find shortest path from start to goal using Dijkstra's algorithm.
     Returns path list and total cost.
     """
-    queue = [(0, start, [])]
+    queue = [(0, start)]
+    parent = {start: None}
+    best = {start: 0}
     visited = set()
 
     while queue:
-        (cost, node, path) = heapq.heappop(queue)
+        (cost, node) = heapq.heappop(queue)
         if node in visited:
             continue
-
-        path = path + [node]
         visited.add(node)
 
         if node == goal:
-            return path, cost
+            return _reconstruct(parent, start, goal), cost
 
         for neighbor, weight in graph.edges.get(node, []):
-            if neighbor not in visited:
-                heapq.heappush(queue, (cost + weight, neighbor, path))
+            new_cost = cost + weight
+            if neighbor not in visited and new_cost < best.get(neighbor, float('inf')):
+                best[neighbor] = new_cost
+                parent[neighbor] = node
+                heapq.heappush(queue, (new_cost, neighbor))
 
     return None, float('inf')
 
@@ -63,29 +198,214 @@ def astar(graph, start, goal, positions):
     Returns:
         path list and total cost
     """
-    queue = [(0 + heuristic(positions[start], positions[goal]), 0, start, [])]
+    if isinstance(graph, CSRGraph):
+        return astar_csr(graph, graph.index[start], graph.index[goal])
+
+    queue = [(0 + heuristic(positions[start], positions[goal]), 0, start)]
+    parent = {start: None}
+    best = {start: 0}
     visited = set()
+    pushes = 1
 
     while queue:
-        (est_total_cost, cost_so_far, node, path) = heapq.heappop(queue)
+        (est_total_cost, cost_so_far, node) = heapq.heappop(queue)
         if node in visited:
             continue
-
-        path = path + [node]
         visited.add(node)
 
         if node == goal:
-            return path, cost_so_far
+            _count_search("dict", len(visited), pushes)
+            return _reconstruct(parent, start, goal), cost_so_far
 
         for neighbor, weight in graph.edges.get(node, []):
-            if neighbor not in visited:
-                new_cost = cost_so_far + weight
+            new_cost = cost_so_far + weight
+            if neighbor not in visited and new_cost < best.get(neighbor, float('inf')):
+                best[neighbor] = new_cost
+                parent[neighbor] = node
                 est = new_cost + heuristic(positions[neighbor], positions[goal])
-                heapq.heappush(queue, (est, new_cost, neighbor, path))
+                heapq.heappush(queue, (est, new_cost, neighbor))
+                pushes += 1
 
+    _count_search("dict", len(visited), pushes)
     return None, float('inf')
 
 
+def astar_csr(graph, start, goal):
+    """
+    A* over a CSRGraph with integer node ids and parent pointers.
+    Uses the same Manhattan heuristic as astar (zero if the graph has
+    no coordinates). Returns path of node names and total cost.
+    """
+    adjacency, xs, ys = graph.search_tables()
+    if xs is not None:
+        gx, gy = xs[goal], ys[goal]
+
+    inf = float('inf')
+    n = graph.num_nodes
+    best = [inf] * n
+    parent = [-1] * n
+    closed = bytearray(n)
+    best[start] = 0.0
+    queue = [(0.0, 0.0, start)]
+    expanded = 0
+    pushes = 1
+
+    while queue:
+        (est_total_cost, cost_so_far, node) = heapq.heappop(queue)
+        if closed[node]:
+            continue
+        closed[node] = 1
+        expanded += 1
+
+        if node == goal:
+            _count_search("csr", expanded, pushes)
+            path = _reconstruct(parent, start, goal)
+            return [graph.names[i] for i in path], cost_so_far
+
+        targets, weights = adjacency[node]
+        for neighbor, weight in zip(targets, weights):
+            new_cost = cost_so_far + weight
+            if not closed[neighbor] and new_cost < best[neighbor]:
+                best[neighbor] = new_cost
+                parent[neighbor] = node
+                est = new_cost
+                if xs is not None:
+                    est += abs(xs[neighbor] - gx) + abs(ys[neighbor] - gy)
+                heapq.heappush(queue, (est, new_cost, neighbor))
+                pushes += 1
+
+    _count_search("csr", expanded, pushes)
+    return None, inf
+
+
+class RouteTable:
+    """
+    All-pairs shortest paths for a CSRGraph: an (n, n) distance matrix
+    and predecessor matrix from repeated Dijkstra (scipy csgraph).
+    Memory is n*n*12 bytes, so only use this for small and medium maps.
+    """
+
+    def __init__(self, graph):
+        from scipy.sparse.csgraph import shortest_path
+
+        self.graph = graph
+        self.dist, pred = shortest_path(
+            graph.to_sparse(), method="D", directed=True, return_predecessors=True
+        )
+        self.pred = pred.astype(np.int32)
+
+    def route(self, start, goal):
+        """
+        Path (node names) and cost between two integer node ids,
+        walking the predecessor row in O(path length).
+        """
+        cost = float(self.dist[start, goal])
+        if cost == float('inf'):
+            return None, cost
+        path = walk_predecessors(self.pred[start], start, goal)
+        return [self.graph.names[i] for i in path], cost
+
+
+def walk_predecessors(pred_row, start, goal):
+    """
+    Integer node path from start to goal given one source's predecessor row.
+    """
+    path = [goal]
+    node = goal
+    while node != start:
+        node = int(pred_row[node])
+        path.append(node)
+    path.reverse()
+    return path
+
+
+class RouteCache:
+    """
+    Thread-safe LRU cache of routes keyed by (start, end), with hit stats.
+    """
+
+    def __init__(self, maxsize=10000):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._routes = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            route = self._routes.get(key)
+            if route is None:
+                self.misses += 1
+                return None
+            self._routes.move_to_end(key)
+            self.hits += 1
+            return route
+
+    def put(self, key, route):
+        with self._lock:
+            self._routes[key] = route
+            self._routes.move_to_end(key)
+            while len(self._routes) > self.maxsize:
+                self._routes.popitem(last=False)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._routes),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+
+class RoutePlanner:
+    """
+    Serves routes on a static CSRGraph. Maps up to `table_max_nodes`
+    nodes get a precomputed RouteTable; larger maps run A* and keep
+    results in a RouteCache.
+    """
+
+    def __init__(self, graph, precompute=True, table_max_nodes=2000, cache_size=10000):
+        self.graph = graph
+        self.table = None
+        self.cache = None
+        if precompute and graph.num_nodes <= table_max_nodes:
+            self.table = RouteTable(graph)
+        else:
+            self.cache = RouteCache(cache_size)
+
+    @property
+    def mode(self):
+        return "table" if self.table is not None else "cache"
+
+    def route(self, start, goal):
+        """
+        Path and total cost between two node names (None, inf if unreachable).
+        """
+        start_id = self.graph.index[start]
+        goal_id = self.graph.index[goal]
+        if self.table is not None:
+            return self.table.route(start_id, goal_id)
+
+        key = (start_id, goal_id)
+        route = self.cache.get(key)
+        if route is None:
+            path, cost = astar_csr(self.graph, start_id, goal_id)
+            # Routes are shared between callers, so store them immutable
+            route = (tuple(path) if path is not None else None, cost)
+            self.cache.put(key, route)
+        path, cost = route
+        return (list(path) if path is not None else None), cost
+
+    def stats(self):
+        stats = {"mode": self.mode, "nodes": self.graph.num_nodes}
+        if self.cache is not None:
+            stats["cache"] = self.cache.stats()
+        return stats
+
+
 if __name__ == "__main__":
     # Example usage:
     g = Graph()
@@ -109,3 +429,11 @@ if __name__ == "__main__":
 
     path, cost = astar(g, "entrance", "checkout", positions)
     print("A* path:", path, "cost:", cost)
+
+    csr = CSRGraph.from_graph(g, positions)
+    path, cost = astar(csr, "entrance", "checkout", positions)
+    print("A* (CSR) path:", path, "cost:", cost)
+
+    planner = RoutePlanner(csr)
+    path, cost = planner.route("entrance", "checkout")
+    print("Route table path:", path, "cost:", cost)
@@ -0,0 +1,196 @@
+"""
+On-disk table of precomputed top-k neighbours per product.
+
+Layout: a fixed header, an int32 (count, k) array of neighbour rows (-1 pads
+rows with fewer neighbours), a float32 (count, k) array of their scores, the
+UTF-8 product ids back to back with a uint64 array of where each one ends,
+and an open-addressing hash index (int32 rows by CRC-32 of the id, linear
+probing, -1 for empty slots). Everything is memory-mapped read-only, so
+opening a table costs nothing, looking a product up touches a few pages,
+and processes serving the same file share them. Build one with
+`python -m models.neighbours`.
+"""
+import zlib
+
+import numpy as np
+
+MAGIC = b"NBRTABLE"
+VERSION = 2
+
+HEADER = np.dtype([
+    ("magic", "S8"),
+    ("version", "<u4"),
+    ("k", "<u4"),
+    ("count", "<u8"),
+    ("neighbours_offset", "<u8"),
+    ("scores_offset", "<u8"),
+    ("id_ends_offset", "<u8"),
+    ("slots_offset", "<u8"),
+    ("slot_count", "<u8"),
+    ("ids_offset", "<u8"),
+    ("ids_bytes", "<u8"),
+])
+
+# Arrays start on cache-line boundaries
+ALIGN = 64
+
+# The hash index keeps at least this many slots per product
+SLOTS_PER_ID = 2
+
+
+def _aligned(offset):
+    return -(-offset // ALIGN) * ALIGN
+
+
+def _slot_count(count):
+    return 1 << max(0, int(count * SLOTS_PER_ID) - 1).bit_length() if count else 0
+
+
+def _hash_index(encoded, slot_count):
+    """
+    int32 slots mapping CRC-32 of each id to its row, linearly probed.
+    """
+    slots = [-1] * slot_count
+    mask = slot_count - 1
+    for row, key in enumerate(encoded):
+        slot = zlib.crc32(key) & mask
+        while slots[slot] >= 0:
+            if encoded[slots[slot]] == key:
+                raise ValueError(f"Duplicate product id {key.decode()!r}")
+            slot = (slot + 1) & mask
+        slots[slot] = row
+    return np.array(slots, dtype="<i4")
+
+
+def allocate(path, product_ids, k):
+    """
+    Create a table file for product_ids with room for k neighbours each;
+    rows start out empty (-1). Fill it through NeighbourTable(path, writable=True).
+    """
+    encoded = [product_id.encode() for product_id in product_ids]
+    count = len(encoded)
+    slot_count = _slot_count(count)
+    slots = _hash_index(encoded, slot_count)
+    id_ends = np.cumsum([len(key) for key in encoded], dtype="<u8")
+    array_bytes = count * k * 4
+
+    header = np.zeros(1, dtype=HEADER)
+    header["magic"] = MAGIC
+    header["version"] = VERSION
+    header["k"] = k
+    header["count"] = count
+    header["neighbours_offset"] = neighbours_offset = _aligned(HEADER.itemsize)
+    header["scores_offset"] = scores_offset = _aligned(neighbours_offset + array_bytes)
+    header["id_ends_offset"] = id_ends_offset = _aligned(scores_offset + array_bytes)
+    header["slots_offset"] = slots_offset = _aligned(id_ends_offset + id_ends.nbytes)
+    header["slot_count"] = slot_count
+    header["ids_offset"] = ids_offset = _aligned(slots_offset + slots.nbytes)
+    header["ids_bytes"] = int(id_ends[-1]) if count else 0
+
+    with open(path, "wb") as f:
+        f.write(header.tobytes())
+        f.seek(neighbours_offset)
+        empty = np.full(min(count * k, 1 << 20), -1, dtype="<i4").tobytes()
+        for start in range(0, count * k, 1 << 20):
+            f.write(empty[:4 * min(1 << 20, count * k - start)])
+        f.seek(id_ends_offset)
+        f.write(id_ends.tobytes())
+        f.seek(slots_offset)
+        f.write(slots.tobytes())
+        f.seek(ids_offset)
+        for key in encoded:
+            f.write(key)
+
+
+def _map(path, dtype, mode, offset, shape):
+    # np.memmap refuses zero-length maps
+    if not np.prod(shape):
+        return np.empty(shape, dtype=dtype)
+    return np.memmap(path, dtype=dtype, mode=mode, offset=offset, shape=shape)
+
+
+class NeighbourTable:
+    """
+    Read-only (unless writable) view of a neighbour table file.
+    """
+
+    def __init__(self, path, writable=False):
+        self.path = path
+        header = np.fromfile(path, dtype=HEADER, count=1)
+        if len(header) != 1 or header["magic"][0] != MAGIC:
+            raise ValueError(f"{path} is not a neighbour table")
+        if header["version"][0] != VERSION:
+            raise ValueError(
+                f"{path}: unsupported table version {header['version'][0]}, rebuild it with models.neighbours"
+            )
+        header = header[0]
+        self.k = int(header["k"])
+        self.count = count = int(header["count"])
+
+        shape = (count, self.k)
+        mode = "r+" if writable else "r"
+        self.neighbours = _map(path, "<i4", mode, int(header["neighbours_offset"]), shape)
+        self.scores = _map(path, "<f4", mode, int(header["scores_offset"]), shape)
+
+        # Plain ndarray views of the index maps: indexing the memmap subclass is slower
+        def index_map(dtype, offset, length):
+            return np.asarray(_map(path, dtype, "r", int(header[offset]), (length,)))
+
+        self._id_ends = index_map("<u8", "id_ends_offset", count)
+        self._slots = index_map("<i4", "slots_offset", int(header["slot_count"]))
+        self._ids = index_map("u1", "ids_offset", int(header["ids_bytes"]))
+
+    def __len__(self):
+        return self.count
+
+    def __contains__(self, product_id):
+        return self.row(product_id) is not None
+
+    def _id_bytes(self, row):
+        start = int(self._id_ends[row - 1]) if row else 0
+        return self._ids[start:int(self._id_ends[row])].tobytes()
+
+    def product_id(self, row):
+        return self._id_bytes(row).decode()
+
+    def row(self, product_id):
+        """
+        Row of a product in the table, or None.
+        """
+        slots = self._slots
+        if not len(slots):
+            return None
+        key = product_id.encode()
+        mask = len(slots) - 1
+        slot = zlib.crc32(key) & mask
+        while True:
+            row = int(slots[slot])
+            if row < 0:
+                return None
+            if self._id_bytes(row) == key:
+                return row
+            slot = (slot + 1) & mask
+
+    def lookup(self, product_id):
+        """
+        [(product_id, score)] neighbours of a product, best first;
+        empty if the product is not in the table.
+        """
+        row = self.row(product_id)
+        if row is None:
+            return []
+        neighbours = np.asarray(self.neighbours[row])
+        found = neighbours >= 0
+        rows = neighbours[found]
+        ends = self._id_ends[rows]
+        starts = np.where(rows > 0, self._id_ends[np.maximum(rows - 1, 0)], 0)
+        ids = self._ids
+        return [
+            (ids[start:end].tobytes().decode(), score)
+            for start, end, score in zip(starts.tolist(), ends.tolist(), self.scores[row][found].tolist())
+        ]
+
+    def flush(self):
+        for array in (self.neighbours, self.scores):
+            if isinstance(array, np.memmap):
+                array.flush()
@@ -0,0 +1,89 @@
+import hashlib
+import threading
+from collections import OrderedDict
+
+
+def make_etag(body):
+    """Strong ETag from the serialized response body."""
+    return '"' + hashlib.blake2b(body, digest_size=12).hexdigest() + '"'
+
+
+def etag_matches(if_none_match, etag):
+    """
+    True if an If-None-Match header value covers etag ("*", a list, or
+    weak validators all count, as RFC 9110 asks for GET).
+    """
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == etag:
+            return True
+    return False
+
+
+class ResponseCache:
+    """
+    Thread-safe LRU of serialized responses.
+
+    Entries are stored as (version, body, etag) under a key such as
+    (endpoint, params). A lookup with a different version misses, so bumping
+    a data version invalidates every entry built from older data without
+    scanning the cache. Bounded by total body bytes and entry count.
+    """
+
+    def __init__(self, max_bytes=64 * 1024 * 1024, max_entries=100000):
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, version):
+        """(body, etag) cached for key at version, or None."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] != version:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1], entry[2]
+
+    def put(self, key, version, body, etag=None):
+        etag = etag or make_etag(body)
+        if len(body) > self.max_bytes:
+            return etag
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.bytes -= len(old[1])
+            self._entries[key] = (version, body, etag)
+            self.bytes += len(body)
+            while self.bytes > self.max_bytes or len(self._entries) > self.max_entries:
+                _, (_, evicted, _) = self._entries.popitem(last=False)
+                self.bytes -= len(evicted)
+        return etag
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.bytes = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self.bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
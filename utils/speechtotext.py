@@ -1,6 +1,47 @@
-import whisper
+import io
+import logging
+import threading
 import numpy as np
-import soundfile as sf
+
+logger = logging.getLogger(__name__)
+
+SAMPLE_RATE = 16000
+
+
+class InvalidAudio(ValueError):
+    """
+    A clip could not be decoded, or holds no usable samples.
+    """
+
+
+def decode_audio(data):
+    """
+    Decode an encoded audio file (wav, flac, ogg...) held in memory.
+    Returns (samples, sample_rate). Raises InvalidAudio for data that is
+    not audio libsndfile can read.
+    """
+    import soundfile as sf
+
+    try:
+        return sf.read(io.BytesIO(data))
+    except RuntimeError as exc:
+        # libsndfile errors: unknown format, truncated or corrupt file
+        raise InvalidAudio(f"Could not decode audio: {exc}") from None
+
+
+def prepare_audio(audio, sr):
+    """
+    Downmix to mono, resample to 16 kHz and convert to float32,
+    which is what Whisper expects.
+    """
+    if len(audio.shape) > 1:
+        audio = np.mean(audio, axis=1)
+
+    if sr != SAMPLE_RATE:
+        # Resample if needed
+        import resampy
+        audio = resampy.resample(audio, sr, SAMPLE_RATE)
+    return audio.astype(np.float32, copy=False)
 
 class SpeechToText:
     def __init__(self, model_size='small'):
@@ -8,8 +49,13 @@ class SpeechToText:
         Initialize Whisper speech recognition model.
         model_size: one of ['tiny', 'base', 'small', 'medium', 'large']
         """
-        print(f"Loading Whisper model ({model_size})...")
+        # Imported here: whisper pulls in torch, which is slow to import
+        import whisper
+
+        logger.info("Loading Whisper model (%s)", model_size)
         self.model = whisper.load_model(model_size)
+        # The model is shared between requests; run one inference at a time
+        self.lock = threading.Lock()
 
     def transcribe_audio(self, audio_path):
         """
@@ -19,22 +65,61 @@ class SpeechToText:
         Returns:
             str: recognized text
         """
+        import soundfile as sf
+
         # Load audio and pad/trim it to fit 30 seconds context window
         audio, sr = sf.read(audio_path)
-        if sr != 16000:
-            # Resample if needed
-            import resampy
-            audio = resampy.resample(audio, sr, 16000)
-            sr = 16000
+        return self.transcribe_array(audio, sr)
 
+    def transcribe_array(self, audio, sr=SAMPLE_RATE, **options):
+        """
+        Transcribe audio samples already in memory.
+        Args:
+            audio (np.ndarray): samples, mono or (n, channels)
+            sr (int): sample rate of audio
+            options: extra arguments for whisper's transcribe
+        Returns:
+            str: recognized text
+        """
         # Whisper expects float32 np array, mono
-        if len(audio.shape) > 1:
-            audio = np.mean(audio, axis=1)
-        audio = audio.astype(np.float32)
+        audio = prepare_audio(audio, sr)
 
-        result = self.model.transcribe(audio, language='en')
+        with self.lock:
+            result = self.model.transcribe(audio, language='en', **options)
         return result['text']
 
+    def transcribe_batch(self, audios):
+        """
+        Transcribe several clips with one batched decoder pass.
+        Args:
+            audios (list of np.ndarray): 16 kHz mono float32 clips
+        Returns:
+            list of str: recognized text per clip
+        Clips are padded to Whisper's 30 second window; longer clips fall
+        back to transcribe() one at a time.
+        """
+        import torch
+        import whisper
+
+        texts = [None] * len(audios)
+        short = [i for i, audio in enumerate(audios) if len(audio) <= whisper.audio.N_SAMPLES]
+        n_mels = self.model.dims.n_mels
+
+        with self.lock:
+            if short:
+                mels = torch.stack([
+                    whisper.log_mel_spectrogram(whisper.pad_or_trim(audios[i]), n_mels=n_mels)
+                    for i in short
+                ]).to(self.model.device)
+                options = whisper.DecodingOptions(language='en', fp16=False, without_timestamps=True)
+                for i, result in zip(short, whisper.decode(self.model, mels, options)):
+                    texts[i] = result.text
+
+            for i, audio in enumerate(audios):
+                if texts[i] is None:
+                    texts[i] = self.model.transcribe(audio, language='en', fp16=False)['text']
+        return texts
+
 if __name__ == "__main__":
     import sys
 
@@ -0,0 +1,105 @@
+import numpy as np
+
+from utils.nav import walk_predecessors
+
+
+def multi_source_paths(graph, sources):
+    """
+    Shortest paths from several sources in one batched Dijkstra pass.
+    Args:
+        graph: CSRGraph
+        sources: list of integer node ids
+    Returns:
+        (dist, pred) arrays of shape (len(sources), num_nodes)
+    """
+    from scipy.sparse.csgraph import dijkstra
+
+    dist, pred = dijkstra(graph.to_sparse(), directed=True, indices=sources, return_predecessors=True)
+    return dist, pred
+
+
+def nearest_neighbour_order(dist, first, stops):
+    """
+    Greedy visiting order: from `first`, repeatedly go to the closest
+    unvisited stop. dist is a square matrix over local indices.
+    """
+    order = [first]
+    remaining = set(stops)
+    current = first
+    while remaining:
+        current = min(remaining, key=lambda j: dist[current][j])
+        remaining.remove(current)
+        order.append(current)
+    return order
+
+
+def two_opt(order, dist, fixed_end=False):
+    """
+    Improve an open path by reversing segments while that shortens it.
+    order[0] always stays first, and order[-1] stays last if fixed_end.
+    Assumes symmetric distances (store aisles are walkable both ways).
+    """
+    order = list(order)
+    last = len(order) - 1 if fixed_end else len(order)
+    improved = True
+    while improved:
+        improved = False
+        for i in range(1, last - 1):
+            a, b = order[i - 1], order[i]
+            for j in range(i + 1, last):
+                c = order[j]
+                e = order[j + 1] if j + 1 < len(order) else None
+                delta = dist[a][c] - dist[a][b]
+                if e is not None:
+                    delta += dist[b][e] - dist[c][e]
+                if delta < -1e-9:
+                    order[i:j + 1] = reversed(order[i:j + 1])
+                    b = order[i]
+                    improved = True
+    return order
+
+
+def plan_tour(graph, stops, start=None, end=None, table=None):
+    """
+    Near-optimal order for visiting every stop once.
+    Args:
+        graph: CSRGraph
+        stops: node names to visit (duplicates are visited once)
+        start: node name to begin at (defaults to the first stop)
+        end: node name to finish at, e.g. checkout (optional)
+        table: RouteTable for the graph; its rows are reused instead of
+            running Dijkstra when given
+    Returns:
+        (ordered stop names, full path of node names, total cost);
+        (None, None, inf) if some stop is unreachable
+    """
+    stops = list(dict.fromkeys(stops))
+    if start is None:
+        start, stops = stops[0], stops[1:]
+    stops = [s for s in stops if s != start and s != end]
+
+    # Local indices: 0 = start, 1..k = stops, k+1 = end (if given)
+    nodes = [start] + stops + ([end] if end is not None else [])
+    ids = [graph.index[name] for name in nodes]
+    if table is not None:
+        dist, pred = table.dist[ids], table.pred[ids]
+    else:
+        dist, pred = multi_source_paths(graph, ids)
+    local = dist[:, ids]
+    if not np.isfinite(local).all():
+        return None, None, float('inf')
+    matrix = local.tolist()
+
+    order = nearest_neighbour_order(matrix, 0, range(1, len(stops) + 1))
+    if end is not None:
+        order.append(len(nodes) - 1)
+    order = two_opt(order, matrix, fixed_end=end is not None)
+
+    path = [ids[order[0]]]
+    cost = 0.0
+    for u, v in zip(order[:-1], order[1:]):
+        path.extend(walk_predecessors(pred[u], ids[u], ids[v])[1:])
+        cost += matrix[u][v]
+
+    visit_order = [nodes[i] for i in order]
+    return visit_order, [graph.names[i] for i in path], cost
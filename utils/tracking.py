@@ -0,0 +1,120 @@
+import numpy as np
+
+
+def iou_matrix(a, b):
+    """
+    Pairwise IoU between two sets of [x1, y1, x2, y2] boxes.
+    Args:
+        a: (n, 4) array
+        b: (m, 4) array
+    Returns:
+        (n, m) array of IoU values
+    """
+    a = np.asarray(a, dtype=np.float32).reshape(-1, 4)
+    b = np.asarray(b, dtype=np.float32).reshape(-1, 4)
+    x1 = np.maximum(a[:, None, 0], b[None, :, 0])
+    y1 = np.maximum(a[:, None, 1], b[None, :, 1])
+    x2 = np.minimum(a[:, None, 2], b[None, :, 2])
+    y2 = np.minimum(a[:, None, 3], b[None, :, 3])
+    inter = np.clip(x2 - x1, 0, None) * np.clip(y2 - y1, 0, None)
+    area_a = (a[:, 2] - a[:, 0]) * (a[:, 3] - a[:, 1])
+    area_b = (b[:, 2] - b[:, 0]) * (b[:, 3] - b[:, 1])
+    union = area_a[:, None] + area_b[None, :] - inter
+    return np.where(union > 0, inter / np.maximum(union, 1e-9), 0.0)
+
+
+class IoUTracker:
+    """
+    Lightweight multi-object tracker for shelf cameras.
+
+    Detections are matched to existing tracks of the same class greedily by
+    IoU; unmatched detections start new tracks and tracks unseen for
+    max_age detector runs are dropped. On frames the detector skips,
+    predict() moves each track by its last per-frame velocity, so objects
+    keep their ids and boxes without running the model.
+    """
+
+    def __init__(self, iou_threshold=0.3, max_age=3):
+        self.iou_threshold = iou_threshold
+        self.max_age = max_age
+        self.next_id = 0
+        self.boxes = np.zeros((0, 4), dtype=np.float32)
+        self.velocity = np.zeros((0, 4), dtype=np.float32)
+        self.class_ids = np.zeros(0, dtype=np.int64)
+        self.ids = np.zeros(0, dtype=np.int64)
+        self.misses = np.zeros(0, dtype=np.int64)
+        self.detections = []  # detection dict of each track, for the other fields
+        self._frames_since_update = 0
+
+    def __len__(self):
+        return len(self.ids)
+
+    def update(self, detections):
+        """
+        Match a detector run to the tracks.
+        Args:
+            detections: list of dicts from StoreObjectDetector.detect_objects
+        Returns:
+            the visible tracks as detection dicts with a "track_id"
+        """
+        # Frames since the last detector run; predict() already moved the
+        # boxes along their velocity on the skipped ones
+        steps = self._frames_since_update + 1
+        self._frames_since_update = 0
+        boxes = np.array([d["bbox"] for d in detections], dtype=np.float32).reshape(-1, 4)
+        class_ids = np.array([d["class_id"] for d in detections], dtype=np.int64)
+
+        iou = iou_matrix(self.boxes, boxes)
+        iou[self.class_ids[:, None] != class_ids[None, :]] = 0.0
+
+        track_match = np.full(len(self.ids), -1)
+        det_match = np.full(len(boxes), -1)
+        if iou.size:
+            # Greedy assignment, best overlaps first
+            order = np.argsort(iou, axis=None)[::-1]
+            for t, d in zip(*np.unravel_index(order, iou.shape)):
+                if iou[t, d] < self.iou_threshold:
+                    break
+                if track_match[t] < 0 and det_match[d] < 0:
+                    track_match[t] = d
+                    det_match[d] = t
+
+        matched = track_match >= 0
+        new_boxes = self.boxes.copy()
+        new_boxes[matched] = boxes[track_match[matched]]
+        velocity = np.zeros_like(self.velocity)
+        velocity[matched] = (
+            (new_boxes[matched] - self.boxes[matched]) / steps
+            + self.velocity[matched] * (steps - 1) / steps
+        )
+        misses = np.where(matched, 0, self.misses + 1)
+        track_dets = [
+            detections[track_match[t]] if matched[t] else self.detections[t] for t in range(len(self.ids))
+        ]
+
+        keep = misses <= self.max_age
+        fresh = np.flatnonzero(det_match < 0)
+        self.boxes = np.concatenate([new_boxes[keep], boxes[fresh]])
+        self.velocity = np.concatenate([velocity[keep], np.zeros((len(fresh), 4), dtype=np.float32)])
+        self.class_ids = np.concatenate([self.class_ids[keep], class_ids[fresh]])
+        self.misses = np.concatenate([misses[keep], np.zeros(len(fresh), dtype=np.int64)])
+        self.ids = np.concatenate([self.ids[keep], np.arange(self.next_id, self.next_id + len(fresh))])
+        self.next_id += len(fresh)
+        self.detections = [d for d, k in zip(track_dets, keep) if k] + [detections[i] for i in fresh]
+        return self.tracks()
+
+    def predict(self):
+        """
+        Advance the tracks by one frame without a detector run.
+        """
+        self._frames_since_update += 1
+        self.boxes = self.boxes + self.velocity
+        return self.tracks()
+
+    def tracks(self):
+        """Tracks seen in the latest detector run, as detection dicts."""
+        return [
+            {**det, "bbox": box, "track_id": int(track_id)}
+            for det, box, track_id, misses in zip(self.detections, self.boxes, self.ids, self.misses)
+            if misses == 0
+        ]
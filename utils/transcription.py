@@ -0,0 +1,387 @@
+import asyncio
+import math
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import numpy as np
+
+from utils.audio_cache import AudioBufferCache, TranscriptCache, audio_key
+from utils.executors import Overloaded
+from utils.speechtotext import SAMPLE_RATE
+
+STAGES = ("queue", "decode", "resample", "inference")
+
+# Per worker process: the Whisper model, loaded once by _init_worker,
+# and the on-disk cache of resampled clips (None when disabled)
+_stt = None
+_buffers = None
+
+
+def _init_worker(model_size, threads, warmup, buffer_dir=None, buffer_max_bytes=0):
+    global _stt, _buffers
+    import torch
+    from utils.speechtotext import SpeechToText
+
+    torch.set_num_threads(threads)
+    _stt = SpeechToText(model_size=model_size)
+    if buffer_dir:
+        _buffers = AudioBufferCache(buffer_dir, max_bytes=buffer_max_bytes)
+    if warmup:
+        # First inference pays for lazy allocations; do it before real traffic
+        _stt.transcribe_batch([np.zeros(SAMPLE_RATE, dtype=np.float32)])
+
+
+def _ping():
+    return os.getpid()
+
+
+def _run_batch(clips):
+    """
+    Worker side: decode, resample and transcribe a batch of clips.
+    Each clip is (encoded audio bytes, None, hash) or (samples, sample_rate,
+    hash); hash is None for clips that should not be cached.
+    Returns (results, {stage: seconds}), with one result per clip: its text,
+    or the InvalidAudio it raised. A bad clip does not fail the others.
+    """
+    from utils.speechtotext import InvalidAudio, decode_audio, prepare_audio
+
+    timings = {"decode": 0.0, "resample": 0.0, "inference": 0.0}
+    results = [None] * len(clips)
+    audios = {}
+    for i, (data, sr, key) in enumerate(clips):
+        start = time.perf_counter()
+        cached = _buffers.get(key) if _buffers is not None and key else None
+        if cached is not None:
+            # Already 16 kHz float32: the memory map goes through as is
+            audios[i] = prepare_audio(cached, SAMPLE_RATE)
+            timings["decode"] += time.perf_counter() - start
+            continue
+
+        try:
+            if isinstance(data, (bytes, bytearray)):
+                data, sr = decode_audio(data)
+            decoded = time.perf_counter()
+            try:
+                audio = prepare_audio(np.asarray(data), sr)
+            except (ValueError, TypeError) as exc:
+                # Bad sample rate, shape or dtype
+                raise InvalidAudio(f"Could not prepare audio: {exc}") from None
+            if not audio.size or not np.isfinite(audio).all():
+                raise InvalidAudio("Audio has no samples, or samples that are not finite")
+        except InvalidAudio as exc:
+            results[i] = exc
+            continue
+        audios[i] = audio
+        timings["decode"] += decoded - start
+        timings["resample"] += time.perf_counter() - decoded
+        if _buffers is not None and key:
+            _buffers.put(key, audio)
+
+    if audios:
+        start = time.perf_counter()
+        texts = _stt.transcribe_batch(list(audios.values()))
+        timings["inference"] += time.perf_counter() - start
+        for i, text in zip(audios, texts):
+            results[i] = text
+    return results, timings
+
+
+class TranscriptionService:
+    """
+    Whisper transcription on a pool of worker processes.
+
+    Every worker loads the model once at startup (and warms it up).
+    Concurrent requests are queued; a dispatcher takes whatever is waiting
+    when a worker frees up, waits up to batch_window_ms for more, and sends
+    up to max_batch clips as one padded batch. Under load batches grow
+    instead of the queue.
+
+    Results are cached by a hash of the audio and the model size: an LRU of
+    cache_size transcripts, plus JSON transcripts and memory-mapped .npy
+    resampled clips under cache_dir when it is set. Identical clips that
+    arrive while one is being transcribed share its result.
+
+    At most max_queue clips wait or run at once; beyond that transcribe()
+    raises Overloaded instead of queueing.
+
+    A clip that cannot be decoded fails alone with InvalidAudio. If a worker
+    process dies, its batch fails and the pool is restarted.
+    """
+
+    def __init__(self, model_size="small", workers=1, max_batch=8, batch_window_ms=20, warmup=True,
+                 cache_size=1024, cache_dir=None, buffer_cache_mb=512, max_queue=64):
+        self.model_size = model_size
+        self.workers = workers
+        self.max_batch = max_batch
+        self.batch_window = batch_window_ms / 1000
+        self.warmup = warmup
+        self.max_queue = max_queue
+
+        self.cache = TranscriptCache(
+            maxsize=cache_size,
+            directory=os.path.join(cache_dir, "text") if cache_dir else None
+        )
+        self.buffer_dir = os.path.join(cache_dir, "audio") if cache_dir else None
+        self.buffer_max_bytes = buffer_cache_mb * 1024 * 1024
+        self._pending = {}  # cache key -> future of the transcription in progress
+
+        self._pool = None
+        self._pool_broken = False  # _pool was shut down after a worker died
+        self._load_lock = threading.Lock()
+        self._queue = None
+        self._dispatcher = None
+        self._start_lock = None  # asyncio.Lock around start, stop and restarts
+        self._in_flight = 0
+        self._rejected = 0
+        self._batches = 0
+        self._clips = 0
+        self._stage_totals = {stage: 0.0 for stage in STAGES}
+
+    def load(self):
+        """
+        Start the worker processes and wait until every one has loaded (and
+        warmed up) its model. Blocking and idempotent; safe to call from a
+        background thread.
+        """
+        with self._load_lock:
+            if self._pool is None:
+                self._pool = self._new_pool()
+
+    def _new_pool(self):
+        threads = max(1, (os.cpu_count() or 1) // self.workers)
+        pool = ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(self.model_size, threads, self.warmup, self.buffer_dir, self.buffer_max_bytes),
+        )
+        # Start every worker now so model loading and warmup happen before traffic
+        try:
+            for future in [pool.submit(_ping) for _ in range(self.workers)]:
+                future.result()
+        except Exception:
+            pool.shutdown(wait=False, cancel_futures=True)
+            raise
+        return pool
+
+    def _replace_pool(self, broken):
+        """
+        Swap a pool whose worker died (crash, OOM kill) for a fresh one,
+        unless that already happened. Blocking; see _restart().
+
+        If the new pool fails to start, the old one stays in place marked
+        broken, and the next batch tries again.
+        """
+        with self._load_lock:
+            if self._pool is not broken:
+                return
+            if not self._pool_broken:
+                broken.shutdown(wait=False, cancel_futures=True)
+                self._pool_broken = True
+            self._pool = self._new_pool()
+            self._pool_broken = False
+
+    @property
+    def ready(self):
+        return self._pool is not None and not self._pool_broken
+
+    def _lifecycle_lock(self):
+        # Created on first use, inside the running loop; no await between
+        # the check and the assignment, so only one is ever made
+        if self._start_lock is None:
+            self._start_lock = asyncio.Lock()
+        return self._start_lock
+
+    async def start(self):
+        """
+        Start the workers (if load() has not) and the dispatcher, once,
+        however many requests arrive before they are up.
+        """
+        async with self._lifecycle_lock():
+            if self._pool is None:
+                await asyncio.get_running_loop().run_in_executor(None, self.load)
+            if self._dispatcher is None:
+                self._queue = asyncio.Queue()
+                self._dispatcher = asyncio.create_task(self._dispatch())
+
+    async def stop(self):
+        async with self._lifecycle_lock():
+            if self._dispatcher is not None:
+                self._dispatcher.cancel()
+                self._dispatcher = None
+            if self._pool is not None:
+                self._pool.shutdown(wait=False, cancel_futures=True)
+                self._pool = None
+                self._pool_broken = False
+
+    async def _restart(self, broken):
+        """
+        Replace a pool whose worker died. Batches dispatched meanwhile wait
+        for the new pool instead of failing on the broken one.
+        """
+        async with self._lifecycle_lock():
+            if self._pool is broken:
+                try:
+                    await asyncio.get_running_loop().run_in_executor(None, self._replace_pool, broken)
+                except Exception:
+                    # Left marked broken; the next batch retries the restart
+                    pass
+
+    @property
+    def backlog(self):
+        """Clips queued or being transcribed."""
+        return (self._queue.qsize() if self._queue is not None else 0) + self._in_flight
+
+    def overloaded(self):
+        return self.backlog >= self.max_queue
+
+    def retry_after(self):
+        """
+        Seconds until the backlog is likely worked off (at least 1).
+        """
+        work = sum(seconds for stage, seconds in self._stage_totals.items() if stage != "queue")
+        per_clip = work / (self._clips or 1)
+        return max(1, math.ceil(per_clip * self.backlog / self.workers))
+
+    async def transcribe(self, data, sr=None, cache=True, bounded=True):
+        """
+        Transcribe encoded audio bytes (sr=None) or samples at rate sr.
+        Pass cache=False for audio that will not repeat, e.g. live streams.
+        Raises Overloaded when the backlog is full, unless bounded=False.
+        """
+        if self._dispatcher is None:
+            await self.start()
+        sr = sr or SAMPLE_RATE
+        if not cache:
+            return await self._submit(data, sr, None, bounded)
+
+        audio_hash = audio_key(data, None if isinstance(data, (bytes, bytearray)) else sr)
+        key = (audio_hash, self.model_size)
+        text = self.cache.get_memory(key)
+        if text is not None:
+            return text
+
+        pending = self._pending.get(key)
+        if pending is not None:
+            return await asyncio.shield(pending)
+
+        future = asyncio.ensure_future(self._transcribe_uncached(key, data, sr, audio_hash, bounded))
+        self._pending[key] = future
+        try:
+            return await asyncio.shield(future)
+        finally:
+            self._pending.pop(key, None)
+
+    async def _transcribe_uncached(self, key, data, sr, audio_hash, bounded):
+        """
+        Transcript from the disk cache or the workers. File reads and
+        writes run on the default executor, not the event loop.
+        """
+        loop = asyncio.get_running_loop()
+        if self.cache.directory:
+            text = await loop.run_in_executor(None, self.cache.get_disk, key)
+        else:
+            text = self.cache.get_disk(key)
+        if text is not None:
+            return text
+        text = await self._submit(data, sr, audio_hash, bounded)
+        self.cache.remember(key, text)
+        if self.cache.directory:
+            # The response does not wait for the file; a failed write only
+            # costs a future disk hit
+            saved = loop.run_in_executor(None, self.cache.save, key, text)
+            saved.add_done_callback(lambda f: f.cancelled() or f.exception())
+        return text
+
+    async def _submit(self, data, sr, audio_hash, bounded=True):
+        if bounded and self.overloaded():
+            self._rejected += 1
+            raise Overloaded("speech", self.retry_after())
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((data, sr, audio_hash, future, time.perf_counter()))
+        return await future
+
+    async def _dispatch(self):
+        loop = asyncio.get_running_loop()
+        slots = asyncio.Semaphore(self.workers)
+        while True:
+            # Wait for a free worker first, so requests pile up into bigger batches
+            await slots.acquire()
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.batch_window
+            while len(batch) < self.max_batch:
+                if not self._queue.empty():
+                    batch.append(self._queue.get_nowait())
+                    continue
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            asyncio.create_task(self._run(batch, slots))
+
+    async def _run(self, batch, slots):
+        loop = asyncio.get_running_loop()
+        started = time.perf_counter()
+        self._in_flight += len(batch)
+        try:
+            # Waits only while the pool is being (re)started
+            async with self._lifecycle_lock():
+                if self._pool is not None and self._pool_broken:
+                    # An earlier restart failed; its error fails this batch
+                    await loop.run_in_executor(None, self._replace_pool, self._pool)
+                pool = self._pool
+            if pool is None:
+                raise RuntimeError("Transcription service is stopped")
+            clips = [
+                (data, None if isinstance(data, (bytes, bytearray)) else sr, audio_hash)
+                for data, sr, audio_hash, _, _ in batch
+            ]
+            results, timings = await loop.run_in_executor(pool, _run_batch, clips)
+        except Exception as exc:
+            for _, _, _, future, _ in batch:
+                if not future.done():
+                    future.set_exception(exc)
+            if isinstance(exc, BrokenProcessPool):
+                # A worker died; rebuild before this batch's slot is freed
+                await self._restart(pool)
+            return
+        finally:
+            self._in_flight -= len(batch)
+            slots.release()
+
+        self._batches += 1
+        self._clips += len(batch)
+        self._stage_totals["queue"] += sum(started - queued for _, _, _, _, queued in batch)
+        for stage, seconds in timings.items():
+            self._stage_totals[stage] += seconds
+        for (_, _, _, future, _), result in zip(batch, results):
+            if future.done():
+                continue
+            if isinstance(result, Exception):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+    def stats(self):
+        clips = self._clips or 1
+        return {
+            "model_size": self.model_size,
+            "workers": self.workers,
+            "queue_depth": self._queue.qsize() if self._queue is not None else 0,
+            "in_flight": self._in_flight,
+            "rejected": self._rejected,
+            "batches": self._batches,
+            "clips": self._clips,
+            "avg_batch_size": self._clips / self._batches if self._batches else 0.0,
+            "avg_stage_ms": {
+                stage: total / clips * 1000 for stage, total in self._stage_totals.items()
+            },
+            "cache": self.cache.stats(),
+        }
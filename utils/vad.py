@@ -0,0 +1,138 @@
+import numpy as np
+
+
+def pcm16_to_float32(data):
+    """
+    Little-endian signed 16-bit PCM bytes -> float32 samples in [-1, 1].
+    """
+    return np.frombuffer(data, dtype="<i2").astype(np.float32) / 32768.0
+
+
+class PCM16Decoder:
+    """
+    pcm16_to_float32 for a byte stream split at arbitrary points: a sample
+    cut between two messages is held back until its second byte arrives.
+    """
+
+    def __init__(self):
+        self._carry = b""
+
+    def decode(self, data):
+        if self._carry:
+            data = self._carry + data
+        usable = len(data) - len(data) % 2
+        self._carry = data[usable:]
+        return pcm16_to_float32(data[:usable])
+
+
+class EnergyVAD:
+    """
+    Frame-level voice activity detection from RMS energy.
+    A frame is speech when it is louder than threshold_db (dBFS) and at
+    least margin_db above the tracked background noise level.
+    """
+
+    def __init__(self, sample_rate=16000, frame_ms=30, threshold_db=-45.0, margin_db=10.0):
+        self.sample_rate = sample_rate
+        self.frame_size = int(sample_rate * frame_ms / 1000)
+        self.threshold_db = threshold_db
+        self.margin_db = margin_db
+        self.noise_db = threshold_db - margin_db
+
+    def frame_db(self, frame):
+        rms = np.sqrt(np.mean(np.square(frame, dtype=np.float64)))
+        return 20 * np.log10(max(rms, 1e-10))
+
+    def is_speech(self, frame):
+        level = self.frame_db(frame)
+        speech = level > self.threshold_db and level > self.noise_db + self.margin_db
+        if not speech:
+            # Follow the noise floor slowly so a noisy kiosk doesn't count as speech
+            self.noise_db = 0.95 * self.noise_db + 0.05 * level
+        return speech
+
+
+class SpeechSegmenter:
+    """
+    Cuts a live PCM stream into utterances using a VAD.
+
+    push() takes float32 samples of any length and returns the utterances
+    completed by them. An utterance starts after start_frames speech frames
+    (keeping pre_roll_ms of audio before it), and ends after silence_ms of
+    non-speech or when it reaches max_segment_s.
+    """
+
+    def __init__(self, vad, start_frames=3, silence_ms=500, max_segment_s=15.0, pre_roll_ms=200):
+        self.vad = vad
+        frame_ms = 1000 * vad.frame_size / vad.sample_rate
+        self.start_frames = start_frames
+        self.silence_frames = max(1, int(silence_ms / frame_ms))
+        self.max_frames = max(1, int(max_segment_s * 1000 / frame_ms))
+        self.pre_roll_frames = int(pre_roll_ms / frame_ms)
+
+        self._pending = np.zeros(0, dtype=np.float32)
+        self._pre_roll = []
+        self._segment = []
+        self._speech_run = 0
+        self._silence_run = 0
+        self.active = False
+
+    @property
+    def active_samples(self):
+        """Samples in the utterance currently being recorded."""
+        return sum(len(f) for f in self._segment)
+
+    def current_audio(self):
+        """Audio of the utterance in progress (for partial transcripts)."""
+        if not self._segment:
+            return np.zeros(0, dtype=np.float32)
+        return np.concatenate(self._segment)
+
+    def push(self, samples):
+        completed = []
+        frame_size = self.vad.frame_size
+        samples = np.concatenate([self._pending, np.asarray(samples, dtype=np.float32)])
+        usable = len(samples) - len(samples) % frame_size
+        self._pending = samples[usable:]
+
+        for start in range(0, usable, frame_size):
+            frame = samples[start:start + frame_size]
+            speech = self.vad.is_speech(frame)
+            if not self.active:
+                self._pre_roll.append(frame)
+                self._speech_run = self._speech_run + 1 if speech else 0
+                if self._speech_run >= self.start_frames:
+                    self.active = True
+                    self._segment = self._pre_roll[-(self.pre_roll_frames + self.start_frames):]
+                    self._silence_run = 0
+                self._pre_roll = self._pre_roll[-(self.pre_roll_frames + self.start_frames):]
+                continue
+
+            self._segment.append(frame)
+            self._silence_run = 0 if speech else self._silence_run + 1
+            if self._silence_run >= self.silence_frames or len(self._segment) >= self.max_frames:
+                completed.append(self._finish())
+        return completed
+
+    def flush(self):
+        """
+        End of stream: return the utterance in progress (or None).
+        """
+        if not self.active:
+            return None
+        if len(self._pending):
+            self._segment.append(self._pending)
+            self._pending = np.zeros(0, dtype=np.float32)
+        return self._finish()
+
+    def _finish(self):
+        audio = np.concatenate(self._segment)
+        # Trim the trailing silence that ended the utterance
+        if self._silence_run:
+            audio = audio[:max(0, len(audio) - self._silence_run * self.vad.frame_size)]
+        self._segment = []
+        self._pre_roll = []
+        self._speech_run = 0
+        self._silence_run = 0
+        self.active = False
+        return audio